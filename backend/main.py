@@ -6,7 +6,9 @@ import os
 import sys
 import json
 import logging
+import time
 import uuid
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Optional, List
 from datetime import datetime
@@ -17,17 +19,26 @@ sys.path.insert(0, str(project_root))
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
-from pipeline.generator import ReplicateGenerator
+from pipeline.generator import create_generator
+from pipeline.output_writer import get_output_writer
 from pipeline.assets_loader import AssetsLoader
-import replicate
+from pipeline.reference_images import get_reference_cache, reference_images_enabled
+from pipeline.reporter import PipelineReporter
+from pipeline.events import VERBOSE, bind_context, configure_logging, log_event
+from pipeline.metrics import (
+    ACTIVE_JOBS, CONTENT_TYPE, FAILURES, JOB_DURATION, JOBS_IN_MEMORY, QUEUE_DEPTH,
+    REGISTRY, STEP_DURATION
+)
 
 # Import compliance checker
 from pipeline.compliance import check_brand_compliance
+from pipeline.llm_client import CircuitOpenError
+from pipeline.suggestions import get_suggestion_cache
 
 # Import campaign utility functions
 from pipeline.campaign_utils import (
@@ -40,15 +51,28 @@ from pipeline.campaign_utils import (
 # Load environment variables from project root
 load_dotenv(dotenv_path=project_root / ".env")
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Setup logging (buffered; LOG_FORMAT=json for one JSON event per line)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+assets_dir = project_root / "assets"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start optional background services for the lifetime of the app"""
+    # Hot-reload assets (e.g. the read-only Docker mount) instead of rescanning per job
+    watch_loader = None
+    if os.getenv("ASSETS_WATCH", "").lower() in ("1", "true", "yes"):
+        watch_loader = AssetsLoader(assets_dir=str(assets_dir))
+        watch_loader.start_watching(poll_interval=float(os.getenv("ASSETS_POLL_INTERVAL", "2.0")))
+    yield
+    if watch_loader is not None:
+        watch_loader.stop_watching()
+
+
 # Initialize FastAPI app
-app = FastAPI(title="Easy Ads API", version="1.0.0")
+app = FastAPI(title="Easy Ads API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -62,6 +86,14 @@ app.add_middleware(
 # In-memory storage for generation jobs (in production, use Redis or database)
 generation_jobs = {}
 
+# Reporters of running jobs, so their reports can be served while in progress
+job_reporters = {}
+
+# Job gauges are computed from the job store when /metrics is scraped
+QUEUE_DEPTH.set_function(lambda: sum(1 for job in list(generation_jobs.values()) if job["status"] == "pending"))
+ACTIVE_JOBS.set_function(lambda: sum(1 for job in list(generation_jobs.values()) if job["status"] == "processing"))
+JOBS_IN_MEMORY.set_function(lambda: len(generation_jobs))
+
 # Mount static files for serving generated images
 outputs_dir = project_root / "outputs"
 outputs_dir.mkdir(exist_ok=True)
@@ -75,6 +107,7 @@ class CampaignRequest(BaseModel):
     target_audience: str = Field(..., description="Target audience description")
     brand_name: Optional[str] = Field(None, description="Brand name (optional, will be generated if not provided)")
     campaign_message: Optional[str] = Field(None, description="Campaign message/slogan (optional, will be generated if not provided)")
+    profile: Optional[str] = Field(None, description="Profile this job: 'sample', 'cprofile' or 'all' (default: PROFILE_JOBS env)")
 
 
 class GenerationResponse(BaseModel):
@@ -97,14 +130,33 @@ class ComplianceCheckRequest(BaseModel):
     campaign_message: Optional[str] = Field(None, description="Campaign message to verify")
 
 
-def generate_banners_task(job_id: str, campaign: dict):
+class SuggestRequest(BaseModel):
+    products: List[str] = Field(..., min_length=1, description="Products entered so far")
+    target_market: str = Field("", description="Target market (e.g., US, UK, Germany, Japan)")
+    target_audience: str = Field("", description="Target audience description")
+    count: int = Field(5, ge=1, le=10, description="Brand names and campaign messages to suggest")
+
+
+def generate_banners_task(job_id: str, campaign: dict, profile: Optional[str] = None):
     """Background task to generate banners"""
+    with bind_context(job_id=job_id):
+        _run_generation_job(job_id, campaign, profile)
+
+
+def _run_generation_job(job_id: str, campaign: dict, profile: Optional[str] = None):
+    """Generate banners for a job, recording progress in generation_jobs"""
+    job_start = time.perf_counter()
+    # Reports (and profiles, if enabled) land in the job's output directory once it exists
+    reporter = PipelineReporter(campaign, output_dir=str(outputs_dir), campaign_id=job_id, profile=profile)
+    job_reporters[job_id] = reporter
     try:
         generation_jobs[job_id]["status"] = "processing"
         generation_jobs[job_id]["progress"] = {"step": "Initializing", "progress": 0}
         
         # Validate campaign
+        reporter.start_step("Campaign Validation")
         validate_campaign(campaign)
+        reporter.end_step("success")
         
         # Extract campaign details
         products = campaign.get("products", [])
@@ -118,54 +170,81 @@ def generate_banners_task(job_id: str, campaign: dict):
         if not api_token:
             raise ValueError("REPLICATE_API_TOKEN not found in environment")
         
+        enrichment_start = time.perf_counter()
+
         # Generate brand_name if blank
         if not brand_name:
             generation_jobs[job_id]["progress"] = {"step": "Generating brand name", "progress": 10}
+            reporter.start_step("Generate Brand Name", {"model": "openai/gpt-4.1-nano"})
             brand_name = generate_brand_name(products, target_market, target_audience)
             campaign["brand_name"] = brand_name
+            reporter.report.campaign_details["brand_name"] = brand_name
+            reporter.end_step("success", {"brand_name": brand_name})
 
         # Generate campaign_message if blank
         if not campaign_message:
             generation_jobs[job_id]["progress"] = {"step": "Generating campaign message", "progress": 20}
+            reporter.start_step("Generate Campaign Message", {"model": "openai/gpt-4.1-nano"})
             campaign_message = generate_campaign_message(products, target_market, target_audience, brand_name)
             campaign["campaign_message"] = campaign_message
+            reporter.report.campaign_details["campaign_message"] = campaign_message
+            reporter.end_step("success", {"campaign_message": campaign_message})
 
         # Log campaign details
-        logger.info("="*80)
-        logger.info("CAMPAIGN DETAILS:")
-        logger.info(f"  Products: {products}")
-        logger.info(f"  Target Market: {target_market}")
-        logger.info(f"  Target Audience: {target_audience}")
-        logger.info(f"  Brand Name: {brand_name}")
-        logger.info(f"  Campaign Message (English): {campaign_message}")
-        logger.info("="*80)
+        log_event(
+            logger, "campaign_details",
+            f"Campaign: {brand_name} for {target_market} ({len(products)} products)",
+            products=products, target_market=target_market, target_audience=target_audience,
+            brand_name=brand_name, campaign_message=campaign_message
+        )
         
         # Load assets
         generation_jobs[job_id]["progress"] = {"step": "Loading assets", "progress": 30}
-        assets_loader = AssetsLoader(assets_dir=str(project_root / "assets"))
+        reporter.start_step("Load Assets", {"assets_directory": str(assets_dir)})
+        assets_loader = AssetsLoader(assets_dir=str(assets_dir))
         assets = assets_loader.load_all_text_assets()
         assets_context = ""
-        if assets:
-            assets_context = assets_loader.format_assets_for_prompt(assets)
+        if assets or assets_loader.large_assets:
+            assets_context = assets_loader.select_assets_for_prompt(campaign, assets)
+        reporter.end_step("success", {"text_assets_count": len(assets)})
         
+        # Reference images are resized and uploaded once, then reused by every render
+        image_input = None
+        reference_images = assets_loader.find_image_assets() if reference_images_enabled() else []
+        if reference_images:
+            reporter.start_step("Prepare Reference Images", {"reference_images": len(reference_images)})
+            try:
+                image_input = get_reference_cache().get_inputs(reference_images) or None
+                reporter.end_step("success", {"reference_inputs": len(image_input or [])})
+            except Exception as e:
+                reporter.end_step("failed", error_message=str(e))
+                logger.warning(f"Continuing without reference images: {str(e)}")
+        STEP_DURATION.labels(step="enrichment", aspect_ratio="").observe(time.perf_counter() - enrichment_start)
+
         # Generate optimized prompt
         generation_jobs[job_id]["progress"] = {"step": "Optimizing prompt", "progress": 40}
-        prompt, translated_campaign_message = generate_optimized_prompt(campaign, assets_context, has_reference_images=False)
+        reporter.start_step("Generate Optimized Prompt", {
+            "model": "openai/gpt-4.1-nano",
+            "has_assets": bool(assets_context)
+        })
+        with STEP_DURATION.labels(step="prompt", aspect_ratio="").time():
+            prompt, translated_campaign_message = generate_optimized_prompt(campaign, assets_context, has_reference_images=bool(image_input))
+        reporter.end_step("success", {
+            "prompt_length": len(prompt),
+            "translated_message": translated_campaign_message
+        })
 
         # Update campaign with translated message for compliance checking
         campaign["translated_campaign_message"] = translated_campaign_message
 
-        # Log the complete prompt for debugging
-        logger.info("="*80)
-        logger.info("FINAL PROMPT SENT TO IMAGE GENERATION MODEL:")
-        logger.info("="*80)
-        logger.info(prompt)
-        logger.info(f"Translated Campaign Message: {translated_campaign_message}")
-        logger.info("="*80)
+        # The full prompt is only logged at LOG_LEVEL=VERBOSE
+        log_event(logger, "prompt", f"Final prompt:\n{prompt}", level=VERBOSE, prompt=prompt)
 
         # Initialize generator
         generation_jobs[job_id]["progress"] = {"step": "Initializing generator", "progress": 50}
-        generator = ReplicateGenerator(api_token)
+        reporter.start_step("Initialize Generator")
+        generator = create_generator()
+        reporter.end_step("success", {"backend": generator.name, "model": generator.model_id})
         
         # Generate images for each aspect ratio
         aspect_ratios = ["1:1", "9:16", "16:9"]
@@ -173,12 +252,15 @@ def generate_banners_task(job_id: str, campaign: dict):
 
         generated_images = []
         generation_errors = []
+        pending_saves = []
+        writer = get_output_writer()
 
         # Create output directory
         product_folder_name = brand_name.lower().replace(' ', '_').replace('/', '_') if brand_name else str(products[0]).lower().replace(' ', '_').replace('/', '_')[:30]
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         base_output_dir = outputs_dir / f"{product_folder_name}_{timestamp}"
         base_output_dir.mkdir(parents=True, exist_ok=True)
+        reporter.output_dir = base_output_dir
 
         for idx, aspect_ratio in enumerate(aspect_ratios):
             progress = 50 + int((idx + 1) / len(aspect_ratios) * 40)
@@ -189,31 +271,62 @@ def generate_banners_task(job_id: str, campaign: dict):
 
             try:
                 # Generate image
-                image = generator.generate(prompt, aspect_ratio=aspect_ratio)
+                reporter.start_step(f"Generate {aspect_ratio} Image", {
+                    "model": generator.model_id,
+                    "aspect_ratio": aspect_ratio
+                })
+                with STEP_DURATION.labels(step="render", aspect_ratio=aspect_ratio).time():
+                    image = generator.generate(prompt, aspect_ratio=aspect_ratio, image_input=image_input)
+                reporter.end_step("success", {
+                    "image_size": f"{image.size[0]}x{image.size[1]}",
+                    "image_mode": image.mode
+                })
 
-                # Create aspect ratio subdirectory
+                # Encode and write in the background while the next ratio renders
                 aspect_dir = base_output_dir / aspect_ratio.replace(':', '_')
-                aspect_dir.mkdir(exist_ok=True)
-
-                # Save image
                 output_filename = f"banner_{target_market.lower().replace(' ', '_')}.png"
-                output_path = aspect_dir / output_filename
-                image.save(output_path)
-
-                relative_path = output_path.relative_to(outputs_dir)
-                generated_images.append({
-                    'aspect_ratio': aspect_ratio,
-                    'path': str(relative_path),
-                    'url': f"/outputs/{relative_path}",
-                    'size': list(image.size)
-                })
+                write = writer.submit(image, aspect_dir / output_filename)
+                pending_saves.append((aspect_ratio, list(image.size), write))
 
             except Exception as e:
                 error_msg = str(e)
+                reporter.end_step("failed", error_message=error_msg)
                 logger.error(f"Failed to generate {aspect_ratio} banner: {error_msg}")
+                FAILURES.labels(stage="render").inc()
                 generation_errors.append(error_msg)
                 # Continue with other aspect ratios
 
+        for aspect_ratio, size, write in pending_saves:
+            reporter.start_step(f"Save {aspect_ratio} Output", {
+                "aspect_ratio": aspect_ratio,
+                "format": writer.format.name
+            })
+            try:
+                result = write.result()
+            except Exception as e:
+                error_msg = str(e)
+                reporter.end_step("failed", error_message=error_msg)
+                logger.error(f"Failed to save {aspect_ratio} banner: {error_msg}")
+                FAILURES.labels(stage="save").inc()
+                generation_errors.append(error_msg)
+                continue
+
+            STEP_DURATION.labels(step="save", aspect_ratio=aspect_ratio).observe(
+                result.encode_seconds + result.write_seconds)
+            relative_path = result.path.relative_to(outputs_dir)
+            reporter.add_output_file(str(relative_path))
+            reporter.end_step("success", {
+                "output_path": str(relative_path),
+                "file_size_bytes": result.size_bytes,
+                "encode_seconds": round(result.encode_seconds, 4)
+            })
+            generated_images.append({
+                'aspect_ratio': aspect_ratio,
+                'path': str(relative_path),
+                'url': f"/outputs/{relative_path}",
+                'size': size
+            })
+
         # Check if any images were generated
         if len(generated_images) == 0:
             # All generations failed
@@ -221,6 +334,7 @@ def generate_banners_task(job_id: str, campaign: dict):
             generation_jobs[job_id]["status"] = "failed"
             generation_jobs[job_id]["error"] = error_message
             logger.error(f"Job {job_id} failed: {error_message}")
+            FAILURES.labels(stage="job").inc()
         else:
             # At least some images generated successfully
             generation_jobs[job_id]["status"] = "completed"
@@ -230,15 +344,27 @@ def generate_banners_task(job_id: str, campaign: dict):
                 "campaign_message": campaign_message,
                 "translated_campaign_message": translated_campaign_message,
                 "images": generated_images,
-                "output_dir": str(base_output_dir.relative_to(outputs_dir))
+                "output_dir": str(base_output_dir.relative_to(outputs_dir)),
+                "accounting": reporter.ledger.summary()
             }
             if generation_errors:
                 logger.warning(f"Job {job_id} completed with {len(generation_errors)} error(s)")
         
     except Exception as e:
         logger.error(f"Generation failed: {str(e)}")
+        if reporter.current_step:
+            reporter.end_step("failed", error_message=str(e))
         generation_jobs[job_id]["status"] = "failed"
         generation_jobs[job_id]["error"] = str(e)
+        FAILURES.labels(stage="job").inc()
+    finally:
+        status = generation_jobs[job_id]["status"]
+        JOB_DURATION.labels(status=status).observe(time.perf_counter() - job_start)
+        reporter.finalize("completed" if status == "completed" else "failed")
+        if reporter.report_path is not None:
+            generation_jobs[job_id]["report_path"] = str(reporter.report_path)
+        # Finished reports are served from disk
+        job_reporters.pop(job_id, None)
 
 
 @app.get("/")
@@ -247,6 +373,12 @@ async def root():
     return {"message": "Easy Ads API", "version": "1.0.0"}
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics in the text exposition format"""
+    return Response(content=REGISTRY.expose(), media_type=CONTENT_TYPE)
+
+
 @app.post("/api/generate", response_model=GenerationResponse)
 async def generate_campaign(campaign: CampaignRequest, background_tasks: BackgroundTasks):
     """Generate banners for a campaign"""
@@ -261,11 +393,12 @@ async def generate_campaign(campaign: CampaignRequest, background_tasks: Backgro
             "error": None
         }
         
-        # Convert to dict
+        # Convert to dict; profiling is a job option, not part of the brief
         campaign_dict = campaign.model_dump()
+        profile = campaign_dict.pop("profile", None)
         
         # Start background task
-        background_tasks.add_task(generate_banners_task, job_id, campaign_dict)
+        background_tasks.add_task(generate_banners_task, job_id, campaign_dict, profile)
         
         return GenerationResponse(
             job_id=job_id,
@@ -300,9 +433,25 @@ async def get_job_images(job_id: str):
     return job["result"]
 
 
+@app.get("/api/jobs/{job_id}/report")
+async def get_job_report(job_id: str):
+    """Get the pipeline report (steps, timings and spans) for a job"""
+    if job_id not in generation_jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    reporter = job_reporters.get(job_id)
+    if reporter is not None:
+        return reporter.to_dict()
+
+    report_path = generation_jobs[job_id].get("report_path")
+    if not report_path or not Path(report_path).exists():
+        raise HTTPException(status_code=404, detail="Report not available")
+    return FileResponse(report_path, media_type="application/json")
+
+
 @app.post("/api/check-compliance")
-async def check_compliance(request: ComplianceCheckRequest):
-    """Check brand compliance for generated images"""
+def check_compliance(request: ComplianceCheckRequest):
+    """Check brand compliance for generated images (sync: runs in the threadpool, off the event loop)"""
     try:
         # Convert relative paths to absolute paths
         absolute_paths = []
@@ -321,16 +470,20 @@ async def check_compliance(request: ComplianceCheckRequest):
         logger.info(f"Running compliance check for brand: {request.brand_name}")
         logger.info(f"Checking {len(absolute_paths)} image(s)")
 
-        result = check_brand_compliance(
-            image_paths=absolute_paths,
-            brand_name=request.brand_name,
-            campaign_message=request.campaign_message
-        )
+        with STEP_DURATION.labels(step="compliance", aspect_ratio="").time():
+            result = check_brand_compliance(
+                image_paths=absolute_paths,
+                brand_name=request.brand_name,
+                campaign_message=request.campaign_message
+            )
 
         logger.info(f"Compliance check completed: {result.get('compliance_status', 'unknown')}")
 
         return result
 
+    except HTTPException:
+        # Bad requests (unknown image paths) are not compliance failures
+        raise
     except FileNotFoundError as e:
         logger.error(f"File not found during compliance check: {str(e)}")
         raise HTTPException(status_code=404, detail=str(e))
@@ -339,9 +492,30 @@ async def check_compliance(request: ComplianceCheckRequest):
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error during compliance check: {str(e)}")
+        FAILURES.labels(stage="compliance").inc()
         raise HTTPException(status_code=500, detail=f"Compliance check failed: {str(e)}")
 
 
+@app.post("/api/suggest")
+def suggest(request: SuggestRequest):
+    """Suggest brand names and campaign messages for a brief (cached; sync: runs in the threadpool)"""
+    products = [p for p in request.products if p.strip()]
+    if not products:
+        raise HTTPException(status_code=400, detail="At least one product is required")
+    if not os.getenv("REPLICATE_API_TOKEN"):
+        raise HTTPException(status_code=500, detail="REPLICATE_API_TOKEN not configured")
+    try:
+        with STEP_DURATION.labels(step="suggest", aspect_ratio="").time():
+            return get_suggestion_cache().get(products, request.target_market, request.target_audience,
+                                              request.count)
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error generating suggestions: {str(e)}")
+        FAILURES.labels(stage="suggest").inc()
+        raise HTTPException(status_code=500, detail=f"Suggestions failed: {str(e)}")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,483 @@
+"""
+Fake Replicate - Local stand-in for the Replicate predictions, stream and files API
+
+Serves just enough of the API for the pipeline to run offline: creating and
+polling predictions, streaming LLM output as server-sent events, file uploads
+and image downloads. Latency, failure, stall and rate-limit behavior is
+configurable, so benchmarks can reproduce slow models, flaky predictions,
+hung streams and 429 storms.
+
+Point the Replicate client at it with REPLICATE_BASE_URL:
+    python -m benchmarks.fake_replicate --port 8765 --render-latency 2.0:0.3
+    REPLICATE_BASE_URL=http://127.0.0.1:8765 REPLICATE_API_TOKEN=fake python main.py
+"""
+
+import argparse
+import io
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+# Output used for plain-text LLM calls (brand names, campaign messages)
+TEXT_RESPONSE = "Ride Further Together"
+
+
+@dataclass
+class Latency:
+    """Log-normal latency with a given median; sigma 0 makes it constant"""
+    median: float
+    sigma: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        """Parse "median" or "median:sigma" (seconds)"""
+        median, _, sigma = spec.partition(":")
+        return cls(float(median), float(sigma or 0.0))
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median <= 0:
+            return 0.0
+        if self.sigma <= 0:
+            return self.median
+        return self.median * math.exp(rng.gauss(0.0, self.sigma))
+
+
+@dataclass
+class FakeConfig:
+    """Behavior of the fake server"""
+    render_latency: Latency = field(default_factory=lambda: Latency(2.0, 0.3))
+    llm_latency: Latency = field(default_factory=lambda: Latency(0.3, 0.3))  # Time to first token
+    token_interval: float = 0.005  # Seconds between streamed tokens
+    upload_latency: Latency = field(default_factory=lambda: Latency(0.05))
+    error_rate: float = 0.0  # Fraction of predictions that fail
+    rate_limit_rate: float = 0.0  # Fraction of prediction requests answered with 429
+    stall_rate: float = 0.0  # Fraction of LLM streams that stop mid-output until canceled
+    image_size: int = 1024  # Pixels per side of rendered images
+    seed: Optional[int] = None
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _iso(value: datetime) -> str:
+    return value.isoformat().replace("+00:00", "Z")
+
+
+def _render_png(size: int, seed: Optional[int]) -> bytes:
+    """A noisy gradient PNG, so downloads and decoding cost about as much as a real render"""
+    from PIL import Image
+
+    rng = random.Random(seed)
+    noise = Image.frombytes("RGB", (size, size), bytes(rng.getrandbits(8) for _ in range(size * size * 3)))
+    gradient = Image.linear_gradient("L").resize((size, size)).convert("RGB")
+    buffer = io.BytesIO()
+    Image.blend(gradient, noise, 0.35).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeReplicate:
+    """In-memory prediction state shared by the request handlers"""
+
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self.base_url = ""
+        self._rng = random.Random(config.seed)
+        self._rng_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._predictions: Dict[str, Dict[str, Any]] = {}
+        self._files: Dict[str, bytes] = {}
+        self.image_png = _render_png(config.image_size, config.seed)
+        self.stats = {"predictions": 0, "rate_limited": 0, "failed": 0, "stalled": 0, "canceled": 0,
+                      "uploads": 0, "downloads": 0}
+
+    def _random(self) -> float:
+        with self._rng_lock:
+            return self._rng.random()
+
+    def _sample(self, latency: Latency) -> float:
+        with self._rng_lock:
+            return latency.sample(self._rng)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def should_rate_limit(self) -> bool:
+        if self.config.rate_limit_rate and self._random() < self.config.rate_limit_rate:
+            self._count("rate_limited")
+            return True
+        return False
+
+    def create_prediction(self, model: str, body: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+        """Register a prediction; it completes once its sampled latency has passed"""
+        input_data = body.get("input") or {}
+        is_llm = stream or "gpt" in model or "llm" in model
+        created = _now()
+        if is_llm:
+            delay = self._sample(self.config.llm_latency)
+            output = _llm_response(input_data)
+        else:
+            delay = self._sample(self.config.render_latency)
+            output = [f"{self.base_url}/files/render.png"]
+        failed = bool(self.config.error_rate) and self._random() < self.config.error_rate
+        stalled = is_llm and not failed and bool(self.config.stall_rate) and self._random() < self.config.stall_rate
+
+        prediction_id = uuid.uuid4().hex[:16]
+        state = {
+            "id": prediction_id,
+            "model": model,
+            "version": "fake",
+            "input": input_data,
+            "created": created,
+            "ready_at": created + timedelta(seconds=delay),
+            "started_at": created + timedelta(seconds=min(delay, 0.01)),
+            "delay": delay,
+            "is_llm": is_llm,
+            "output": output,
+            "failed": failed,
+            "stalled": stalled,
+            "canceled": False,
+        }
+        with self._lock:
+            self._predictions[prediction_id] = state
+            self.stats["predictions"] += 1
+            if failed:
+                self.stats["failed"] += 1
+            if stalled:
+                self.stats["stalled"] += 1
+        return state
+
+    def cancel(self, state: Dict[str, Any]) -> None:
+        with self._lock:
+            if not state["canceled"]:
+                state["canceled"] = True
+                self.stats["canceled"] += 1
+
+    def get(self, prediction_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._predictions.get(prediction_id)
+
+    def to_json(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Render a prediction the way the API does at the current time"""
+        now = _now()
+        done = now >= state["ready_at"]
+        output = state["output"]
+        if state["is_llm"]:
+            stream_time = len(_tokens(output)) * self.config.token_interval
+            done = now >= state["ready_at"] + timedelta(seconds=stream_time)
+        status = "processing" if not done else ("failed" if state["failed"] else "succeeded")
+        if state["canceled"]:
+            status = "canceled"
+        elif state["stalled"]:
+            status = "processing"
+        data: Dict[str, Any] = {
+            "id": state["id"],
+            "model": state["model"],
+            "version": state["version"],
+            "input": state["input"],
+            "output": None,
+            "logs": "",
+            "error": None,
+            "metrics": None,
+            "status": status,
+            "created_at": _iso(state["created"]),
+            "started_at": _iso(state["started_at"]),
+            "completed_at": None,
+            "urls": {
+                "get": f"{self.base_url}/v1/predictions/{state['id']}",
+                "cancel": f"{self.base_url}/v1/predictions/{state['id']}/cancel",
+                "stream": f"{self.base_url}/v1/streams/{state['id']}",
+            },
+        }
+        if status == "failed":
+            data["error"] = "Prediction failed (injected by fake server)"
+            data["completed_at"] = _iso(state["ready_at"])
+        elif status == "succeeded":
+            data["output"] = _tokens(output) if state["is_llm"] else output
+            data["completed_at"] = _iso(state["ready_at"])
+            metrics: Dict[str, Any] = {"predict_time": round(state["delay"], 4)}
+            if state["is_llm"]:
+                prompt = f"{state['input'].get('system_prompt', '')}{state['input'].get('prompt', '')}"
+                metrics["input_token_count"] = max(1, len(prompt) // 4)
+                metrics["output_token_count"] = len(_tokens(output))
+            data["metrics"] = metrics
+        return data
+
+    def wait(self, state: Dict[str, Any], max_wait: float) -> None:
+        remaining = (state["ready_at"] - _now()).total_seconds()
+        if remaining > 0:
+            time.sleep(min(remaining, max_wait))
+
+    def add_file(self, content: bytes) -> Dict[str, Any]:
+        file_id = uuid.uuid4().hex[:16]
+        time.sleep(self._sample(self.config.upload_latency))
+        with self._lock:
+            self._files[file_id] = content
+            self.stats["uploads"] += 1
+        now = _now()
+        return {
+            "id": file_id,
+            "name": f"{file_id}.bin",
+            "content_type": "application/octet-stream",
+            "size": len(content),
+            "etag": file_id,
+            "checksums": {},
+            "metadata": {},
+            "created_at": _iso(now),
+            "expires_at": _iso(now + timedelta(days=1)),
+            "urls": {"get": f"{self.base_url}/files/{file_id}"},
+        }
+
+    def file_content(self, name: str) -> Optional[bytes]:
+        self._count("downloads")
+        if name == "render.png":
+            return self.image_png
+        with self._lock:
+            return self._files.get(name)
+
+
+def _tokens(text: str) -> list:
+    """Split output into small chunks the way streaming LLMs emit them"""
+    return re.findall(r"\S+\s*|\s+", text) or [text]
+
+
+def _llm_response(input_data: Dict[str, Any]) -> str:
+    """Plausible output for each kind of LLM call the pipeline makes"""
+    wants_json = (input_data.get("response_format") or {}).get("type") == "json_object"
+    if not wants_json:
+        return TEXT_RESPONSE
+    if input_data.get("image_input"):
+        return json.dumps({
+            "detected_text": [TEXT_RESPONSE],
+            "brand_name_found": True,
+            "brand_name_matches": [TEXT_RESPONSE],
+            "logo_visible": True,
+            "logo_description": "Logo in the top left corner",
+            "campaign_message_found": True,
+            "compliance_status": "compliant",
+            "compliance_notes": "Fake compliance result",
+        })
+    if '"brand_names"' in str(input_data.get("prompt", "")):
+        # Suggestions: numbered candidates of each kind
+        count = int(re.match(r"Generate (\d+)", str(input_data["prompt"])).group(1))
+        return json.dumps({
+            "brand_names": [f"Trail Brand {i + 1}" for i in range(count)],
+            "campaign_messages": [f"{TEXT_RESPONSE} {i + 1}" for i in range(count)],
+        })
+    prompt = {
+        "image_prompt": "A photorealistic advertising banner on a mountain trail at golden hour, "
+                        "the brand logo in the top left corner and the headline in bold type. " * 4
+                        + f'The headline reads "{TEXT_RESPONSE}".',
+        "translated_campaign_message": TEXT_RESPONSE,
+        "brand_mentions": 2,
+        "includes_logo": True,
+        "includes_campaign_message": True,
+    }
+    markets = re.search(r"^Target Markets: (.+)$", str(input_data.get("prompt", "")), re.MULTILINE)
+    if markets:
+        # Batched market prompts: one entry per listed market
+        return json.dumps({"markets": [
+            dict(prompt, target_market=market.strip()) for market in markets.group(1).split(",")
+        ]})
+    return json.dumps(prompt)
+
+
+def _make_handler(fake: FakeReplicate):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # noqa: A002 - quiet by default
+            pass
+
+        def _read_body(self) -> bytes:
+            length = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(length) if length else b""
+
+        def _send(self, status: int, body: bytes, content_type: str = "application/json",
+                  headers: Optional[Dict[str, str]] = None) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, status: int, data: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+            self._send(status, json.dumps(data).encode(), headers=headers)
+
+        def _prefer_wait(self) -> Optional[float]:
+            match = re.match(r"wait(?:=(\d+))?", self.headers.get("Prefer", ""))
+            if not match:
+                return None
+            return float(match.group(1) or 60)
+
+        def do_POST(self):  # noqa: N802
+            body = self._read_body()
+            if self.path == "/v1/files":
+                self._json(201, fake.add_file(body))
+                return
+
+            model_match = re.fullmatch(r"/v1/models/([^/]+/[^/]+)/predictions", self.path)
+            if model_match or self.path == "/v1/predictions":
+                if fake.should_rate_limit():
+                    self._json(429, {"title": "Too Many Requests", "status": 429,
+                                     "detail": "Request was throttled (rate limit injected by fake server)"},
+                               headers={"Retry-After": "1"})
+                    return
+                data = json.loads(body or b"{}")
+                model = model_match.group(1) if model_match else f"version/{data.get('version', 'unknown')}"
+                state = fake.create_prediction(model, data, stream=bool(data.get("stream")))
+                max_wait = self._prefer_wait()
+                if max_wait is not None and not state["is_llm"]:
+                    fake.wait(state, max_wait)
+                self._json(201, fake.to_json(state))
+                return
+
+            cancel_match = re.fullmatch(r"/v1/predictions/([^/]+)/cancel", self.path)
+            if cancel_match and fake.get(cancel_match.group(1)):
+                fake.cancel(fake.get(cancel_match.group(1)))
+                self._json(200, fake.to_json(fake.get(cancel_match.group(1))))
+                return
+            self._json(404, {"title": "Not Found", "status": 404, "detail": self.path})
+
+        def do_GET(self):  # noqa: N802
+            prediction_match = re.fullmatch(r"/v1/predictions/([^/]+)", self.path)
+            if prediction_match:
+                state = fake.get(prediction_match.group(1))
+                if state is None:
+                    self._json(404, {"title": "Not Found", "status": 404, "detail": "No such prediction"})
+                else:
+                    self._json(200, fake.to_json(state))
+                return
+
+            stream_match = re.fullmatch(r"/v1/streams/([^/]+)", self.path)
+            if stream_match and fake.get(stream_match.group(1)):
+                self._stream(fake.get(stream_match.group(1)))
+                return
+
+            file_match = re.fullmatch(r"/files/([^/]+)", self.path)
+            if file_match:
+                content = fake.file_content(file_match.group(1))
+                if content is not None:
+                    content_type = "image/png" if file_match.group(1).endswith(".png") else "application/octet-stream"
+                    self._send(200, content, content_type)
+                    return
+            self._json(404, {"title": "Not Found", "status": 404, "detail": self.path})
+
+        def _stream(self, state: Dict[str, Any]) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-store")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            try:
+                self._write_events(state)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Client went away (deadline or lost hedge)
+
+        def _write_events(self, state: Dict[str, Any]) -> None:
+            fake.wait(state, max_wait=600)
+            if state["failed"]:
+                self.wfile.write(b"event: error\nid: 1\ndata: Prediction failed (injected by fake server)\n\n")
+                return
+            tokens = _tokens(state["output"])
+            for i, token in enumerate(tokens, 1):
+                if state["stalled"] and i > len(tokens) // 2:
+                    # Hold the connection open without output until the prediction is canceled
+                    deadline = time.monotonic() + 600
+                    while not state["canceled"] and time.monotonic() < deadline:
+                        time.sleep(0.05)
+                    return
+                data = "\n".join(f"data: {line}" for line in token.split("\n"))
+                self.wfile.write(f"event: output\nid: {i}\n{data}\n\n".encode())
+                self.wfile.flush()
+                if fake.config.token_interval:
+                    time.sleep(fake.config.token_interval)
+            self.wfile.write(b"event: done\nid: done\ndata: {}\n\n")
+
+    return Handler
+
+
+def start_server(config: Optional[FakeConfig] = None, host: str = "127.0.0.1",
+                 port: int = 0) -> Tuple[ThreadingHTTPServer, FakeReplicate]:
+    """
+    Start the fake server in a background thread
+
+    Args:
+        config: Server behavior (default: FakeConfig())
+        host: Interface to bind
+        port: Port to bind (0 picks a free one)
+
+    Returns:
+        Tuple of (server, fake state); the base URL is ``fake.base_url``
+    """
+    fake = FakeReplicate(config or FakeConfig())
+    server = ThreadingHTTPServer((host, port), _make_handler(fake))
+    server.daemon_threads = True
+    fake.base_url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name="fake-replicate", daemon=True).start()
+    return server, fake
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the fake server behavior options to a parser"""
+    parser.add_argument("--render-latency", default="2.0:0.3",
+                        help="Image prediction latency as median[:sigma] seconds (default: 2.0:0.3)")
+    parser.add_argument("--llm-latency", default="0.3:0.3",
+                        help="LLM time to first token as median[:sigma] seconds (default: 0.3:0.3)")
+    parser.add_argument("--token-interval", type=float, default=0.005,
+                        help="Seconds between streamed tokens (default: 0.005)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of predictions that fail (default: 0)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="Fraction of prediction requests rejected with 429 (default: 0)")
+    parser.add_argument("--stall-rate", type=float, default=0.0,
+                        help="Fraction of LLM streams that stall mid-output until canceled (default: 0)")
+    parser.add_argument("--image-size", type=int, default=1024,
+                        help="Rendered image size in pixels (default: 1024)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible runs")
+
+
+def config_from_args(args: argparse.Namespace) -> FakeConfig:
+    return FakeConfig(
+        render_latency=Latency.parse(args.render_latency),
+        llm_latency=Latency.parse(args.llm_latency),
+        token_interval=args.token_interval,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        stall_rate=args.stall_rate,
+        image_size=args.image_size,
+        seed=args.seed,
+    )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run a local fake Replicate API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server, fake = start_server(config_from_args(args), args.host, args.port)
+    print(f"Fake Replicate listening on {fake.base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
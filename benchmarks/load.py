@@ -0,0 +1,328 @@
+"""
+Load Test - Open-loop load against the HTTP API with a fake model layer
+
+Simulated users arrive at a target rate and each runs a realistic session:
+submit a campaign, poll its status, list the images, download them and, for
+a share of sessions, run a compliance check. The rate is stepped up until
+the backend saturates. Each step records per-endpoint latency percentiles,
+error rates, job latency and the server's queue depth.
+
+Every model call is served by benchmarks.fake_replicate, so nothing is billed.
+The summary JSON has a stable layout (sorted keys) and can be diffed between
+versions, or compared directly with ``--compare``.
+
+Examples:
+    python -m benchmarks.load --rates 0.5,1,2,4 --duration 30
+    python -m benchmarks.load --rates 1,2 --compliance-share 0.5 --output load.json
+    python -m benchmarks.load --rates 1,2 --compare load.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .fake_replicate import add_config_arguments, config_from_args, start_server
+from .run import ApiServer, distribution, prepare_workdir
+
+# Gauges scraped from /metrics while a step runs
+SCRAPED_GAUGES = ("easy_ads_queue_depth", "easy_ads_active_jobs")
+
+
+@dataclass
+class StepRecorder:
+    """Requests and sessions observed during one rate step"""
+    latencies: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: Dict[str, Dict[str, int]] = field(default_factory=lambda: defaultdict(lambda: defaultdict(int)))
+    job_latencies: List[float] = field(default_factory=list)
+    sessions: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    gauges: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+
+    async def request(self, client: httpx.AsyncClient, endpoint: str, method: str, url: str,
+                      **kwargs: Any) -> Optional[httpx.Response]:
+        """
+        Send a request and record its latency under the endpoint name
+
+        Returns:
+            The response for 2xx statuses, None otherwise
+        """
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.latencies[endpoint].append(time.perf_counter() - start)
+            self.errors[endpoint][type(e).__name__] += 1
+            return None
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        if response.is_success:
+            return response
+        self.errors[endpoint][str(response.status_code)] += 1
+        return None
+
+    def summary(self) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            errors = dict(self.errors.get(endpoint, {}))
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "errors": sum(errors.values()),
+                "error_rate": round(sum(errors.values()) / len(latencies), 4) if latencies else 0.0,
+                "errors_by_status": errors,
+                "latency_seconds": distribution(latencies),
+            }
+        return {
+            "endpoints": endpoints,
+            "job_latency": distribution(self.job_latencies),
+            "sessions": dict(self.sessions),
+            "server": {name: {"max": max(values), "mean": round(sum(values) / len(values), 2)}
+                       for name, values in self.gauges.items() if values},
+        }
+
+
+async def run_session(client: httpx.AsyncClient, recorder: StepRecorder, campaign: Dict[str, Any],
+                      args: argparse.Namespace, rng: random.Random) -> None:
+    """One simulated user: submit, poll, list and download images, maybe check compliance"""
+    recorder.sessions["started"] += 1
+    start = time.perf_counter()
+    response = await recorder.request(client, "POST /api/generate", "POST", "/api/generate", json=campaign)
+    if response is None:
+        recorder.sessions["submit_failed"] += 1
+        return
+    job_id = response.json()["job_id"]
+
+    deadline = start + args.job_timeout
+    status = "pending"
+    while status not in ("completed", "failed"):
+        if time.perf_counter() > deadline:
+            recorder.sessions["timed_out"] += 1
+            return
+        await asyncio.sleep(args.poll_interval)
+        response = await recorder.request(client, "GET /api/status/{job_id}", "GET", f"/api/status/{job_id}")
+        if response is not None:
+            status = response.json()["status"]
+    recorder.job_latencies.append(time.perf_counter() - start)
+    if status == "failed":
+        recorder.sessions["job_failed"] += 1
+        return
+
+    response = await recorder.request(client, "GET /api/images/{job_id}", "GET", f"/api/images/{job_id}")
+    if response is None:
+        recorder.sessions["images_failed"] += 1
+        return
+    result = response.json()
+    images = result.get("images", [])
+    await asyncio.gather(*(
+        recorder.request(client, "GET /outputs/{path}", "GET", image["url"]) for image in images
+    ))
+
+    if images and rng.random() < args.compliance_share:
+        await recorder.request(client, "POST /api/check-compliance", "POST", "/api/check-compliance", json={
+            "image_paths": [image["path"] for image in images],
+            "brand_name": result.get("brand_name") or "Brand",
+            "campaign_message": result.get("campaign_message"),
+        })
+    recorder.sessions["completed"] += 1
+
+
+async def scrape_gauges(client: httpx.AsyncClient, recorder: StepRecorder, interval: float) -> None:
+    """Sample queue depth and active jobs from /metrics until cancelled"""
+    while True:
+        try:
+            response = await client.get("/metrics")
+            for line in response.text.splitlines():
+                name, _, value = line.partition(" ")
+                if name in SCRAPED_GAUGES:
+                    recorder.gauges[name].append(float(value))
+        except (httpx.HTTPError, ValueError):
+            pass
+        await asyncio.sleep(interval)
+
+
+async def run_step(client: httpx.AsyncClient, rate: float, campaign: Dict[str, Any],
+                   args: argparse.Namespace, rng: random.Random) -> Dict[str, Any]:
+    """
+    Start sessions at ``rate`` per second for ``args.duration`` seconds, then drain
+
+    Arrivals are Poisson (exponential gaps) unless ``--arrivals uniform``, and
+    independent of how fast the server answers, so a saturated server shows up
+    as growing latency and queue depth rather than a lower offered rate.
+    """
+    recorder = StepRecorder()
+    scraper = asyncio.create_task(scrape_gauges(client, recorder, args.scrape_interval))
+    sessions = []
+    start = time.perf_counter()
+    next_arrival = start
+    while next_arrival < start + args.duration:
+        await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+        sessions.append(asyncio.create_task(run_session(client, recorder, campaign, args, rng)))
+        gap = 1.0 / rate
+        next_arrival += rng.expovariate(rate) if args.arrivals == "poisson" else gap
+    await asyncio.gather(*sessions)
+    elapsed = time.perf_counter() - start
+    scraper.cancel()
+
+    summary = recorder.summary()
+    completed = summary["sessions"].get("completed", 0)
+    requests = sum(e["requests"] for e in summary["endpoints"].values())
+    errors = sum(e["errors"] for e in summary["endpoints"].values())
+    summary.update({
+        "offered_rate": rate,
+        "elapsed_seconds": round(elapsed, 3),
+        "completed_per_second": round(completed / elapsed, 4) if elapsed else 0.0,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+    })
+    summary["saturated"] = _is_saturated(summary, args)
+    return summary
+
+
+def _is_saturated(step: Dict[str, Any], args: argparse.Namespace) -> bool:
+    """A step is saturated once completions fall behind arrivals, errors rise or jobs get too slow"""
+    sessions = step["sessions"]
+    started = sessions.get("started", 0)
+    if not started:
+        return False
+    completed_share = sessions.get("completed", 0) / started
+    p95 = step["job_latency"].get("p95")
+    return (completed_share < 1 - args.max_error_rate
+            or step["error_rate"] > args.max_error_rate
+            or (args.latency_slo is not None and p95 is not None and p95 > args.latency_slo))
+
+
+async def run_load(args: argparse.Namespace, api_url: str, campaign: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=api_url, timeout=args.request_timeout, limits=limits) as client:
+        steps = []
+        for rate in args.rates:
+            print(f"→ {rate:g} sessions/s for {args.duration:g}s...", flush=True)
+            step = await run_step(client, rate, campaign, args, rng)
+            steps.append(step)
+            print_step(step)
+            if step["saturated"] and args.stop_at_saturation:
+                break
+    return steps
+
+
+def print_step(step: Dict[str, Any]) -> None:
+    job = step["job_latency"]
+    sessions = step["sessions"]
+    flag = "  ✗ SATURATED" if step["saturated"] else ""
+    print(f"  sessions {sessions.get('completed', 0)}/{sessions.get('started', 0)} completed, "
+          f"{step['completed_per_second']:.2f}/s, errors {step['error_rate']:.1%}{flag}")
+    if job.get("count"):
+        print(f"  job latency p50 {job['p50']:.2f}s  p95 {job['p95']:.2f}s  p99 {job['p99']:.2f}s")
+    queue = step["server"].get("easy_ads_queue_depth")
+    if queue:
+        print(f"  queue depth max {queue['max']:g}, mean {queue['mean']:g}")
+    print(f"  {'endpoint':<30} {'requests':>8} {'errors':>7} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, endpoint in step["endpoints"].items():
+        latency = endpoint["latency_seconds"]
+        print(f"  {name:<30} {endpoint['requests']:>8} {endpoint['errors']:>7} "
+              f"{latency['p50']:>8.4f} {latency['p95']:>8.4f} {latency['p99']:>8.4f}")
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]) -> None:
+    """Print per-rate, per-endpoint p95 changes against a previous summary"""
+    print(f"\nSaturation point: {previous.get('saturation_rate')} -> {current.get('saturation_rate')} sessions/s")
+    previous_steps = {step["offered_rate"]: step for step in previous.get("steps", [])}
+    for step in current["steps"]:
+        old_step = previous_steps.get(step["offered_rate"])
+        if old_step is None:
+            continue
+        print(f"\n{step['offered_rate']:g} sessions/s")
+        rows = [("job", step["job_latency"], old_step["job_latency"])]
+        for name, endpoint in step["endpoints"].items():
+            old_endpoint = old_step["endpoints"].get(name)
+            if old_endpoint:
+                rows.append((name, endpoint["latency_seconds"], old_endpoint["latency_seconds"]))
+        for name, new, old in rows:
+            if not new.get("count") or not old.get("count"):
+                continue
+            change = (new["p95"] - old["p95"]) / old["p95"] if old["p95"] else 0.0
+            print(f"  {name:<30} p95 {old['p95']:>8.4f} -> {new['p95']:>8.4f} ({change:+.1%})")
+
+
+def _rates(value: str) -> List[float]:
+    return [float(rate) for rate in value.split(",") if rate.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the HTTP API against a fake Replicate server")
+    parser.add_argument("--rates", type=_rates, default=[0.5, 1.0, 2.0, 4.0],
+                        help="Comma-separated session arrival rates per second, run in order (default: 0.5,1,2,4)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of arrivals per rate (default: 30)")
+    parser.add_argument("--arrivals", choices=("poisson", "uniform"), default="poisson",
+                        help="Arrival process (default: poisson)")
+    parser.add_argument("--poll-interval", type=float, default=1.0,
+                        help="Seconds between status polls per session, as the frontend does (default: 1.0)")
+    parser.add_argument("--compliance-share", type=float, default=0.2,
+                        help="Share of sessions that run a compliance check (default: 0.2)")
+    parser.add_argument("--job-timeout", type=float, default=600.0,
+                        help="Give up on a job after this many seconds (default: 600)")
+    parser.add_argument("--request-timeout", type=float, default=60.0, help="Per-request timeout (default: 60)")
+    parser.add_argument("--max-connections", type=int, default=200, help="Client connection pool size (default: 200)")
+    parser.add_argument("--scrape-interval", type=float, default=1.0,
+                        help="Seconds between /metrics scrapes (default: 1.0)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="Error rate above which a step counts as saturated (default: 0.01)")
+    parser.add_argument("--latency-slo", type=float, default=None,
+                        help="p95 job latency in seconds above which a step counts as saturated")
+    parser.add_argument("--stop-at-saturation", action="store_true", help="Skip the remaining rates once saturated")
+    parser.add_argument("--output", help="Write the summary as JSON to this file")
+    parser.add_argument("--compare", help="Summary JSON of a previous run to compare against")
+    parser.add_argument("--keep-workdir", action="store_true",
+                        help="Keep the scratch directory with outputs and logs")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.seed is None:
+        args.seed = 0
+
+    fake_server, fake = start_server(config_from_args(args))
+    workdir = Path(tempfile.mkdtemp(prefix="easy-ads-load-"))
+    try:
+        prepare_workdir(workdir)
+        campaign = json.loads((workdir / "examples" / "campaign.json").read_text())
+        with ApiServer(workdir, fake.base_url) as server:
+            steps = asyncio.run(run_load(args, server.url, campaign))
+    finally:
+        fake_server.shutdown()
+        if args.keep_workdir:
+            print(f"\nWorkdir kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    saturated = [step["offered_rate"] for step in steps if step["saturated"]]
+    sustained = [step["offered_rate"] for step in steps if not step["saturated"]]
+    summary = {
+        "config": {key: value for key, value in sorted(vars(args).items())
+                   if key not in ("output", "compare", "keep_workdir")},
+        "steps": steps,
+        "saturation_rate": saturated[0] if saturated else None,
+        "max_sustained_rate": max(sustained) if sustained else None,
+        "server": {"cpu_seconds": round(server.cpu_seconds, 3), "peak_rss_mb": round(server.peak_rss_mb, 1)},
+        "fake_server": dict(fake.stats),
+    }
+    print(f"\nMax sustained rate: {summary['max_sustained_rate']} sessions/s, "
+          f"saturated at: {summary['saturation_rate']}")
+    print(f"Server CPU {server.cpu_seconds:.1f}s, peak RSS {server.peak_rss_mb:.1f} MB")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(summary, indent=2, sort_keys=True) + "\n")
+        print(f"Summary written to {args.output}")
+    if args.compare:
+        compare(summary, json.loads(Path(args.compare).read_text()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
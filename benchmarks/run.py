@@ -0,0 +1,477 @@
+"""
+Benchmark Runner - End-to-end pipeline benchmarks against the fake Replicate server
+
+Runs the CLI (main.py) and the FastAPI app offline, with every model call
+served by benchmarks.fake_replicate, and reports throughput, job latency
+percentiles, CPU time and peak RSS overall and per pipeline stage.
+
+Scenarios:
+    cli  Run main.py as separate processes, ``--concurrency`` at a time
+    api  Start the API server and keep ``--concurrency`` jobs in flight
+
+Examples:
+    python -m benchmarks.run cli --jobs 10 --concurrency 2
+    python -m benchmarks.run api --jobs 50 --concurrency 8 --render-latency 1.5:0.4 --output results.json
+    python -m benchmarks.run api --jobs 50 --baseline results.json --tolerance 0.2
+
+Requires a POSIX system (per-process CPU and memory come from os.wait4).
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+
+from .fake_replicate import add_config_arguments, config_from_args, start_server
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Copied into the scratch workdir, so benchmark outputs never land in the repo
+WORKDIR_CONTENTS = ("main.py", "pipeline", "backend", "assets", "examples")
+
+# Summary metrics compared against a baseline, with the direction that is better
+BASELINE_METRICS = {
+    "throughput_jobs_per_min": "higher",
+    "job_latency.p50": "lower",
+    "job_latency.p95": "lower",
+    "cpu_seconds_per_job": "lower",
+    "peak_rss_mb": "lower",
+}
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Linearly interpolated percentile (q in 0-100) of values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def distribution(values: Iterable[Optional[float]]) -> Dict[str, Any]:
+    """Count, mean, p50/p95/p99 and max of the non-empty values"""
+    values = [v for v in values if v is not None]
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def _rusage_cpu(rusage) -> float:
+    return rusage.ru_utime + rusage.ru_stime
+
+
+def _rusage_rss_mb(rusage) -> float:
+    # Linux reports kilobytes, macOS bytes
+    return rusage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def prepare_workdir(root: Path) -> Path:
+    """Copy the application into a scratch directory"""
+    ignore = shutil.ignore_patterns("__pycache__", "*.pyc", "outputs", ".cache")
+    for name in WORKDIR_CONTENTS:
+        source = PROJECT_ROOT / name
+        if source.is_dir():
+            shutil.copytree(source, root / name, ignore=ignore)
+        elif source.exists():
+            shutil.copy2(source, root / name)
+    return root
+
+
+def benchmark_env(base_url: str, workdir: Path) -> Dict[str, str]:
+    """Environment that sends every Replicate call to the fake server"""
+    env = dict(os.environ)
+    env.update({
+        "REPLICATE_BASE_URL": base_url,
+        "REPLICATE_API_TOKEN": "fake-benchmark-token",
+        "REFERENCE_IMAGES": "true",
+        "REFERENCE_CACHE_DIR": str(workdir / ".cache" / "reference_images"),
+        "TRANSLATION_MEMORY_PATH": str(workdir / ".cache" / "translation_memory.json"),
+        "LOG_FILE": str(workdir / "pipeline.log"),
+        "PYTHONDONTWRITEBYTECODE": "1",
+    })
+    return env
+
+
+def summarize_reports(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-stage and per-remote-operation statistics from pipeline reports"""
+    steps: Dict[str, Dict[str, List[Optional[float]]]] = {}
+    calls: Dict[str, Dict[str, List[Optional[float]]]] = {}
+    hedging = {"fired": 0, "won": 0, "denied": 0, "extra_cost_usd": 0.0}
+    total_calls = 0
+    for report in reports:
+        accounting = report.get("accounting") or {}
+        total_calls += accounting.get("calls", 0)
+        for key, value in (accounting.get("hedging") or {}).items():
+            hedging[key] = hedging.get(key, 0) + value
+        for step in report.get("steps", []):
+            stats = steps.setdefault(step["step_name"], {"seconds": [], "cpu": [], "rss": [], "failed": []})
+            stats["seconds"].append(step.get("duration_seconds"))
+            stats["cpu"].append(step.get("cpu_seconds"))
+            stats["rss"].append(step.get("peak_rss_mb"))
+            stats["failed"].append(1.0 if step.get("status") == "failed" else 0.0)
+        for call in report.get("remote_calls", []):
+            stats = calls.setdefault(call["operation"], {"first_byte": [], "total": [], "failed": []})
+            stats["first_byte"].append(call.get("first_byte_seconds"))
+            stats["total"].append(call.get("total_seconds"))
+            stats["failed"].append(1.0 if call.get("status") == "failed" else 0.0)
+
+    stages = {}
+    for name, stats in steps.items():
+        cpu = [v for v in stats["cpu"] if v is not None]
+        rss = [v for v in stats["rss"] if v is not None]
+        stages[name] = {
+            "seconds": distribution(stats["seconds"]),
+            "cpu_seconds_mean": round(sum(cpu) / len(cpu), 4) if cpu else None,
+            "peak_rss_mb": max(rss) if rss else None,
+            "failed": int(sum(stats["failed"])),
+        }
+    remote = {
+        name: {
+            "first_byte_seconds": distribution(stats["first_byte"]),
+            "total_seconds": distribution(stats["total"]),
+            "failed": int(sum(stats["failed"])),
+        }
+        for name, stats in calls.items()
+    }
+    hedging["extra_cost_usd"] = round(hedging["extra_cost_usd"], 6)
+    hedging["hedge_rate"] = round(hedging["fired"] / total_calls, 4) if total_calls else 0.0
+    return {"stages": stages, "remote_calls": remote, "hedging": hedging}
+
+
+def _summary(scenario: str, args: argparse.Namespace, jobs: List[Dict[str, Any]], wall: float,
+             cpu_seconds: float, peak_rss_mb: float, reports: List[Dict[str, Any]],
+             fake_stats: Dict[str, int]) -> Dict[str, Any]:
+    succeeded = [job for job in jobs if job["status"] == "completed"]
+    summary = {
+        "scenario": scenario,
+        "jobs": len(jobs),
+        "succeeded": len(succeeded),
+        "failed": len(jobs) - len(succeeded),
+        "concurrency": args.concurrency,
+        "wall_seconds": round(wall, 3),
+        "throughput_jobs_per_min": round(len(succeeded) / wall * 60, 3) if wall else 0.0,
+        "job_latency": distribution(job["seconds"] for job in succeeded),
+        "cpu_seconds": round(cpu_seconds, 3),
+        "cpu_seconds_per_job": round(cpu_seconds / len(jobs), 4) if jobs else None,
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "fake_server": {
+            "render_latency": args.render_latency,
+            "llm_latency": args.llm_latency,
+            "error_rate": args.error_rate,
+            "rate_limit_rate": args.rate_limit_rate,
+            **fake_stats,
+        },
+    }
+    summary.update(summarize_reports(reports))
+    return summary
+
+
+def _load_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def run_cli(args: argparse.Namespace, base_url: str, workdir: Path) -> Dict[str, Any]:
+    """Run main.py as one process per job"""
+    env = benchmark_env(base_url, workdir)
+
+    def run_job(index: int) -> Dict[str, Any]:
+        # Each job gets its own working directory so outputs and reports don't collide
+        job_dir = workdir / f"cli-{index:04d}"
+        job_dir.mkdir()
+        for name in ("examples", "assets"):
+            (job_dir / name).symlink_to(workdir / name)
+        with open(job_dir / "stdout.log", "wb") as log:
+            start = time.perf_counter()
+            proc = subprocess.Popen([sys.executable, str(workdir / "main.py")], cwd=job_dir,
+                                    env=env, stdout=log, stderr=subprocess.STDOUT)
+            _, status, rusage = os.wait4(proc.pid, 0)
+            seconds = time.perf_counter() - start
+            proc.returncode = os.waitstatus_to_exitcode(status)
+
+        report = None
+        for path in sorted((job_dir / "outputs").rglob("report_*.json")):
+            report = _load_json(path)
+        ok = proc.returncode == 0 and report is not None and report.get("status") == "completed"
+        return {
+            "status": "completed" if ok else "failed",
+            "seconds": seconds,
+            "cpu_seconds": _rusage_cpu(rusage),
+            "peak_rss_mb": _rusage_rss_mb(rusage),
+            "report": report,
+        }
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        jobs = list(pool.map(run_job, range(args.jobs)))
+    wall = time.perf_counter() - start
+
+    reports = [job["report"] for job in jobs if job["report"]]
+    summary = _summary("cli", args, jobs, wall,
+                       cpu_seconds=sum(job["cpu_seconds"] for job in jobs),
+                       peak_rss_mb=max((job["peak_rss_mb"] for job in jobs), default=0.0),
+                       reports=reports, fake_stats={})
+    summary["job_cpu_seconds"] = distribution(job["cpu_seconds"] for job in jobs)
+    summary["job_peak_rss_mb"] = distribution(job["peak_rss_mb"] for job in jobs)
+    return summary
+
+
+class ApiServer:
+    """The API server as a subprocess of the benchmark, served from a scratch workdir"""
+
+    def __init__(self, workdir: Path, base_url: str, startup_timeout: float = 60.0):
+        """
+        Args:
+            workdir: Directory prepared by prepare_workdir()
+            base_url: Fake Replicate server URL
+            startup_timeout: Seconds to wait for the server to answer
+        """
+        self.workdir = workdir
+        self.base_url = base_url
+        self.startup_timeout = startup_timeout
+        self.url = ""
+        self.cpu_seconds = 0.0
+        self.peak_rss_mb = 0.0
+        self._proc: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> "ApiServer":
+        port = _free_port()
+        self.url = f"http://127.0.0.1:{port}"
+        with open(self.workdir / "server.log", "ab") as log:
+            self._proc = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1",
+                 "--port", str(port), "--no-access-log"],
+                cwd=self.workdir, env=benchmark_env(self.base_url, self.workdir),
+                stdout=log, stderr=subprocess.STDOUT)
+        try:
+            self._wait_until_ready()
+        except BaseException:
+            self._stop()
+            raise
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop()
+
+    def _wait_until_ready(self) -> None:
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self._proc.poll() is not None:
+                raise RuntimeError(f"API server exited with code {self._proc.returncode} "
+                                   f"(see {self.workdir / 'server.log'})")
+            try:
+                if httpx.get(f"{self.url}/", timeout=2.0).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"API server did not start within {self.startup_timeout:.0f}s")
+
+    def _stop(self) -> None:
+        """Shut down gracefully and collect the server's CPU time and peak RSS"""
+        proc = self._proc
+        if proc is None or proc.returncode is not None:
+            return
+        proc.send_signal(signal.SIGINT)
+        timer = threading.Timer(30.0, proc.kill)
+        timer.start()
+        try:
+            _, status, rusage = os.wait4(proc.pid, 0)
+        finally:
+            timer.cancel()
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        self.cpu_seconds = _rusage_cpu(rusage)
+        self.peak_rss_mb = _rusage_rss_mb(rusage)
+
+
+def run_api(args: argparse.Namespace, base_url: str, workdir: Path) -> Dict[str, Any]:
+    """Start the API server and push jobs through it"""
+    campaign = json.loads((workdir / "examples" / "campaign.json").read_text())
+
+    with ApiServer(workdir, base_url) as server, \
+            httpx.Client(base_url=server.url, timeout=30.0) as client:
+
+        def run_job(_: int) -> Dict[str, Any]:
+            start = time.perf_counter()
+            response = client.post("/api/generate", json=campaign)
+            response.raise_for_status()
+            job_id = response.json()["job_id"]
+            while True:
+                status = client.get(f"/api/status/{job_id}").json()["status"]
+                if status in ("completed", "failed"):
+                    break
+                time.sleep(args.poll_interval)
+            return {"job_id": job_id, "status": status, "seconds": time.perf_counter() - start}
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            jobs = list(pool.map(run_job, range(args.jobs)))
+        wall = time.perf_counter() - start
+
+        reports = []
+        for job in jobs:
+            response = client.get(f"/api/jobs/{job['job_id']}/report")
+            if response.status_code == 200:
+                reports.append(response.json())
+
+    return _summary("api", args, jobs, wall, cpu_seconds=server.cpu_seconds,
+                    peak_rss_mb=server.peak_rss_mb, reports=reports, fake_stats={})
+
+
+SCENARIOS = {"cli": run_cli, "api": run_api}
+
+
+def _lookup(summary: Dict[str, Any], dotted: str) -> Optional[float]:
+    value: Any = summary
+    for key in dotted.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value if isinstance(value, (int, float)) else None
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compare headline metrics against a previous run
+
+    Args:
+        results: Results of this run, keyed by scenario
+        baseline: Results of a previous run, keyed by scenario
+        tolerance: Allowed relative regression (0.2 = 20%)
+
+    Returns:
+        One message per regressed metric
+    """
+    regressions = []
+    for scenario, summary in results.items():
+        previous = baseline.get(scenario)
+        if not previous:
+            continue
+        for metric, better in BASELINE_METRICS.items():
+            new, old = _lookup(summary, metric), _lookup(previous, metric)
+            if new is None or not old:
+                continue
+            change = (new - old) / old
+            if (better == "lower" and change > tolerance) or (better == "higher" and change < -tolerance):
+                regressions.append(f"{scenario} {metric}: {old:g} -> {new:g} ({change:+.1%})")
+    return regressions
+
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    latency = summary["job_latency"]
+    print(f"\n=== {summary['scenario']}: {summary['succeeded']}/{summary['jobs']} jobs succeeded "
+          f"in {summary['wall_seconds']:.1f}s (concurrency {summary['concurrency']}) ===")
+    print(f"Throughput:  {summary['throughput_jobs_per_min']:.2f} jobs/min")
+    if latency.get("count"):
+        print(f"Job latency: p50 {latency['p50']:.2f}s  p95 {latency['p95']:.2f}s  "
+              f"p99 {latency['p99']:.2f}s  max {latency['max']:.2f}s")
+    print(f"CPU:         {summary['cpu_seconds']:.2f}s total, {summary['cpu_seconds_per_job'] or 0:.3f}s per job")
+    print(f"Peak RSS:    {summary['peak_rss_mb']:.1f} MB")
+
+    print(f"\n{'Stage':<32} {'p50':>8} {'p95':>8} {'p99':>8} {'cpu':>8} {'rss MB':>8} {'failed':>7}")
+    for name, stage in summary["stages"].items():
+        seconds = stage["seconds"]
+        if not seconds.get("count"):
+            continue
+        cpu = stage["cpu_seconds_mean"]
+        rss = stage["peak_rss_mb"]
+        print(f"{name:<32} {seconds['p50']:>8.3f} {seconds['p95']:>8.3f} {seconds['p99']:>8.3f} "
+              f"{cpu if cpu is not None else float('nan'):>8.3f} {rss if rss is not None else float('nan'):>8.1f} "
+              f"{stage['failed']:>7}")
+
+    print(f"\n{'Remote call':<32} {'ttfb p50':>9} {'ttfb p95':>9} {'total p50':>10} {'total p95':>10}")
+    for name, call in summary["remote_calls"].items():
+        first, total = call["first_byte_seconds"], call["total_seconds"]
+        if not total.get("count"):
+            continue
+        print(f"{name:<32} {first.get('p50', float('nan')):>9.3f} {first.get('p95', float('nan')):>9.3f} "
+              f"{total['p50']:>10.3f} {total['p95']:>10.3f}")
+
+    hedging = summary.get("hedging") or {}
+    if hedging.get("fired") or hedging.get("denied"):
+        print(f"\nHedging:     {hedging['fired']} fired ({hedging['hedge_rate']:.1%} of calls), "
+              f"{hedging['won']} won, {hedging['denied']} over budget, "
+              f"~${hedging['extra_cost_usd']:.4f} extra")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline offline against a fake Replicate server")
+    parser.add_argument("scenarios", nargs="*", default=["cli", "api"], choices=sorted(SCENARIOS),
+                        help="Scenarios to run (default: cli api)")
+    parser.add_argument("--jobs", type=int, default=10, help="Jobs per scenario (default: 10)")
+    parser.add_argument("--concurrency", type=int, default=2, help="Jobs in flight at once (default: 2)")
+    parser.add_argument("--poll-interval", type=float, default=0.1,
+                        help="API status polling interval in seconds (default: 0.1)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Results JSON of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative regression against the baseline (default: 0.2)")
+    parser.add_argument("--keep-workdir", action="store_true",
+                        help="Keep the scratch directory with outputs, reports and logs")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server, fake = start_server(config_from_args(args))
+    workdir = Path(tempfile.mkdtemp(prefix="easy-ads-bench-"))
+    results: Dict[str, Any] = {}
+    try:
+        prepare_workdir(workdir)
+        for scenario in args.scenarios:
+            before = dict(fake.stats)
+            summary = SCENARIOS[scenario](args, fake.base_url, workdir)
+            summary["fake_server"].update({key: fake.stats[key] - before[key] for key in fake.stats})
+            results[scenario] = summary
+            print_summary(summary)
+    finally:
+        server.shutdown()
+        if args.keep_workdir:
+            print(f"\nWorkdir kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if regressions:
+            print("\n✗ Regressions against baseline:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print("\n✓ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Startup Benchmark - Import time of the CLI and the API app
+
+Starts each target in a fresh interpreter under ``python -X importtime``
+several times and reports process wall time, total import time and the
+modules that cost the most. Container cold starts and autoscaled workers
+pay this on every start.
+
+Targets:
+    bare  Empty interpreter (site, encodings), the floor for the others
+    cli   ``main.py --help``: the CLI's imports plus argument parsing
+    app   ``import backend.main``: the API app as uvicorn loads it
+
+Examples:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 20 --output startup.json
+    python -m benchmarks.startup --baseline startup.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+from .run import PROJECT_ROOT, distribution
+
+TARGETS = {
+    "bare": ["-c", "pass"],
+    "cli": ["main.py", "--help"],
+    "app": ["-c", "import backend.main"],
+}
+
+# Summary metrics compared against a baseline (lower is better)
+BASELINE_METRICS = ("wall_ms.p50", "import_ms.p50")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """(module, depth, self µs, cumulative µs) for each ``-X importtime`` line"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # One space after the bar, then two per nesting level
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        modules.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return modules
+
+
+def run_target(args: List[str]) -> Tuple[float, List[Tuple[str, int, int, int]]]:
+    """Start one interpreter; return its wall time in ms and its import times"""
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT))
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=PROJECT_ROOT, env=env,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    if process.returncode != 0:
+        tail = "\n".join(process.stderr.splitlines()[-5:])
+        raise RuntimeError(f"{' '.join(args)} exited with {process.returncode}:\n{tail}")
+    return wall_ms, parse_importtime(process.stderr)
+
+
+def measure(name: str, runs: int, top: int) -> Dict[str, Any]:
+    """Run a target ``runs`` times after one warm-up run (bytecode caches written)"""
+    args = TARGETS[name]
+    run_target(args)
+    walls: List[float] = []
+    totals: List[float] = []
+    cumulative: Dict[str, List[int]] = {}
+    self_times: Dict[str, List[int]] = {}
+    for _ in range(runs):
+        wall_ms, modules = run_target(args)
+        walls.append(wall_ms)
+        totals.append(sum(cum for _, depth, _, cum in modules if depth == 0) / 1000)
+        for module, depth, self_us, cum in modules:
+            self_times.setdefault(module, []).append(self_us)
+            if depth == 0:
+                cumulative.setdefault(module, []).append(cum)
+
+    def ranked(times: Dict[str, List[int]]) -> List[Dict[str, Any]]:
+        means = {module: sum(values) / runs / 1000 for module, values in times.items()}
+        return [{"module": module, "ms": round(ms, 2)}
+                for module, ms in sorted(means.items(), key=lambda item: -item[1])[:top]]
+
+    return {
+        "target": name,
+        "command": " ".join(["python", "-X", "importtime", *args]),
+        "runs": runs,
+        "wall_ms": distribution(walls),
+        "import_ms": distribution(totals),
+        "top_level_imports": ranked(cumulative),
+        "slowest_modules": ranked(self_times),
+    }
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """One message per target metric that grew by more than ``tolerance``"""
+    regressions = []
+    for name, summary in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in BASELINE_METRICS:
+            section, stat = metric.split(".")
+            new, old = summary[section].get(stat), previous.get(section, {}).get(stat)
+            if new is None or not old:
+                continue
+            change = (new - old) / old
+            if change > tolerance:
+                regressions.append(f"{name} {metric}: {old:g} -> {new:g} ({change:+.1%})")
+    return regressions
+
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    wall, imports = summary["wall_ms"], summary["import_ms"]
+    print(f"\n=== {summary['target']}: {summary['command']} ({summary['runs']} runs) ===")
+    print(f"Wall:    p50 {wall['p50']:.1f} ms  p95 {wall['p95']:.1f} ms  max {wall['max']:.1f} ms")
+    print(f"Imports: p50 {imports['p50']:.1f} ms")
+    print(f"\n{'Top-level import':<44} {'ms':>8}")
+    for entry in summary["top_level_imports"]:
+        print(f"{entry['module']:<44} {entry['ms']:>8.2f}")
+    print(f"\n{'Slowest module (self time)':<44} {'ms':>8}")
+    for entry in summary["slowest_modules"]:
+        print(f"{entry['module']:<44} {entry['ms']:>8.2f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure interpreter startup and import time of the CLI and app")
+    parser.add_argument("targets", nargs="*", metavar="target",
+                        help=f"Targets to measure: {', '.join(TARGETS)} (default: all)")
+    parser.add_argument("--runs", type=int, default=10, help="Measured runs per target (default: 10)")
+    parser.add_argument("--top", type=int, default=10, help="Modules listed per ranking (default: 10)")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative regression against --baseline (default: 0.2)")
+    args = parser.parse_args(argv)
+    unknown = set(args.targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown target(s): {', '.join(sorted(unknown))}")
+
+    results = {}
+    for name in args.targets or list(TARGETS):
+        results[name] = measure(name, args.runs, args.top)
+        print_summary(results[name])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print("\nNo regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -105,7 +105,7 @@ function App() {
 
       <main className="app-main">
         {!jobId && !generatedImages && !error && (
-          <CampaignForm onGenerate={handleGenerate} />
+          <CampaignForm onGenerate={handleGenerate} apiBaseUrl={API_BASE_URL} />
         )}
 
         {jobId && jobStatus && jobStatus.status !== 'completed' && (
@@ -196,6 +196,7 @@ function App() {
               <div className="retry-form-container">
                 <CampaignForm
                   onGenerate={handleGenerate}
+                  apiBaseUrl={API_BASE_URL}
                   initialData={lastCampaignData}
                 />
               </div>
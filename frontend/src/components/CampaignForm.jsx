@@ -1,7 +1,10 @@
-import { useState } from 'react'
+import { useState, useEffect } from 'react'
 import './CampaignForm.css'
 
-function CampaignForm({ onGenerate, initialData = null }) {
+// Wait for a pause in typing before asking for suggestions
+const SUGGEST_DEBOUNCE_MS = 600
+
+function CampaignForm({ onGenerate, apiBaseUrl, initialData = null }) {
   const [products, setProducts] = useState(
     initialData?.products || ['', '']
   )
@@ -18,6 +21,49 @@ function CampaignForm({ onGenerate, initialData = null }) {
     initialData?.campaign_message || ''
   )
   const [errors, setErrors] = useState({})
+  // Suggestions keep the brief they were made for; chips only show while it still matches
+  const [fetchedSuggestions, setFetchedSuggestions] = useState(null)
+
+  // Prefetch brand name and message suggestions while the brief is being typed;
+  // the server caches them, so accepting one takes both LLM calls off the job
+  const suggestProducts = products.map(p => p.trim()).filter(p => p !== '')
+  const suggestKey = JSON.stringify([suggestProducts, targetMarket, targetAudience.trim()])
+  const suggestions = fetchedSuggestions?.key === suggestKey ? fetchedSuggestions : null
+  useEffect(() => {
+    if (!apiBaseUrl || suggestProducts.length === 0) return
+
+    const controller = new AbortController()
+    const timer = setTimeout(async () => {
+      try {
+        const response = await fetch(`${apiBaseUrl}/api/suggest`, {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({
+            products: suggestProducts,
+            target_market: targetMarket,
+            target_audience: targetAudience.trim(),
+          }),
+          signal: controller.signal,
+        })
+        if (response.ok) {
+          setFetchedSuggestions({ key: suggestKey, ...(await response.json()) })
+        }
+      } catch (err) {
+        // Suggestions are optional; the job generates whatever is left blank
+        if (err.name !== 'AbortError') {
+          console.error('Error fetching suggestions:', err)
+        }
+      }
+    }, SUGGEST_DEBOUNCE_MS)
+
+    return () => {
+      clearTimeout(timer)
+      controller.abort()
+    }
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [apiBaseUrl, suggestKey])
 
   const markets = [
     'US', 'UK', 'Germany', 'France', 'Spain', 'Japan', 'China', 
@@ -162,7 +208,7 @@ function CampaignForm({ onGenerate, initialData = null }) {
         <div className="form-section">
           <label className="form-label">
             Brand Name
-            <span className="form-hint">Optional - will be generated if not provided</span>
+            <span className="form-hint">Optional - pick a suggestion or leave blank to generate one</span>
           </label>
           <input
             type="text"
@@ -171,12 +217,26 @@ function CampaignForm({ onGenerate, initialData = null }) {
             placeholder="Your brand name"
             className="form-input"
           />
+          {suggestions?.brand_names?.length > 0 && (
+            <div className="suggestions">
+              {suggestions.brand_names.map(name => (
+                <button
+                  key={name}
+                  type="button"
+                  onClick={() => setBrandName(name)}
+                  className={`suggestion-chip${brandName === name ? ' selected' : ''}`}
+                >
+                  {name}
+                </button>
+              ))}
+            </div>
+          )}
         </div>
 
         <div className="form-section">
           <label className="form-label">
             Campaign Message
-            <span className="form-hint">Optional - will be generated if not provided</span>
+            <span className="form-hint">Optional - pick a suggestion or leave blank to generate one</span>
           </label>
           <input
             type="text"
@@ -185,6 +245,20 @@ function CampaignForm({ onGenerate, initialData = null }) {
             placeholder="Your campaign slogan"
             className="form-input"
           />
+          {suggestions?.campaign_messages?.length > 0 && (
+            <div className="suggestions">
+              {suggestions.campaign_messages.map(message => (
+                <button
+                  key={message}
+                  type="button"
+                  onClick={() => setCampaignMessage(message)}
+                  className={`suggestion-chip${campaignMessage === message ? ' selected' : ''}`}
+                >
+                  {message}
+                </button>
+              ))}
+            </div>
+          )}
         </div>
 
         <button type="submit" className="btn btn-primary btn-submit">
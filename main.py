@@ -1,57 +1,150 @@
 #!/usr/bin/env python3
 """
-Simplified Creative Automation - Generate single banner with 2 products
+Simplified Creative Automation - Generate banners for one campaign brief or a batch
+
+Usage:
+    python main.py                                 # examples/campaign.json
+    python main.py briefs/ --concurrency 8         # every *.json / *.jsonl brief in a directory
+    python main.py launches.jsonl                  # one brief per line
+    cat launches.jsonl | python main.py -          # briefs from stdin
+    python main.py launches.jsonl --resume         # continue an interrupted run
+
+Assets, reference image uploads and the generator are set up once and shared
+by all campaigns, which run in a worker pool. A batch writes a combined
+report (outputs/batch_<timestamp>/batch_report.json) next to its campaigns.
+Every campaign keeps a manifest.json of its completed steps; with --resume,
+campaigns pick up where the last run of the same brief stopped.
 """
 
+import argparse
 import json
 import logging
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from dotenv import load_dotenv
 import os
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
-from pipeline.generator import ReplicateGenerator
+from pipeline.generator import BaseGenerator, create_generator
 from pipeline.assets_loader import AssetsLoader
 from pipeline.reporter import PipelineReporter
+from pipeline.accounting import CallLedger
+from pipeline.events import VERBOSE, bind_context, configure_logging, log_event
+from pipeline.manifest import CampaignManifest, brief_hash, index_manifests
+from pipeline.reference_images import get_reference_cache, reference_images_enabled
 from pipeline.campaign_utils import (
+    brief_markets,
+    generate_market_prompts,
     generate_optimized_prompt,
+    market_campaign,
     validate_campaign
 )
+from pipeline.market_matrix import RenderTask, enrich_campaign, market_output_path, run_render_matrix
+from pipeline.output_writer import OutputWriter, WriteResult, get_output_writer
 
 # Load environment variables
 load_dotenv()
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Setup logging (buffered; LOG_FORMAT=json for one JSON event per line)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+DEFAULT_BRIEF = "examples/campaign.json"
+ASPECT_RATIOS = ["1:1", "9:16", "16:9"]
 
-def main():
-    # Load campaign brief
-    brief_path = "examples/campaign.json"
-    logger.info(f"Loading campaign: {brief_path}")
 
-    with open(brief_path) as f:
-        campaign = json.load(f)
+@dataclass
+class Brief:
+    """A campaign brief and where it came from"""
+    source: str  # File path, with ":<line>" for JSONL
+    campaign: Optional[dict] = None
+    error: Optional[str] = None  # Set when the brief could not be parsed
 
-    # Initialize pipeline reporter
-    reporter = PipelineReporter(campaign)
 
-    # Validate campaign brief
-    reporter.start_step("Campaign Validation", {
-        "brief_path": brief_path
-    })
+@dataclass
+class SharedResources:
+    """Set up once per run and shared by every campaign"""
+    assets_loader: AssetsLoader
+    assets: Dict[str, str]
+    generator: BaseGenerator
+    image_input: Optional[List[str]]
+    writer: OutputWriter
+
+
+def _brief(source: str, data: Any) -> Brief:
+    if not isinstance(data, dict):
+        return Brief(source, error="Brief must be a JSON object")
+    return Brief(source, data)
+
+
+def _parse_jsonl(lines, source: str) -> List[Brief]:
+    briefs = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            briefs.append(_brief(f"{source}:{number}", json.loads(line)))
+        except ValueError as e:
+            briefs.append(Brief(f"{source}:{number}", error=f"Invalid JSON: {e}"))
+    return briefs
+
+
+def _load_brief_file(path: Path) -> List[Brief]:
+    if path.suffix == ".jsonl":
+        with open(path, encoding="utf-8") as f:
+            return _parse_jsonl(f, str(path))
     try:
-        validate_campaign(campaign)
-        reporter.end_step("success")
-    except Exception as e:
-        reporter.end_step("failed", error_message=str(e))
-        reporter.finalize("failed")
-        raise
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except ValueError as e:
+        return [Brief(str(path), error=f"Invalid JSON: {e}")]
+    # A .json file holds one brief or a list of briefs
+    if isinstance(data, list):
+        return [_brief(f"{path}[{i}]", item) for i, item in enumerate(data)]
+    return [_brief(str(path), data)]
+
+
+def load_briefs(inputs: List[str]) -> List[Brief]:
+    """
+    Load campaign briefs from files, directories, JSONL streams or stdin ("-")
+
+    Args:
+        inputs: Paths to .json/.jsonl files or directories of them, or "-"
+
+    Returns:
+        Briefs in input order; unparseable ones carry an error instead of a campaign
+    """
+    briefs: List[Brief] = []
+    for value in inputs:
+        if value == "-":
+            briefs.extend(_parse_jsonl(sys.stdin, "<stdin>"))
+            continue
+        path = Path(value)
+        if path.is_dir():
+            files = sorted(p for p in path.iterdir() if p.is_file() and p.suffix in (".json", ".jsonl"))
+            if not files:
+                logger.warning(f"No .json or .jsonl briefs in {path}")
+            for file in files:
+                briefs.extend(_load_brief_file(file))
+        elif path.is_file():
+            briefs.extend(_load_brief_file(path))
+        else:
+            briefs.append(Brief(str(path), error="File not found"))
+    return briefs
+
+
+def prepare_shared_resources(reporter: PipelineReporter) -> SharedResources:
+    """
+    Load assets, initialize the generator and upload reference images once
 
+    Raises:
+        RuntimeError: If REPLICATE_API_TOKEN is not set
+    """
     # Load assets from assets folder
     reporter.start_step("Load Assets", {
         "assets_directory": "assets"
@@ -61,11 +154,7 @@ def main():
 
         # Load text assets
         assets = assets_loader.load_all_text_assets()
-
-        # Format assets for prompt enrichment
-        assets_context = ""
-        if assets:
-            assets_context = assets_loader.format_assets_for_prompt(assets)
+        if assets or assets_loader.large_assets:
             logger.info("Text assets loaded successfully:")
             logger.info(assets_loader.get_assets_summary(assets))
         else:
@@ -76,27 +165,83 @@ def main():
         })
     except Exception as e:
         reporter.end_step("failed", error_message=str(e))
-        reporter.finalize("failed")
         raise
 
-    # Get API token
+    # LLM calls go to Replicate whichever generator renders the banners
     api_token = os.getenv("REPLICATE_API_TOKEN")
     if not api_token:
-        logger.error("REPLICATE_API_TOKEN not found in .env file")
-        reporter.finalize("failed")
-        return
+        raise RuntimeError("REPLICATE_API_TOKEN not found in .env file")
+
+    # Initialize the configured generator backend (EASY_ADS_GENERATOR)
+    reporter.start_step("Initialize Generator")
+    try:
+        generator = create_generator()
+        reporter.end_step("success", {
+            "backend": generator.name,
+            "model": generator.model_id
+        })
+    except Exception as e:
+        reporter.end_step("failed", error_message=str(e))
+        raise
+
+    # Prepare reference images once; every render reuses the same uploads
+    image_input = None
+    reference_images = assets_loader.find_image_assets() if reference_images_enabled() else []
+    if reference_images:
+        reporter.start_step("Prepare Reference Images", {
+            "reference_images": len(reference_images)
+        })
+        try:
+            image_input = get_reference_cache().get_inputs(reference_images) or None
+            reporter.end_step("success", {
+                "reference_inputs": len(image_input or [])
+            })
+        except Exception as e:
+            reporter.end_step("failed", error_message=str(e))
+            logger.warning("Continuing without reference images")
+
+    return SharedResources(assets_loader, assets, generator, image_input, get_output_writer())
+
+
+def run_campaign(campaign: dict, shared: SharedResources, reporter: PipelineReporter,
+                 manifest: CampaignManifest, source: str) -> List[Path]:
+    """
+    Generate, save and report the banners for one campaign
+
+    Steps already recorded in the manifest (prompt, intact banners) are skipped.
 
-    # Initialize generator
-    reporter.start_step("Initialize Generator", {
-        "model": "bytedance/seedream-4"
+    Args:
+        campaign: Campaign brief dictionary
+        shared: Resources shared across campaigns
+        reporter: Reporter for this campaign; finalized here
+        manifest: Progress manifest; its directory holds the campaign's banners
+        source: Where the brief came from, for the report
+
+    Returns:
+        Paths of the saved banners
+
+    Raises:
+        Exception: If the brief is invalid, prompt generation fails or no banner was generated
+    """
+    # Validate campaign brief
+    reporter.start_step("Campaign Validation", {
+        "brief_path": source
     })
     try:
-        generator = ReplicateGenerator(api_token)
+        validate_campaign(campaign)
         reporter.end_step("success")
     except Exception as e:
         reporter.end_step("failed", error_message=str(e))
         reporter.finalize("failed")
         raise
+    base_output_dir = manifest.output_dir
+    manifest.save()
+
+    markets = brief_markets(campaign)
+    if len(markets) > 1:
+        return run_market_matrix(campaign, markets, shared, reporter, manifest)
+    if "target_markets" in campaign:
+        campaign = market_campaign(campaign, markets[0])
 
     # Extract campaign details for logging
     products = campaign.get("products", [])
@@ -108,101 +253,497 @@ def main():
     # Build product descriptions for logging (simple strings)
     products_text = ", ".join([str(p) for p in products])
 
-    logger.info("="*60)
-    logger.info("CAMPAIGN BRIEF")
-    logger.info("="*60)
-    logger.info(f"  Brand: {brand_name if brand_name else '(to be generated)'}")
-    logger.info(f"  Products: {products_text}")
-    logger.info(f"  Target Market: {target_market}")
-    logger.info(f"  Target Audience: {target_audience}")
-    logger.info(f"  Campaign Message: {campaign_message}")
-    logger.info("="*60)
-    logger.info("")
-
-    # Use GPT-4 to generate optimized prompt with assets context
-    reporter.start_step("Generate Optimized Prompt", {
-        "model": "GPT-4",
-        "has_assets": bool(assets_context)
-    })
-    try:
-        prompt, translated_message = generate_optimized_prompt(campaign, assets_context, has_reference_images=False)
-        logger.info("OPTIMIZED PROMPT (GPT-4):")
-        logger.info(prompt)
-        logger.info("")
-        reporter.end_step("success", {
-            "prompt_length": len(prompt),
-            "translated_message": translated_message
+    log_event(
+        logger, "campaign_details",
+        f"Campaign: {brand_name or '(brand to be generated)'} for {target_market}: {products_text}",
+        products=products, target_market=target_market, target_audience=target_audience,
+        brand_name=brand_name, campaign_message=campaign_message
+    )
+
+    # Use GPT-4 to generate optimized prompt with the most relevant assets
+    if manifest.prompt:
+        prompt, translated_message = manifest.prompt, manifest.translated_message
+        reporter.start_step("Generate Optimized Prompt", {"model": "GPT-4"})
+        reporter.end_step("skipped", {"resumed": True, "prompt_length": len(prompt)})
+    else:
+        assets_loader = shared.assets_loader
+        assets_context = ""
+        if shared.assets or assets_loader.large_assets:
+            assets_context = assets_loader.select_assets_for_prompt(campaign, shared.assets)
+        reporter.start_step("Generate Optimized Prompt", {
+            "model": "GPT-4",
+            "has_assets": bool(assets_context)
         })
-    except Exception as e:
-        reporter.end_step("failed", error_message=str(e))
-        reporter.finalize("failed")
-        raise
+        try:
+            prompt, translated_message = generate_optimized_prompt(
+                campaign, assets_context, has_reference_images=bool(shared.image_input))
+            # The full prompt is only logged at LOG_LEVEL=VERBOSE
+            log_event(logger, "prompt", f"Optimized prompt:\n{prompt}", level=VERBOSE, prompt=prompt)
+            reporter.end_step("success", {
+                "prompt_length": len(prompt),
+                "translated_message": translated_message
+            })
+        except Exception as e:
+            reporter.end_step("failed", error_message=str(e))
+            reporter.finalize("failed")
+            manifest.set_status("failed")
+            raise
+        manifest.record_prompt(prompt, translated_message)
 
-    # Generate images for all aspect ratios
-    aspect_ratios = ["1:1", "9:16", "16:9"]
+    # Generate images for all aspect ratios; each banner is encoded and
+    # written in the background while the next ratio renders
     generated_images = []
-
-    # Create output directory structure
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    base_output_dir = Path("outputs") / f"{target_market.lower().replace(' ', '_')}_{timestamp}"
+    pending_saves = []
     base_output_dir.mkdir(parents=True, exist_ok=True)
 
-    for aspect_ratio in aspect_ratios:
+    for aspect_ratio in ASPECT_RATIOS:
+        existing = manifest.completed_output(aspect_ratio)
+        if existing is not None:
+            reporter.start_step(f"Generate {aspect_ratio} Image", {"aspect_ratio": aspect_ratio})
+            reporter.end_step("skipped", {"resumed": True, "output_path": str(existing)})
+            reporter.add_output_file(str(existing))
+            generated_images.append(existing)
+            continue
+
         reporter.start_step(f"Generate {aspect_ratio} Image", {
-            "model": "Seedream-4",
+            "model": shared.generator.model_id,
             "aspect_ratio": aspect_ratio
         })
         try:
             # Generate image with specific aspect ratio
-            image = generator.generate(prompt, aspect_ratio=aspect_ratio, image_input=None)
+            image = shared.generator.generate(prompt, aspect_ratio=aspect_ratio, image_input=shared.image_input)
             reporter.end_step("success", {
                 "image_size": f"{image.size[0]}x{image.size[1]}",
                 "image_mode": image.mode
             })
+        except Exception as e:
+            reporter.end_step("failed", error_message=str(e))
+            logger.error(f"Failed to generate {aspect_ratio} banner: {str(e)}")
+            # Continue with other aspect ratios instead of failing completely
+            continue
 
-            # Save output
-            reporter.start_step(f"Save {aspect_ratio} Output", {
-                "output_directory": str(base_output_dir),
-                "aspect_ratio": aspect_ratio
-            })
-
-            # Create aspect ratio subdirectory
-            aspect_dir = base_output_dir / aspect_ratio.replace(':', '_')
-            aspect_dir.mkdir(exist_ok=True)
+        # Queue the banner for encoding; the manifest records it once written
+        aspect_dir = base_output_dir / aspect_ratio.replace(':', '_')
+        output_filename = f"banner_{target_market.lower().replace(' ', '_')}.png"
+        write = shared.writer.submit(image, aspect_dir / output_filename)
+        manifest.record_write(aspect_ratio, write)
+        pending_saves.append((aspect_ratio, write))
+
+    # Wait for the writes still in flight
+    for aspect_ratio, write in pending_saves:
+        reporter.start_step(f"Save {aspect_ratio} Output", {
+            "output_directory": str(base_output_dir),
+            "aspect_ratio": aspect_ratio,
+            "format": shared.writer.format.name
+        })
+        try:
+            result = write.result()
+        except Exception as e:
+            reporter.end_step("failed", error_message=str(e))
+            logger.error(f"Failed to save {aspect_ratio} banner: {str(e)}")
+            continue
 
-            # Save image
-            output_filename = f"banner_{target_market.lower().replace(' ', '_')}.png"
-            output_path = aspect_dir / output_filename
-            image.save(output_path)
+        logger.info(f"Saved {aspect_ratio} to: {result.path} ({result.details['size']})")
 
-            logger.info("")
-            logger.info(f"  Saved {aspect_ratio} to: {output_path}")
-            logger.info(f"  Size: {image.size}")
-            logger.info("")
+        reporter.add_output_file(str(result.path))
+        reporter.end_step("success", {
+            "output_path": str(result.path),
+            "file_size_bytes": result.size_bytes,
+            "encode_seconds": round(result.encode_seconds, 4),
+            "write_seconds": round(result.write_seconds, 4),
+            "aspect_ratio": aspect_ratio
+        })
+        generated_images.append(result.path)
 
-            reporter.add_output_file(str(output_path))
-            reporter.end_step("success", {
-                "output_path": str(output_path),
-                "file_size_bytes": output_path.stat().st_size,
-                "aspect_ratio": aspect_ratio
-            })
+    # Check if at least one image was generated
+    if len(generated_images) == 0:
+        reporter.finalize("failed")
+        manifest.set_status("failed")
+        raise Exception("All image generations failed")
 
-            generated_images.append(output_path)
+    # Finalize report; a partial run stays resumable
+    reporter.finalize("completed")
+    manifest.set_status("completed" if len(generated_images) == len(ASPECT_RATIOS) else "partial")
+    return generated_images
+
+
+def run_market_matrix(campaign: dict, markets: List[str], shared: SharedResources,
+                      reporter: PipelineReporter, manifest: CampaignManifest) -> List[Path]:
+    """
+    Generate the banners of a multi-market brief, sharing work across markets
+
+    Enrichment runs once, prompts come from batched LLM calls and every
+    market x ratio render goes through one scheduler. Banners are written to
+    <campaign dir>/<market>/<ratio>/. Steps recorded in the manifest are skipped.
+
+    Args:
+        campaign: Validated campaign brief with ``target_markets``
+        markets: Target markets, deduplicated
+        shared: Resources shared across campaigns
+        reporter: Reporter for this campaign; finalized here
+        manifest: Progress manifest; its directory holds the campaign's banners
+
+    Returns:
+        Paths of the saved banners
+
+    Raises:
+        Exception: If enrichment or prompt generation fails or no banner was generated
+    """
+    campaign = dict(campaign)
+    base_output_dir = manifest.output_dir
+    reporter.report.campaign_details["target_markets"] = markets
+
+    # Brand name and base message are generated once for all markets
+    if manifest.enrichment:
+        campaign.update(manifest.enrichment)
+        reporter.start_step("Enrich Brief", {"markets": len(markets)})
+        reporter.end_step("skipped", {"resumed": True, **manifest.enrichment})
+    elif not (campaign.get("brand_name") or "").strip() or not (campaign.get("campaign_message") or "").strip():
+        reporter.start_step("Enrich Brief", {"model": "openai/gpt-4.1-nano", "markets": len(markets)})
+        try:
+            enrichment = enrich_campaign(campaign, markets)
+        except Exception as e:
+            reporter.end_step("failed", error_message=str(e))
+            reporter.finalize("failed")
+            manifest.set_status("failed")
+            raise
+        campaign.update(enrichment)
+        reporter.report.campaign_details.update(enrichment)
+        manifest.record_enrichment(enrichment)
+        reporter.end_step("success", enrichment)
 
+    products = campaign.get("products", [])
+    brand_name = campaign.get("brand_name", "")
+    log_event(
+        logger, "campaign_details",
+        f"Campaign: {brand_name} for {len(markets)} markets ({', '.join(markets)}): "
+        f"{', '.join(str(p) for p in products)}",
+        products=products, target_markets=markets, target_audience=campaign.get("target_audience", ""),
+        brand_name=brand_name, campaign_message=campaign.get("campaign_message", "")
+    )
+
+    # Translations and per-market prompts come from batched calls
+    prompts = {market: manifest.market_prompt(market) for market in markets if manifest.market_prompt(market)}
+    missing = [market for market in markets if market not in prompts]
+    if not missing:
+        reporter.start_step("Generate Market Prompts", {"markets": len(markets)})
+        reporter.end_step("skipped", {"resumed": True})
+    else:
+        assets_loader = shared.assets_loader
+        assets_context = ""
+        if shared.assets or assets_loader.large_assets:
+            assets_context = assets_loader.select_assets_for_prompt(
+                market_campaign(campaign, ", ".join(missing)), shared.assets)
+        reporter.start_step("Generate Market Prompts", {
+            "model": "GPT-4",
+            "markets": len(missing),
+            "resumed_markets": len(prompts),
+            "has_assets": bool(assets_context)
+        })
+        try:
+            generated = generate_market_prompts(
+                campaign, missing, assets_context, has_reference_images=bool(shared.image_input))
         except Exception as e:
             reporter.end_step("failed", error_message=str(e))
-            logger.error(f"Failed to generate {aspect_ratio} banner: {str(e)}")
-            # Continue with other aspect ratios instead of failing completely
-            continue
+            reporter.finalize("failed")
+            manifest.set_status("failed")
+            raise
+        for market, (prompt, _) in generated.items():
+            log_event(logger, "prompt", f"Optimized prompt for {market}:\n{prompt}", level=VERBOSE,
+                      prompt=prompt, target_market=market)
+        manifest.record_market_prompts(generated)
+        prompts.update(generated)
+        reporter.end_step("success", {
+            "translated_messages": {market: generated[market][1] for market in missing}
+        })
+
+    # Every market x ratio banner not already saved goes through one scheduler
+    generated_images: List[Path] = []
+    tasks: List[RenderTask] = []
+    for market in markets:
+        for aspect_ratio in ASPECT_RATIOS:
+            task = RenderTask(market, aspect_ratio, prompts[market][0])
+            existing = manifest.completed_output(task.key)
+            if existing is not None:
+                reporter.add_output_file(str(existing))
+                generated_images.append(existing)
+            else:
+                tasks.append(task)
+
+    def render(task: RenderTask) -> "Future[WriteResult]":
+        image = shared.generator.generate(task.prompt, aspect_ratio=task.aspect_ratio,
+                                          image_input=shared.image_input)
+        write = shared.writer.submit(image, market_output_path(base_output_dir, task.market, task.aspect_ratio))
+        manifest.record_write(task.key, write)
+        return write
+
+    reporter.start_step("Render Market Matrix", {
+        "model": shared.generator.model_id,
+        "markets": len(markets),
+        "aspect_ratios": len(ASPECT_RATIOS),
+        "renders": len(tasks),
+        "resumed_renders": len(generated_images),
+        "format": shared.writer.format.name
+    })
+    outcomes = run_render_matrix(tasks, render)
+    errors = {}
+    encode_seconds = 0.0
+    for outcome in outcomes:
+        if outcome.write is not None:
+            encode_seconds += outcome.write.encode_seconds
+        if outcome.path is not None:
+            reporter.add_output_file(str(outcome.path))
+            generated_images.append(outcome.path)
+        else:
+            errors[outcome.task.key] = outcome.error
+    reporter.end_step("failed" if tasks and len(errors) == len(tasks) else "success", {
+        "rendered": len(tasks) - len(errors),
+        "encode_seconds": round(encode_seconds, 4),
+        "failed_renders": errors
+    }, error_message=f"{len(errors)} of {len(tasks)} renders failed" if errors else None)
 
-    # Check if at least one image was generated
     if len(generated_images) == 0:
         reporter.finalize("failed")
+        manifest.set_status("failed")
         raise Exception("All image generations failed")
 
-    # Finalize report
+    # Finalize report; a partial run stays resumable
     reporter.finalize("completed")
+    total = len(markets) * len(ASPECT_RATIOS)
+    manifest.set_status("completed" if len(generated_images) == total else "partial")
+    return generated_images
+
+
+class BatchProgress:
+    """Thread-safe aggregate progress of a batch, logged as each campaign finishes"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.completed = 0
+        self.failed = 0
+        self.running = 0
+        self.images = 0
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def started(self) -> None:
+        with self._lock:
+            self.running += 1
+
+    def finished(self, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self.running -= 1
+            if result["status"] == "completed":
+                self.completed += 1
+            else:
+                self.failed += 1
+            self.images += len(result["images"])
+            done = self.completed + self.failed
+            elapsed = time.perf_counter() - self._start
+            eta = elapsed / done * (self.total - done)
+            log_event(
+                logger, "batch_progress",
+                f"Progress: {done}/{self.total} campaigns ({self.failed} failed, {self.running} running), "
+                f"{self.images} banners, {elapsed:.0f}s elapsed, ~{eta:.0f}s left",
+                done=done, total=self.total, completed=self.completed, failed=self.failed,
+                running=self.running, images=self.images, elapsed_seconds=round(elapsed, 1),
+                eta_seconds=round(eta, 1)
+            )
+
+
+def _campaign_slug(campaign: Optional[dict]) -> str:
+    markets = brief_markets(campaign or {})
+    if len(markets) > 1:
+        return f"{len(markets)}_markets"
+    market = markets[0] if markets else "unknown"
+    return str(market).lower().replace(" ", "_")
+
+
+def process_brief(index: int, brief: Brief, shared: SharedResources, batch_dir: Optional[Path],
+                  timestamp: str, progress: BatchProgress, ledger: CallLedger,
+                  previous: Optional[CampaignManifest] = None) -> Dict[str, Any]:
+    """Run one brief in a worker thread, resuming from ``previous`` if given; never raises"""
+    result: Dict[str, Any] = {
+        "index": index,
+        "source": brief.source,
+        "campaign_id": None,
+        "status": "failed",
+        "output_dir": None,
+        "images": [],
+        "report_path": None,
+        "duration_seconds": None,
+        "resumed": previous is not None,
+        "error": brief.error,
+    }
+    progress.started()
+    start = time.perf_counter()
+    if brief.error is None:
+        try:
+            campaign_id, base_output_dir, report_dir = _campaign_dirs(index, brief, batch_dir, timestamp, previous)
+        except Exception as e:
+            result["error"] = f"Invalid brief: {e}"
+            logger.error(f"Skipping brief {brief.source}: {result['error']}")
+        else:
+            result.update(campaign_id=campaign_id, output_dir=str(base_output_dir))
+            with bind_context(job_id=campaign_id):
+                _run_brief(brief, shared, campaign_id, base_output_dir, report_dir, ledger, previous, result)
+    else:
+        logger.error(f"Skipping brief {brief.source}: {brief.error}")
+    result["duration_seconds"] = round(time.perf_counter() - start, 3)
+    progress.finished(result)
+    return result
+
+
+def _campaign_dirs(index: int, brief: Brief, batch_dir: Optional[Path], timestamp: str,
+                   previous: Optional[CampaignManifest]) -> Tuple[str, Path, Path]:
+    """Campaign ID, output directory and report directory of a brief"""
+    slug = _campaign_slug(brief.campaign)
+    if previous is not None:
+        # Continue in the directory of the run being resumed
+        campaign_id = previous.campaign_id
+        base_output_dir = previous.output_dir
+        in_batch = base_output_dir.parent.name.startswith("batch_")
+        report_dir = base_output_dir if in_batch else base_output_dir.parent
+    elif batch_dir is not None:
+        # Batch campaigns are grouped under the batch directory
+        campaign_id = f"{index:03d}_{slug}"
+        base_output_dir = batch_dir / campaign_id
+        report_dir = base_output_dir
+    else:
+        campaign_id = f"{slug}_{timestamp}"
+        base_output_dir = Path("outputs") / campaign_id
+        report_dir = Path("outputs")
+    return campaign_id, base_output_dir, report_dir
+
+
+def _run_brief(brief: Brief, shared: SharedResources, campaign_id: str, base_output_dir: Path,
+               report_dir: Path, ledger: CallLedger, previous: Optional[CampaignManifest],
+               result: Dict[str, Any]) -> None:
+    """Run a valid brief's campaign, filling in ``result``; never raises"""
+    reporter = None
+    try:
+        report_dir.mkdir(parents=True, exist_ok=True)
+        reporter = PipelineReporter(brief.campaign, output_dir=str(report_dir), campaign_id=campaign_id)
+        manifest = previous or CampaignManifest.create(base_output_dir, campaign_id, brief.campaign, brief.source)
+        if previous is not None:
+            logger.info(f"Resuming {campaign_id} from {previous.path} "
+                        f"({len(previous.data.get('outputs', {}))} banner(s) already saved)")
+        images = run_campaign(brief.campaign, shared, reporter, manifest, brief.source)
+        result["status"] = "completed"
+        result["images"] = [str(path) for path in images]
+    except Exception as e:
+        result["error"] = str(e)
+        logger.error(f"Campaign {campaign_id} ({brief.source}) failed: {e}")
+    if reporter is not None:
+        result["report_path"] = str(reporter.report_path) if reporter.report_path else None
+        for record in reporter.ledger.records:
+            ledger.add(record)
+
+
+def write_batch_report(path: Path, briefs: List[Brief], results: List[Dict[str, Any]],
+                       setup: PipelineReporter, ledger: CallLedger, concurrency: int,
+                       started: str, duration: float) -> None:
+    """Write the combined report for a batch"""
+    completed = sum(1 for r in results if r["status"] == "completed")
+    durations = sorted(r["duration_seconds"] for r in results if r["status"] == "completed")
+    report = {
+        "batch_id": path.parent.name,
+        "start_time": started,
+        "end_time": datetime.now().isoformat(),
+        "duration_seconds": round(duration, 3),
+        "concurrency": concurrency,
+        "campaigns_total": len(briefs),
+        "campaigns_completed": completed,
+        "campaigns_failed": len(briefs) - completed,
+        "images_generated": sum(len(r["images"]) for r in results),
+        "campaign_duration_seconds": {
+            "min": durations[0] if durations else None,
+            "median": durations[len(durations) // 2] if durations else None,
+            "max": durations[-1] if durations else None,
+        },
+        "setup_steps": setup.to_dict()["steps"],
+        "accounting": ledger.summary(),
+        "campaigns": results,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"📊 Batch report saved to: {path}")
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Generate campaign banners from one or more briefs")
+    parser.add_argument("briefs", nargs="*", default=[DEFAULT_BRIEF],
+                        help=f"Brief files (.json, .jsonl), directories of them, or - for JSONL on stdin "
+                             f"(default: {DEFAULT_BRIEF})")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Campaigns processed at once (default: 4)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the latest earlier run of each brief, skipping completed steps")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _build_arg_parser().parse_args(argv)
+
+    briefs = load_briefs(args.briefs)
+    if not briefs:
+        logger.error("No campaign briefs found")
+        return 1
+    logger.info(f"Loaded {len(briefs)} campaign brief(s) from {', '.join(args.briefs)}")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    started = datetime.now().isoformat()
+    start = time.perf_counter()
+    batch_dir = Path("outputs") / f"batch_{timestamp}" if len(briefs) > 1 else None
+
+    # Shared setup is recorded separately from the campaigns (and never profiled)
+    setup = PipelineReporter({}, output_dir="outputs", campaign_id=f"setup_{timestamp}", profile="")
+    try:
+        shared = prepare_shared_resources(setup)
+    except Exception as e:
+        logger.error(f"Setup failed: {e}")
+        return 1
+
+    ledger = CallLedger()
+    for record in setup.ledger.records:
+        ledger.add(record)
+
+    # Earlier runs by brief hash; each is resumed by at most one brief of this run
+    resumable = index_manifests(Path("outputs")) if args.resume else {}
+    if args.resume:
+        logger.info(f"Found {len(resumable)} earlier campaign run(s) to resume from")
+
+    concurrency = max(1, min(args.concurrency, len(briefs)))
+    progress = BatchProgress(len(briefs))
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="campaign") as pool:
+        futures = []
+        for index, brief in enumerate(briefs, 1):
+            previous = resumable.pop(brief_hash(brief.campaign), None) if brief.campaign is not None else None
+            if previous is not None and previous.data.get("status") == "completed":
+                logger.info(f"Brief {brief.source} already completed in {previous.output_dir}; "
+                            f"verifying banners")
+            futures.append(pool.submit(process_brief, index, brief, shared, batch_dir, timestamp,
+                                       progress, ledger, previous))
+        results = [future.result() for future in futures]
+    shared.writer.shutdown()
+
+    if batch_dir is not None:
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        write_batch_report(batch_dir / "batch_report.json", briefs, results, setup, ledger,
+                           concurrency, started, time.perf_counter() - start)
+
+    failed = [r for r in results if r["status"] != "completed"]
+    summary = ledger.summary()
+    log_event(
+        logger, "run_finished",
+        f"{'✓' if not failed else '✗'} {len(results) - len(failed)}/{len(results)} campaign(s) completed, "
+        f"{sum(len(r['images']) for r in results)} banner(s) in {time.perf_counter() - start:.1f}s "
+        f"(~${summary['estimated_cost_usd']:.4f})",
+        completed=len(results) - len(failed), failed=len(failed),
+        estimated_cost_usd=summary["estimated_cost_usd"]
+    )
+    return 1 if failed else 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,6 +1,12 @@
 """Creative Automation Pipeline Package"""
 
-from .compliance import check_brand_compliance
-
 __version__ = "1.0.0"
 __all__ = ["check_brand_compliance"]
+
+
+def __getattr__(name):
+    # Resolved on first access so "import pipeline.<module>" stays cheap
+    if name == "check_brand_compliance":
+        from .compliance import check_brand_compliance
+        return check_brand_compliance
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,459 @@
+"""
+Accounting - Latency, token and cost records for every remote model call
+
+All Replicate predictions go through ``accounted_run`` / ``accounted_stream``.
+Each call is timed (submit to first byte, total), traced as a span, observed
+in the metrics registry and recorded with its prediction metrics and an
+estimated cost in the ledger of the active job.
+
+Calls take an optional CancelToken. Canceling it (a missed deadline, a lost
+hedge) cancels the prediction on Replicate and ends the call with
+CallCanceled; such calls are recorded as "canceled", not "failed".
+
+The replicate client is imported on the first call, not with this module.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .metrics import ESTIMATED_COST, REMOTE_CALL_DURATION, REMOTE_FIRST_BYTE
+from .reporter import current_reporter, trace_span
+
+logger = logging.getLogger(__name__)
+
+# Estimated list prices in USD; models missing here are recorded without a cost
+MODEL_PRICING: Dict[str, Dict[str, float]] = {
+    "bytedance/seedream-4": {"per_image": 0.03},
+    "openai/gpt-4.1-nano": {"per_input_token": 0.10 / 1_000_000, "per_output_token": 0.40 / 1_000_000},
+}
+
+# Seconds a cancelable render blocks on prediction creation before polling
+_CANCELABLE_WAIT = 5
+
+_active_ledger: contextvars.ContextVar[Optional["CallLedger"]] = \
+    contextvars.ContextVar("active_ledger", default=None)
+
+
+class CallCanceled(Exception):
+    """Raised inside a call whose CancelToken was canceled"""
+    pass
+
+
+class StreamError(Exception):
+    """Raised for an error event in a prediction's output stream"""
+    pass
+
+
+class CancelToken:
+    """Cancellation handle for remote calls; cancels their predictions once set"""
+
+    def __init__(self):
+        self._canceled = False
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def canceled(self) -> bool:
+        return self._canceled
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """Run ``callback`` on cancel, or right away if already canceled"""
+        with self._lock:
+            if not self._canceled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._canceled:
+                return
+            self._canceled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug(f"Cancel callback failed: {e}")
+
+    def check(self, operation: str) -> None:
+        if self._canceled:
+            raise CallCanceled(f"{operation} canceled")
+
+
+@dataclass
+class CallRecord:
+    """Accounting for a single remote model call"""
+    model: str
+    operation: str
+    kind: str  # "llm" or "render"
+    started_at: str
+    status: str = "running"  # "running", "success", "failed", "canceled"
+    hedge: bool = False  # Duplicate fired by the hedging policy
+    prediction_id: Optional[str] = None
+    first_byte_seconds: Optional[float] = None  # Submit to first streamed token; None for runs
+    total_seconds: Optional[float] = None
+    queue_seconds: Optional[float] = None  # Created to started, from the prediction timestamps
+    predict_seconds: Optional[float] = None
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    output_images: Optional[int] = None
+    estimated_cost_usd: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class CallLedger:
+    """Thread-safe collection of call records for a job or campaign"""
+    records: List[CallRecord] = field(default_factory=list)
+
+    hedging: Dict[str, int] = field(default_factory=dict)  # Hedge outcome -> count
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def add(self, record: CallRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def note_hedge(self, outcome: str) -> None:
+        """Count a hedging decision: "fired", "won" or "denied" (over budget)"""
+        with self._lock:
+            self.hedging[outcome] = self.hedging.get(outcome, 0) + 1
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [asdict(record) for record in self.records]
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Aggregate the records overall, per operation and per model
+
+        Returns:
+            Dictionary with call counts, time, tokens and estimated cost
+        """
+        with self._lock:
+            records = list(self.records)
+            hedging = dict(self.hedging)
+
+        summary = _aggregate(records)
+        if hedging:
+            summary["hedging"] = {
+                "fired": hedging.get("fired", 0),
+                "won": hedging.get("won", 0),
+                "denied": hedging.get("denied", 0),
+                "extra_cost_usd": round(sum(r.estimated_cost_usd or 0.0 for r in records if r.hedge), 6),
+            }
+        summary["by_operation"] = {}
+        summary["by_model"] = {}
+        for key, attr in (("by_operation", "operation"), ("by_model", "model")):
+            groups: Dict[str, List[CallRecord]] = {}
+            for record in records:
+                groups.setdefault(getattr(record, attr), []).append(record)
+            summary[key] = {name: _aggregate(group) for name, group in groups.items()}
+        return summary
+
+
+def _aggregate(records: List[CallRecord]) -> Dict[str, Any]:
+    return {
+        "calls": len(records),
+        "failed": sum(1 for r in records if r.status == "failed"),
+        "canceled": sum(1 for r in records if r.status == "canceled"),
+        "hedges": sum(1 for r in records if r.hedge),
+        "total_seconds": round(sum(r.total_seconds or 0.0 for r in records), 3),
+        "predict_seconds": round(sum(r.predict_seconds or 0.0 for r in records), 3),
+        "input_tokens": sum(r.input_tokens or 0 for r in records),
+        "output_tokens": sum(r.output_tokens or 0 for r in records),
+        "output_images": sum(r.output_images or 0 for r in records),
+        "estimated_cost_usd": round(sum(r.estimated_cost_usd or 0.0 for r in records), 6),
+    }
+
+
+@contextmanager
+def use_ledger(ledger: CallLedger) -> Iterator[CallLedger]:
+    """Record calls made in this context into ``ledger`` instead of the active reporter's"""
+    token = _active_ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _active_ledger.reset(token)
+
+
+def current_ledger() -> Optional[CallLedger]:
+    """Return the ledger calls are recorded into in the current context, if any"""
+    ledger = _active_ledger.get()
+    if ledger is not None:
+        return ledger
+    reporter = current_reporter()
+    return reporter.ledger if reporter is not None else None
+
+
+def estimate_cost(record: CallRecord) -> Optional[float]:
+    """Estimate the cost of a call from MODEL_PRICING"""
+    pricing = MODEL_PRICING.get(record.model.split(":")[0])
+    if pricing is None:
+        return None
+    return ((record.input_tokens or 0) * pricing.get("per_input_token", 0.0)
+            + (record.output_tokens or 0) * pricing.get("per_output_token", 0.0)
+            + (record.output_images or 0) * pricing.get("per_image", 0.0))
+
+
+def _create_prediction(model: str, input: Dict[str, Any], **params):
+    import replicate
+
+    # "owner/name:version" runs a pinned version, "owner/name" the latest. Official
+    # models go through models.predictions directly: predictions.create(model=...)
+    # drops the ``wait`` parameter and falls back to polling.
+    if ":" in model:
+        return replicate.predictions.create(version=model.split(":", 1)[1], input=input, **params)
+    return replicate.models.predictions.create(model=model, input=input, **params)
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _apply_prediction(record: CallRecord, prediction) -> None:
+    """Copy timestamps and metrics reported by Replicate onto the record"""
+    record.prediction_id = prediction.id
+    metrics = prediction.metrics or {}
+    record.predict_seconds = metrics.get("predict_time")
+    record.input_tokens = metrics.get("input_token_count")
+    record.output_tokens = metrics.get("output_token_count")
+    created, started = _parse_time(prediction.created_at), _parse_time(prediction.started_at)
+    if created is not None and started is not None:
+        record.queue_seconds = max(0.0, (started - created).total_seconds())
+
+
+class _CallTimer:
+    """Clock for one call; marks the first byte relative to submission"""
+
+    def __init__(self, record: CallRecord):
+        self.record = record
+        self.start = time.perf_counter()
+
+    def first_byte(self) -> None:
+        if self.record.first_byte_seconds is None:
+            self.record.first_byte_seconds = time.perf_counter() - self.start
+
+
+def _cancel_prediction(prediction) -> None:
+    try:
+        prediction.cancel()
+    except Exception as e:
+        logger.debug(f"Could not cancel prediction {prediction.id}: {e}")
+
+
+def _abort_response(response) -> None:
+    """Wake a reader blocked on a streamed response by shutting its socket down
+
+    Closing an httpx response from another thread is not safe, and closing a
+    socket does not wake a blocked read; shutting it down does, and the reader
+    then closes the response itself.
+    """
+    import socket
+
+    stream = response.extensions.get("network_stream")
+    sock = stream.get_extra_info("socket") if stream is not None else None
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def _stream_events(prediction, cancel: Optional[CancelToken],
+                   read_timeout: Optional[float]) -> Iterator[Any]:
+    """Server-sent events of a prediction, like ``prediction.stream()``, but stoppable
+
+    Reads give up after ``read_timeout`` seconds without data, and canceling
+    ``cancel`` aborts a read in progress. Error events raise StreamError.
+    Both rely on the SDK's private HTTP client; without one (another replicate
+    release) the events come from ``prediction.stream()``, and a stalled read
+    is only ended by the caller's deadline and the prediction's cancel.
+    """
+    import httpx
+    from replicate.exceptions import ReplicateError
+    from replicate.stream import EventSource, ServerSentEvent
+
+    url = prediction.urls and prediction.urls.get("stream", None)
+    if not url or not isinstance(url, str):
+        raise ReplicateError("Model does not support streaming")
+    # The SDK keeps its HTTP client private; this is the request prediction.stream() makes
+    http = getattr(getattr(prediction, "_client", None), "_client", None)
+    if not isinstance(http, httpx.Client):
+        try:
+            yield from prediction.stream()
+        except RuntimeError as e:
+            # The SDK raises error events as RuntimeError
+            raise StreamError(str(e)) from e
+        return
+    headers = {"Accept": "text/event-stream", "Cache-Control": "no-store"}
+    timeout = httpx.Timeout(read_timeout) if read_timeout else httpx.USE_CLIENT_DEFAULT
+    with http.stream("GET", url, headers=headers, timeout=timeout) as response:
+        response.raise_for_status()
+        if cancel is not None:
+            cancel.add_callback(lambda: _abort_response(response))
+        decoder = EventSource.Decoder()
+        for line in response.iter_lines():
+            event = decoder.decode(line.rstrip("\n"))
+            if event is None:
+                continue
+            if event.event == ServerSentEvent.EventType.ERROR:
+                raise StreamError(event.data)
+            yield event
+            if event.event == ServerSentEvent.EventType.DONE:
+                return
+
+
+@contextmanager
+def _account(model: str, operation: str, kind: str, details: Dict[str, Any],
+             hedge: bool = False) -> Iterator[_CallTimer]:
+    record = CallRecord(model=model, operation=operation, kind=kind, hedge=hedge,
+                        started_at=datetime.now(timezone.utc).isoformat())
+    timer = _CallTimer(record)
+    if hedge:
+        details = dict(details, hedge=True)
+    with trace_span(f"{kind}.{operation}", kind, model=model, **details) as span:
+        try:
+            yield timer
+            record.status = "success"
+        except CallCanceled as e:
+            record.status = "canceled"
+            record.error = str(e)
+            raise
+        except BaseException as e:
+            record.status = "failed"
+            record.error = str(e)
+            raise
+        finally:
+            record.total_seconds = time.perf_counter() - timer.start
+            record.estimated_cost_usd = estimate_cost(record)
+
+            REMOTE_CALL_DURATION.labels(model=model, kind=kind).observe(record.total_seconds)
+            if record.first_byte_seconds is not None:
+                REMOTE_FIRST_BYTE.labels(model=model, kind=kind).observe(record.first_byte_seconds)
+            if record.estimated_cost_usd:
+                ESTIMATED_COST.labels(model=model).inc(record.estimated_cost_usd)
+
+            if span is not None:
+                span.details.update({k: v for k, v in asdict(record).items()
+                                     if v is not None and k not in ("model", "operation", "kind", "status")})
+            ledger = current_ledger()
+            if ledger is not None:
+                ledger.add(record)
+
+
+def accounted_run(model: str, input: Dict[str, Any], operation: str, kind: str = "render",
+                  cancel: Optional[CancelToken] = None, hedge: bool = False, **details: Any) -> Any:
+    """
+    Run a model and wait for its output, like ``replicate.run``, with accounting
+
+    Args:
+        model: Model reference ("owner/name" or "owner/name:version")
+        input: Model input
+        operation: Pipeline operation name (e.g. "render")
+        kind: Call kind for metrics and spans ("render" or "llm")
+        cancel: Token that cancels the prediction; the call then polls instead of blocking
+        hedge: Whether this call is a hedging duplicate
+        **details: Extra attributes for the trace span
+
+    Returns:
+        Model output with URLs wrapped as FileOutput objects
+
+    Raises:
+        ModelError: If the prediction fails
+        CallCanceled: If ``cancel`` was canceled first
+    """
+    import replicate
+    from replicate.exceptions import ModelError
+    from replicate.helpers import transform_output
+
+    with _account(model, operation, kind, details, hedge) as timer:
+        record = timer.record
+        # No first byte: the create blocks until the output is (nearly) ready
+        prediction = _create_prediction(model, input, wait=True if cancel is None else _CANCELABLE_WAIT)
+        if cancel is None:
+            if prediction.status not in ("succeeded", "failed", "canceled"):
+                prediction.wait()
+        else:
+            cancel.add_callback(lambda: _cancel_prediction(prediction))
+            while prediction.status not in ("succeeded", "failed", "canceled"):
+                cancel.check(operation)
+                time.sleep(replicate.default_client.poll_interval)
+                prediction.reload()
+            cancel.check(operation)
+        _apply_prediction(record, prediction)
+        if prediction.status != "succeeded":
+            raise ModelError(prediction)
+
+        output = prediction.output
+        if kind == "render":
+            record.output_images = len(output) if isinstance(output, list) else int(output is not None)
+        return transform_output(output, replicate.default_client)
+
+
+def accounted_stream(model: str, input: Dict[str, Any], operation: str, kind: str = "llm",
+                     cancel: Optional[CancelToken] = None, hedge: bool = False,
+                     read_timeout: Optional[float] = None, **details: Any) -> Iterator[Any]:
+    """
+    Run a model and stream its output, like ``replicate.stream``, with accounting
+
+    After the stream ends the prediction is reloaded once for its token metrics.
+
+    Args:
+        model: Model reference ("owner/name" or "owner/name:version")
+        input: Model input
+        operation: Pipeline operation name (e.g. "brand_name")
+        kind: Call kind for metrics and spans
+        cancel: Token that cancels the prediction and aborts its stream
+        hedge: Whether this call is a hedging duplicate
+        read_timeout: Seconds a read may wait for data (default: the client's)
+        **details: Extra attributes for the trace span
+
+    Yields:
+        Server-sent events; ``str(event)`` is the output text
+
+    Raises:
+        CallCanceled: If ``cancel`` was canceled before the stream finished
+        StreamError: If the stream reported an error event
+    """
+    from replicate.stream import ServerSentEvent
+
+    with _account(model, operation, kind, details, hedge) as timer:
+        record = timer.record
+        prediction = _create_prediction(model, input, stream=True)
+        if cancel is not None:
+            cancel.add_callback(lambda: _cancel_prediction(prediction))
+        try:
+            for event in _stream_events(prediction, cancel, read_timeout):
+                if cancel is not None:
+                    cancel.check(operation)
+                if event.event == ServerSentEvent.EventType.OUTPUT:
+                    timer.first_byte()
+                yield event
+        except Exception:
+            # An aborted read surfaces as a transport error; report it as the cancel it is
+            if cancel is not None:
+                cancel.check(operation)
+            raise
+        if cancel is not None:
+            cancel.check(operation)
+        try:
+            prediction.reload()
+            _apply_prediction(record, prediction)
+        except Exception as e:
+            record.prediction_id = prediction.id
+            logger.warning(f"Could not fetch metrics for prediction {prediction.id}: {e}")
@@ -0,0 +1,289 @@
+"""Asset Index - BM25 retrieval over asset chunks for prompt enrichment"""
+
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .assets_loader import LargeTextAsset, iter_large_asset_blocks, read_large_asset_range
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English-like text
+CHARS_PER_TOKEN = 4
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "that", "the", "this", "to", "with", "we", "our",
+    "you", "your", "so", "they", "them", "will", "should", "can", "but", "not",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a text without a tokenizer"""
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed"""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def chunk_text(text: str, max_chars: int = 1200) -> List[str]:
+    """
+    Split text into chunks of whole paragraphs of at most ``max_chars``
+
+    Paragraphs longer than ``max_chars`` are split on whitespace.
+
+    Args:
+        text: Text to split
+        max_chars: Maximum chunk size in characters
+
+    Returns:
+        List of non-empty chunks in document order
+    """
+    chunks: List[str] = []
+    current = ""
+
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+
+        # Break up oversized paragraphs first
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+
+        if current and len(current) + 2 + len(paragraph) > max_chars:
+            chunks.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+@dataclass
+class AssetChunk:
+    """A retrievable piece of an asset file
+
+    Chunks of large assets keep only their byte range; the text is read back
+    from the file when the chunk is selected.
+    """
+    chunk_id: int
+    source: str
+    position: int  # Order of the chunk within its source
+    text: Optional[str]
+    tokens: int
+    large_asset: Optional[LargeTextAsset] = None
+    byte_range: Optional[Tuple[int, int]] = None
+
+    def read_text(self) -> str:
+        """Return the chunk text, reading it from disk for large assets"""
+        if self.text is not None:
+            return self.text
+        return read_large_asset_range(self.large_asset, *self.byte_range).strip()
+
+
+class AssetIndex:
+    """Inverted BM25 index over asset chunks, updated incrementally per source file"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, chunk_chars: int = 1200):
+        """
+        Initialize asset index
+
+        Args:
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+            chunk_chars: Maximum chunk size in characters
+        """
+        self.k1 = k1
+        self.b = b
+        self.chunk_chars = chunk_chars
+
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._chunks: Dict[int, AssetChunk] = {}
+        self._lengths: Dict[int, int] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._total_length = 0
+        # Source name -> (content or large asset indexed, chunk ids), in insertion order
+        self._sources: Dict[str, Tuple[object, List[int]]] = {}
+        # Source name -> terms of its chunks, so removal only touches their postings
+        self._source_terms: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def update(self, assets: Dict[str, str], large_assets: Sequence[LargeTextAsset] = ()) -> int:
+        """
+        Bring the index in line with an asset set
+
+        Only sources whose content changed are re-chunked; sources missing from
+        the asset set are removed. Large assets are streamed block by block and
+        only their byte ranges are kept.
+
+        Args:
+            assets: Dictionary mapping filename to content
+            large_assets: Assets too large to hold as one string
+
+        Returns:
+            Number of sources (re)indexed
+        """
+        current: Dict[str, object] = dict(assets)
+        for asset in large_assets:
+            current[asset.name] = asset
+
+        changed = 0
+        with self._lock:
+            for source in [s for s in self._sources if s not in current]:
+                self._remove_source(source)
+
+            for source, content in current.items():
+                indexed = self._sources.get(source)
+                # Content strings come from the shared cache, so identity is the fast path
+                if indexed is not None and (indexed[0] is content or indexed[0] == content):
+                    continue
+                if indexed is not None:
+                    self._remove_source(source)
+                if isinstance(content, LargeTextAsset):
+                    self._add_large_source(source, content)
+                else:
+                    self._add_source(source, content)
+                changed += 1
+
+        if changed:
+            logger.info(f"Indexed {changed} asset source(s) ({len(self._chunks)} chunks total)")
+        return changed
+
+    def _add_chunk(self, chunk: AssetChunk, text: str) -> Iterable[str]:
+        terms = Counter(tokenize(text))
+        self._chunks[chunk.chunk_id] = chunk
+        self._lengths[chunk.chunk_id] = sum(terms.values())
+        self._total_length += self._lengths[chunk.chunk_id]
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[chunk.chunk_id] = tf
+        return terms.keys()
+
+    def _add_source(self, source: str, content: str) -> None:
+        ids = []
+        terms: Set[str] = set()
+        for position, text in enumerate(chunk_text(content, self.chunk_chars)):
+            chunk = AssetChunk(self._next_id, source, position, text, estimate_tokens(text))
+            self._next_id += 1
+            terms.update(self._add_chunk(chunk, text))
+            ids.append(chunk.chunk_id)
+        self._sources[source] = (content, ids)
+        self._source_terms[source] = terms
+
+    def _add_large_source(self, source: str, asset: LargeTextAsset) -> None:
+        ids = []
+        terms: Set[str] = set()
+        blocks = iter_large_asset_blocks(asset, self.chunk_chars)
+        for position, (start, end, text) in enumerate(blocks):
+            if not text.strip():
+                continue
+            chunk = AssetChunk(self._next_id, source, position, None, estimate_tokens(text),
+                               large_asset=asset, byte_range=(start, end))
+            self._next_id += 1
+            terms.update(self._add_chunk(chunk, text))
+            ids.append(chunk.chunk_id)
+        self._sources[source] = (asset, ids)
+        self._source_terms[source] = terms
+
+    def _remove_source(self, source: str) -> None:
+        _, ids = self._sources.pop(source)
+        for chunk_id in ids:
+            del self._chunks[chunk_id]
+            self._total_length -= self._lengths.pop(chunk_id)
+        # Only the source's own terms are touched (large assets keep no chunk text to re-read)
+        for term in self._source_terms.pop(source):
+            postings = self._postings[term]
+            for chunk_id in ids:
+                postings.pop(chunk_id, None)
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str) -> List[Tuple[float, AssetChunk]]:
+        """
+        Score every chunk against a query with BM25
+
+        Args:
+            query: Free-text query
+
+        Returns:
+            (score, chunk) pairs for all chunks, best first; ties keep library order
+        """
+        with self._lock:
+            n = len(self._chunks)
+            if n == 0:
+                return []
+            avg_length = self._total_length / n or 1.0
+            scores: Dict[int, float] = {}
+
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            order = {source: i for i, source in enumerate(self._sources)}
+            ranked = sorted(
+                self._chunks.values(),
+                key=lambda c: (-scores.get(c.chunk_id, 0.0), order[c.source], c.position)
+            )
+            return [(scores.get(c.chunk_id, 0.0), c) for c in ranked]
+
+    def select(self, query: str, top_k: int, token_budget: int) -> List[AssetChunk]:
+        """
+        Pick the most relevant chunks that fit a token budget
+
+        Chunks that match no query term still fill any leftover budget, so
+        general guidance (tone, colors) is kept when it fits.
+
+        Args:
+            query: Free-text query
+            top_k: Maximum number of chunks
+            token_budget: Maximum total estimated tokens
+
+        Returns:
+            Selected chunks in library order
+        """
+        selected: List[AssetChunk] = []
+        used = 0
+        for _, chunk in self.search(query):
+            if len(selected) >= top_k:
+                break
+            if used + chunk.tokens > token_budget:
+                continue
+            selected.append(chunk)
+            used += chunk.tokens
+
+        with self._lock:
+            order = {source: i for i, source in enumerate(self._sources)}
+        return sorted(selected, key=lambda c: (order.get(c.source, 0), c.position))
+
+
+def format_chunks(chunks: Iterable[AssetChunk]) -> str:
+    """Format selected chunks grouped by source, like AssetsLoader.format_assets_for_prompt"""
+    sections: Dict[str, List[str]] = {}
+    for chunk in chunks:
+        sections.setdefault(chunk.source, []).append(chunk.read_text())
+    return "\n\n".join(f"From {source}:\n" + "\n\n".join(texts) for source, texts in sections.items())
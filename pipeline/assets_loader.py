@@ -1,23 +1,343 @@
 """Assets Loader - Load and process text and image assets from local storage"""
 
+import codecs
 import logging
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+if TYPE_CHECKING:
+    from .asset_index import AssetIndex
 
 logger = logging.getLogger(__name__)
 
+# (mtime_ns, size, inode) - changes whenever a file is rewritten or replaced
+FileSignature = Tuple[int, int, int]
+
 
 class AssetsLoaderError(Exception):
     """Custom exception for assets loader errors"""
     pass
 
 
+class _SharedAssetCache:
+    """Process-wide cache of decoded asset files and formatted prompt sections
+
+    Files are keyed by absolute path and revalidated with a stat call, so a file
+    is only re-read when its (mtime, size, inode) signature changes. Shared by
+    every AssetsLoader in the process, which lets per-job loaders reuse the work
+    of earlier jobs.
+    """
+
+    MAX_FORMATTED_ENTRIES = 32
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._files: Dict[str, Tuple[FileSignature, "AssetContent"]] = {}
+        self._formatted: "OrderedDict[tuple, str]" = OrderedDict()
+
+    def get(self, path: str, signature: FileSignature) -> Optional["AssetContent"]:
+        """Return cached content if the file is unchanged, else None"""
+        entry = self._files.get(path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        return None
+
+    def put(self, path: str, signature: FileSignature, content: "AssetContent") -> None:
+        """Store decoded content for a file signature"""
+        with self._lock:
+            self._files[path] = (signature, content)
+
+    def discard(self, path: str) -> None:
+        """Forget a file that no longer exists or could not be read"""
+        with self._lock:
+            self._files.pop(path, None)
+
+    def get_formatted(self, key: tuple) -> Optional[str]:
+        """Return a memoized prompt section for an asset set"""
+        with self._lock:
+            formatted = self._formatted.get(key)
+            if formatted is not None:
+                self._formatted.move_to_end(key)
+            return formatted
+
+    def put_formatted(self, key: tuple, formatted: str) -> None:
+        """Memoize a prompt section, evicting the least recently used one"""
+        with self._lock:
+            self._formatted[key] = formatted
+            self._formatted.move_to_end(key)
+            while len(self._formatted) > self.MAX_FORMATTED_ENTRIES:
+                self._formatted.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached files and formatted sections"""
+        with self._lock:
+            self._files.clear()
+            self._formatted.clear()
+
+
+_shared_cache = _SharedAssetCache()
+
+
+def clear_assets_cache() -> None:
+    """Clear the process-wide assets cache (e.g. after bulk asset changes)"""
+    _shared_cache.clear()
+
+
+def iter_files(root: str, extensions: Optional[Set[str]] = None) -> Iterable[Tuple[str, os.stat_result]]:
+    """
+    Walk a directory tree once with os.scandir
+
+    Args:
+        root: Directory to walk
+        extensions: Optional set of lowercase suffixes (e.g. {'.txt'}) to keep
+
+    Yields:
+        Tuples of (path, stat result) for matching regular files
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file():
+                            if extensions is not None and os.path.splitext(entry.name)[1].lower() not in extensions:
+                                continue
+                            yield entry.path, entry.stat()
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.warning(f"Could not scan {directory}: {e}")
+
+
+# Files at least this large are memory-mapped instead of read into a bytes object
+MMAP_THRESHOLD_BYTES = 1024 * 1024
+# Encoding is detected from this many leading bytes
+ENCODING_SNIFF_BYTES = 64 * 1024
+# Bytes decoded per step; bounds the transient memory of a decode
+DECODE_BLOCK_BYTES = 1024 * 1024
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+
+@dataclass(frozen=True)
+class LargeTextAsset:
+    """A text asset too large to hold as one string
+
+    Only its location and encoding are kept; its content is streamed in bounded
+    blocks when it is indexed and read back chunk by chunk when selected.
+    """
+    path: str
+    name: str
+    size: int
+    encoding: str
+    offset: int  # First byte after any byte order mark
+    signature: FileSignature
+
+
+def detect_encoding(prefix: bytes) -> Tuple[str, int]:
+    """
+    Detect a text encoding from a bounded prefix of a file
+
+    Args:
+        prefix: Leading bytes of the file
+
+    Returns:
+        Tuple of (encoding, length of the byte order mark to skip)
+    """
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            return encoding, len(bom)
+
+    # A multi-byte character may be cut off at the end of the prefix
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+        return "utf-8", 0
+    except UnicodeDecodeError:
+        return "latin-1", 0
+
+
+def _align_block_end(buf, start: int, end: int, encoding: str) -> int:
+    """Move a block end back so it never splits a character (or, if possible, a line)"""
+    if end >= len(buf):
+        return len(buf)
+    if encoding.startswith("utf-16"):
+        return end - (end - start) % 2
+
+    if encoding == "utf-8":
+        # Never start the next block on a UTF-8 continuation byte
+        while end > start and (buf[end] & 0xC0) == 0x80:
+            end -= 1
+    # Prefer to cut after a newline in the second half of the block
+    newline = buf.rfind(b"\n", start + (end - start) // 2, end)
+    return newline + 1 if newline != -1 else end
+
+
+def iter_decoded_blocks(buf, encoding: str, start: int = 0, block_bytes: int = DECODE_BLOCK_BYTES,
+                        errors: str = "strict") -> Iterable[Tuple[int, int, str]]:
+    """
+    Decode a byte buffer (bytes or mmap) in bounded, character-aligned blocks
+
+    Args:
+        buf: Buffer to decode
+        encoding: Text encoding
+        start: Byte offset to start at (e.g. after a byte order mark)
+        block_bytes: Approximate bytes per block
+        errors: Codec error handling
+
+    Yields:
+        Tuples of (start byte, end byte, decoded text)
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+    size = len(buf)
+    while start < size:
+        end = _align_block_end(buf, start, start + block_bytes, encoding)
+        if end <= start:
+            end = min(start + block_bytes, size)
+        text = decoder.decode(buf[start:end], final=end >= size)
+        yield start, end, text
+        start = end
+
+
+@contextmanager
+def _open_buffer(path: str, size: int):
+    """Yield a file's bytes from a single read, memory-mapped for large files"""
+    with open(path, "rb") as f:
+        if size == 0:
+            yield b""
+        elif size >= MMAP_THRESHOLD_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+        else:
+            yield f.read()
+
+
+def iter_large_asset_blocks(asset: LargeTextAsset, block_bytes: int) -> Iterable[Tuple[int, int, str]]:
+    """Stream a large asset as decoded blocks without holding the whole file"""
+    with _open_buffer(asset.path, asset.size) as buf:
+        yield from iter_decoded_blocks(buf, asset.encoding, asset.offset, block_bytes, errors="replace")
+
+
+def read_large_asset_range(asset: LargeTextAsset, start: int, end: int) -> str:
+    """Read back one decoded block of a large asset"""
+    with open(asset.path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start).decode(asset.encoding, errors="replace")
+
+
+# Decoded text, or a handle to a file too large to hold as one string
+AssetContent = Union[str, LargeTextAsset]
+
+
+def _has_content(content: Optional[AssetContent]) -> bool:
+    return isinstance(content, LargeTextAsset) or bool(content and content.strip())
+
+
+class _WatchedAssets:
+    """Live text asset set for one directory, kept current by an AssetsWatcher"""
+
+    def __init__(self, loader: "AssetsLoader", root: str):
+        self.loader = loader
+        self.root = root
+        self.watcher = None
+        self._lock = threading.Lock()
+        # Absolute path -> content (or large asset), for every non-empty text asset
+        self._files: Dict[str, AssetContent] = {}
+
+    def snapshot(self) -> Tuple[Dict[str, str], List[LargeTextAsset]]:
+        """Return the current asset set as (filename -> content, large assets)"""
+        with self._lock:
+            items = sorted(self._files.items())
+        assets = {Path(path).name: content for path, content in items if isinstance(content, str)}
+        large = [content for _, content in items if isinstance(content, LargeTextAsset)]
+        return assets, large
+
+    def apply_changes(self, changed: Set[str]) -> None:
+        """Update only the files affected by a batch of change events"""
+        for path in sorted(changed):
+            if os.path.isdir(path) or (not os.path.exists(path) and self._has_children(path)):
+                self._rescan(path)
+            else:
+                self._refresh_file(path)
+
+    def _has_children(self, directory: str) -> bool:
+        prefix = directory.rstrip(os.sep) + os.sep
+        with self._lock:
+            return any(p.startswith(prefix) for p in self._files)
+
+    def _rescan(self, directory: str) -> None:
+        """Reload every text file below a directory that was added, removed or overflowed"""
+        prefix = directory.rstrip(os.sep) + os.sep
+        found = {}
+        paths = iter_files(directory, self.loader.TEXT_EXTENSIONS) if os.path.isdir(directory) else []
+        for path, st in paths:
+            content = self.loader._load_cached(path, st)
+            if _has_content(content):
+                found[path] = content
+        with self._lock:
+            for path in [p for p in self._files if p.startswith(prefix)]:
+                del self._files[path]
+            self._files.update(found)
+
+    def _refresh_file(self, path: str) -> None:
+        if os.path.splitext(path)[1].lower() not in self.loader.TEXT_EXTENSIONS:
+            return
+        try:
+            st = os.stat(path)
+        except OSError:
+            _shared_cache.discard(path)
+            with self._lock:
+                self._files.pop(path, None)
+            logger.info(f"  ✗ Asset removed: {Path(path).name}")
+            return
+
+        content = self.loader._load_cached(path, st)
+        with self._lock:
+            if _has_content(content):
+                self._files[path] = content
+            else:
+                self._files.pop(path, None)
+
+
+# Resolved assets directory -> retrieval index over its text assets
+_indexes: Dict[str, "AssetIndex"] = {}
+_indexes_lock = threading.Lock()
+
+# Resolved assets directory -> live asset set maintained by a watcher
+_watched: Dict[str, _WatchedAssets] = {}
+_watched_lock = threading.Lock()
+
+
 class AssetsLoader:
     """Load text assets from local folder to enrich prompts"""
 
     # Supported text file extensions
     TEXT_EXTENSIONS = {'.txt', '.md', '.markdown', '.text'}
 
+    # Text files larger than this are streamed into the retrieval index in
+    # chunks instead of being held as one string
+    MAX_INLINE_BYTES = 4 * 1024 * 1024
+
+    # Supported reference image extensions
+    IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp'}
+
+    # Defaults for relevance-ranked prompt enrichment (overridable via environment)
+    DEFAULT_TOKEN_BUDGET = 1500
+    DEFAULT_TOP_K = 8
+
     def __init__(self, assets_dir: str = "assets"):
         """
         Initialize assets loader
@@ -27,6 +347,7 @@ class AssetsLoader:
         """
         self.assets_dir = Path(assets_dir)
         self.assets_cache: Dict[str, str] = {}
+        self.large_assets: List[LargeTextAsset] = []
 
         if not self.assets_dir.exists():
             logger.warning(f"Assets directory does not exist: {assets_dir}")
@@ -47,29 +368,140 @@ class AssetsLoader:
             logger.warning(f"Assets directory not found: {self.assets_dir}")
             return {}
 
+        # A running watcher keeps the asset set current; no walk or stat needed
+        watched = _watched.get(str(self.assets_dir.resolve()))
+        if watched is not None:
+            self.assets_cache, self.large_assets = watched.snapshot()
+            return self.assets_cache
+
         assets = {}
-        text_files = self._find_text_files()
+        text_files = self._scan_text_files()
 
         if not text_files:
             logger.info("No text assets found in assets directory")
+            self.assets_cache = {}
+            self.large_assets = []
             return {}
 
-        logger.info(f"Found {len(text_files)} text asset(s)")
+        large = []
+        reloaded = 0
+        for file_path, st in text_files:
+            content = _shared_cache.get(file_path, (st.st_mtime_ns, st.st_size, st.st_ino))
+            if content is None:
+                content = self._load_cached(file_path, st)
+                reloaded += 1
+            if isinstance(content, LargeTextAsset):
+                large.append(content)
+            elif content and content.strip():
+                assets[Path(file_path).name] = content
 
-        for file_path in text_files:
-            try:
-                content = self._read_text_file(file_path)
-                if content and content.strip():
-                    assets[file_path.name] = content
-                    logger.info(f"  ✓ Loaded: {file_path.name} ({len(content)} chars)")
-                else:
-                    logger.warning(f"  ⚠ Skipped empty file: {file_path.name}")
-            except Exception as e:
-                logger.warning(f"  ✗ Failed to load {file_path.name}: {str(e)}")
+        logger.info(f"Found {len(text_files)} text asset(s) ({reloaded} reloaded)")
 
         self.assets_cache = assets
+        self.large_assets = large
         return assets
 
+    def start_watching(self, poll_interval: float = 2.0, use_inotify: bool = True) -> None:
+        """
+        Keep this directory's asset set current with a background file watcher
+
+        Once watching, load_all_text_assets returns the live asset set without
+        walking the directory; changed files are reloaded as events arrive. The
+        watcher is shared by every loader for the same directory.
+
+        Args:
+            poll_interval: Seconds between scans when inotify is unavailable
+            use_inotify: Set False to force polling
+        """
+        if not self.assets_dir.exists():
+            logger.warning(f"Cannot watch missing assets directory: {self.assets_dir}")
+            return
+
+        from .assets_watcher import AssetsWatcher
+
+        root = str(self.assets_dir.resolve())
+        with _watched_lock:
+            if root in _watched:
+                return
+            watched = _WatchedAssets(self, root)
+            watched.watcher = AssetsWatcher(
+                root,
+                watched.apply_changes,
+                poll_interval=poll_interval,
+                use_inotify=use_inotify,
+                file_filter=lambda path: os.path.splitext(path)[1].lower() in self.TEXT_EXTENSIONS
+            )
+            # Start watching before the initial scan so no edit falls in between
+            watched.watcher.start()
+            watched.apply_changes({root})
+            _watched[root] = watched
+
+    def stop_watching(self) -> None:
+        """Stop the watcher for this directory, if one is running"""
+        with _watched_lock:
+            watched = _watched.pop(str(self.assets_dir.resolve()), None)
+        if watched is not None and watched.watcher is not None:
+            watched.watcher.stop()
+
+    def _load_cached(self, path: str, st: os.stat_result) -> Optional[AssetContent]:
+        """
+        Return file content through the shared cache, reading only on a miss
+
+        Files over MAX_INLINE_BYTES are not read here; a LargeTextAsset handle
+        is returned instead. Returns None (and logs) when the file cannot be read.
+        """
+        signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+        content = _shared_cache.get(path, signature)
+        if content is not None:
+            return content
+
+        name = Path(path).name
+        try:
+            if st.st_size > self.MAX_INLINE_BYTES:
+                with open(path, "rb") as f:
+                    encoding, offset = detect_encoding(f.read(ENCODING_SNIFF_BYTES))
+                content = LargeTextAsset(path, name, st.st_size, encoding, offset, signature)
+            else:
+                content = self._read_text_file(Path(path))
+        except Exception as e:
+            _shared_cache.discard(path)
+            logger.warning(f"  ✗ Failed to load {name}: {str(e)}")
+            return None
+
+        _shared_cache.put(path, signature, content)
+        if isinstance(content, LargeTextAsset):
+            logger.info(f"  ✓ Streaming large asset: {name} ({st.st_size} bytes, {content.encoding})")
+        elif content and content.strip():
+            logger.info(f"  ✓ Loaded: {name} ({len(content)} chars)")
+        else:
+            logger.warning(f"  ⚠ Skipped empty file: {name}")
+        return content
+
+    def _scan_text_files(self) -> List[Tuple[str, os.stat_result]]:
+        """
+        Find all text files with their stat results in a single directory walk
+
+        Returns:
+            Sorted list of (absolute path, stat result) tuples
+        """
+        root = str(self.assets_dir.resolve())
+        return sorted(iter_files(root, self.TEXT_EXTENSIONS), key=lambda item: item[0])
+
+    def find_image_assets(self) -> List[Path]:
+        """
+        Find all reference images (style references, logos, product photos)
+
+        Returns:
+            Sorted list of image file paths
+        """
+        if not self.assets_dir.exists():
+            return []
+        root = str(self.assets_dir.resolve())
+        images = sorted(Path(path) for path, _ in iter_files(root, self.IMAGE_EXTENSIONS))
+        if images:
+            logger.info(f"Found {len(images)} reference image(s)")
+        return images
+
     def _find_text_files(self) -> List[Path]:
         """
         Find all text files in assets directory
@@ -77,17 +509,16 @@ class AssetsLoader:
         Returns:
             List of text file paths
         """
-        text_files = []
-
-        # Recursively find all text files
-        for ext in self.TEXT_EXTENSIONS:
-            text_files.extend(self.assets_dir.rglob(f"*{ext}"))
-
-        return sorted(text_files)
+        return [Path(path) for path, _ in self._scan_text_files()]
 
     def _read_text_file(self, file_path: Path) -> str:
         """
-        Read text file with encoding fallback
+        Read text file with encoding detection
+
+        The file is read once (memory-mapped when large). The encoding is
+        detected from a bounded prefix and the bytes are decoded in blocks. If
+        UTF-8 decoding fails further in, the same buffer is decoded as latin-1
+        without touching the disk again.
 
         Args:
             file_path: Path to text file
@@ -98,19 +529,20 @@ class AssetsLoader:
         Raises:
             AssetsLoaderError: If reading fails
         """
-        # Try UTF-8 first, then fall back to latin-1
-        encodings = ['utf-8', 'latin-1']
-
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    return f.read()
-            except UnicodeDecodeError:
-                continue
-            except Exception as e:
-                raise AssetsLoaderError(f"Failed to read {file_path}: {str(e)}")
-
-        raise AssetsLoaderError(f"Could not decode {file_path} with any supported encoding")
+        try:
+            size = os.path.getsize(file_path)
+            with _open_buffer(str(file_path), size) as buf:
+                encoding, offset = detect_encoding(buf[:ENCODING_SNIFF_BYTES])
+                try:
+                    return "".join(text for _, _, text in iter_decoded_blocks(buf, encoding, offset))
+                except UnicodeDecodeError:
+                    if encoding != "utf-8":
+                        raise
+                    return "".join(text for _, _, text in iter_decoded_blocks(buf, "latin-1", offset))
+        except UnicodeDecodeError:
+            raise AssetsLoaderError(f"Could not decode {file_path} with any supported encoding")
+        except Exception as e:
+            raise AssetsLoaderError(f"Failed to read {file_path}: {str(e)}")
 
     def format_assets_for_prompt(self, assets: Optional[Dict[str, str]] = None) -> str:
         """
@@ -128,13 +560,80 @@ class AssetsLoader:
         if not assets:
             return ""
 
+        # Content strings come from the shared cache, so their hashes are
+        # already computed and this key is cheap to build and compare
+        key = tuple(assets.items())
+        formatted = _shared_cache.get_formatted(key)
+        if formatted is not None:
+            return formatted
+
         # Build formatted output
         sections = []
 
         for filename, content in assets.items():
             sections.append(f"From {filename}:\n{content.strip()}")
 
-        return "\n\n".join(sections)
+        formatted = "\n\n".join(sections)
+        _shared_cache.put_formatted(key, formatted)
+        return formatted
+
+    def select_assets_for_prompt(self, campaign: dict, assets: Optional[Dict[str, str]] = None,
+                                 top_k: Optional[int] = None,
+                                 token_budget: Optional[int] = None) -> str:
+        """
+        Format only the asset chunks most relevant to a campaign, within a token budget
+
+        Small asset libraries that fit the budget are returned whole, exactly as
+        format_assets_for_prompt would. Larger ones are ranked with BM25 against
+        the campaign's products, market, audience and message, so the prompt size
+        stays bounded however large the library grows.
+
+        Args:
+            campaign: Campaign brief dictionary
+            assets: Optional dict of assets (uses cache if not provided)
+            top_k: Maximum number of chunks (default: ASSETS_TOP_K env or DEFAULT_TOP_K)
+            token_budget: Maximum estimated tokens (default: ASSETS_TOKEN_BUDGET env or DEFAULT_TOKEN_BUDGET)
+
+        Returns:
+            Formatted string with the selected asset contents
+        """
+        from .asset_index import AssetIndex, estimate_tokens, format_chunks
+
+        if assets is None:
+            assets = self.assets_cache
+        if not assets and not self.large_assets:
+            return ""
+
+        if top_k is None:
+            top_k = int(os.getenv("ASSETS_TOP_K", self.DEFAULT_TOP_K))
+        if token_budget is None:
+            token_budget = int(os.getenv("ASSETS_TOKEN_BUDGET", self.DEFAULT_TOKEN_BUDGET))
+
+        # Large assets never fit; everything else may be small enough to pass whole
+        if not self.large_assets:
+            formatted = self.format_assets_for_prompt(assets)
+            if estimate_tokens(formatted) <= token_budget:
+                return formatted
+
+        root = str(self.assets_dir.resolve())
+        with _indexes_lock:
+            index = _indexes.get(root)
+            if index is None:
+                index = _indexes[root] = AssetIndex()
+        index.update(assets, self.large_assets)
+
+        products = campaign.get("products", [])
+        query = " ".join([
+            " ".join(str(p) for p in products),
+            str(campaign.get("target_market", "")),
+            str(campaign.get("target_audience", "")),
+            str(campaign.get("campaign_message") or ""),
+            str(campaign.get("brand_name") or ""),
+        ])
+        chunks = index.select(query, top_k=top_k, token_budget=token_budget)
+        logger.info(f"Selected {len(chunks)} of {len(index)} asset chunk(s) "
+                    f"(~{sum(c.tokens for c in chunks)} of {token_budget} tokens)")
+        return format_chunks(chunks)
 
     def get_assets_summary(self, assets: Optional[Dict[str, str]] = None) -> str:
         """
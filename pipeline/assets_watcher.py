@@ -0,0 +1,234 @@
+"""Assets Watcher - Notify about file changes in the assets directory
+
+Uses Linux inotify (through ctypes, no extra dependency) when available and
+falls back to periodic stat polling everywhere else, e.g. on Docker Desktop bind
+mounts where inotify events from the host are not delivered.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from .assets_loader import iter_files
+
+logger = logging.getLogger(__name__)
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class AssetsWatcher:
+    """Watch a directory tree and report changed file paths in batches
+
+    The callback receives a set of absolute paths that were created, modified or
+    removed. A path reported for a directory means everything below it may have
+    changed. When the kernel event queue overflows, the root directory itself is
+    reported so the consumer rescans.
+    """
+
+    def __init__(self, root: str, on_change: Callable[[Set[str]], None],
+                 poll_interval: float = 2.0, debounce: float = 0.2,
+                 use_inotify: bool = True,
+                 file_filter: Optional[Callable[[str], bool]] = None):
+        """
+        Initialize assets watcher
+
+        Args:
+            root: Directory to watch recursively
+            on_change: Callback receiving a set of changed absolute paths
+            poll_interval: Seconds between scans in polling mode
+            debounce: Seconds to gather related events before calling back
+            use_inotify: Set False to force polling mode
+            file_filter: Optional predicate selecting which files matter in polling mode
+        """
+        self.root = str(Path(root).resolve())
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.file_filter = file_filter
+        self._libc = _load_libc() if use_inotify and sys.platform.startswith("linux") else None
+        self.mode = "inotify" if self._libc is not None else "polling"
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._fd = -1
+        self._watches: Dict[int, str] = {}
+        self._snapshot: Dict[str, Tuple[int, int, int]] = {}
+
+    def start(self) -> None:
+        """
+        Start watching in a daemon thread
+
+        Watches (or the polling baseline) are set up before this returns, so a
+        consumer that loads the tree afterwards cannot miss a change.
+        """
+        if self._thread is not None:
+            return
+
+        if self.mode == "inotify":
+            self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC) if self._libc else -1
+            if self._fd < 0:
+                logger.warning("inotify_init1 failed, falling back to polling")
+                self.mode = "polling"
+            else:
+                for directory in self._iter_dirs(self.root):
+                    self._add_watch(directory)
+        if self.mode == "polling":
+            self._snapshot = self._scan()
+
+        target = self._run_inotify if self.mode == "inotify" else self._run_polling
+        self._thread = threading.Thread(target=target, name="assets-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Watching assets directory {self.root} ({self.mode})")
+
+    def stop(self) -> None:
+        """Stop watching and wait for the thread to exit"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(self.poll_interval, 1.0) + 1.0)
+            self._thread = None
+
+    def _emit(self, changed: Set[str]) -> None:
+        """Hand a batch of changes to the callback without killing the thread"""
+        if not changed:
+            return
+        try:
+            self.on_change(changed)
+        except Exception as e:
+            logger.warning(f"Assets change handler failed: {e}")
+
+    # ---- inotify ----------------------------------------------------------
+
+    def _run_inotify(self) -> None:
+        fd = self._fd
+        try:
+            while not self._stop.is_set():
+                readable, _, _ = select.select([fd], [], [], 0.5)
+                if not readable:
+                    continue
+
+                changed: Set[str] = set()
+                self._drain_events(changed)
+                # Editors save in several steps; gather them into one batch
+                while not self._stop.is_set():
+                    readable, _, _ = select.select([fd], [], [], self.debounce)
+                    if not readable:
+                        break
+                    self._drain_events(changed)
+
+                self._emit(changed)
+        finally:
+            os.close(fd)
+
+    def _add_watch(self, directory: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            logger.warning(f"Could not watch {directory} (errno {ctypes.get_errno()})")
+            return
+        self._watches[wd] = directory
+
+    def _drain_events(self, changed: Set[str]) -> None:
+        """Read all pending inotify events and record the affected paths"""
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            if not data:
+                return
+
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _cookie, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + name_len].rstrip(b"\0")
+                offset += name_len
+
+                if mask & IN_Q_OVERFLOW:
+                    changed.add(self.root)
+                    continue
+                directory = self._watches.get(wd)
+                if directory is None:
+                    continue
+                if mask & IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    continue
+
+                path = os.path.join(directory, os.fsdecode(name)) if name else directory
+                changed.add(path)
+
+                # New subdirectories need their own watches
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    for sub in self._iter_dirs(path):
+                        self._add_watch(sub)
+
+    # ---- polling ----------------------------------------------------------
+
+    def _run_polling(self) -> None:
+        snapshot = self._snapshot
+        while not self._stop.wait(self.poll_interval):
+            current = self._scan()
+            changed = {
+                path for path in snapshot.keys() | current.keys()
+                if snapshot.get(path) != current.get(path)
+            }
+            snapshot = current
+            self._emit(changed)
+
+    def _scan(self) -> Dict[str, Tuple[int, int, int]]:
+        """Stat every file below the root in a single walk"""
+        signatures: Dict[str, Tuple[int, int, int]] = {}
+        for path, st in iter_files(self.root):
+            if self.file_filter is None or self.file_filter(path):
+                signatures[path] = (st.st_mtime_ns, st.st_size, st.st_ino)
+        return signatures
+
+    @staticmethod
+    def _iter_dirs(root: str) -> Iterable[str]:
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            yield directory
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+            except OSError:
+                continue
+
+
+def _load_libc():
+    """Load libc with inotify bindings, or return None when unavailable"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError):
+        return None
+    return libc
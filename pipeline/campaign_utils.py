@@ -5,49 +5,36 @@ prompt optimization, and validation.
 These functions are shared between the CLI (main.py) and the FastAPI backend.
 """
 
+import contextvars
 import logging
 import json
-import re
-from typing import Tuple
-from pydantic import BaseModel, Field
-import replicate
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .llm_client import get_llm_client
+from .events import log_event
+from .translation_memory import get_translation_memory
+from .prompt_validation import (
+    PromptValidationError,
+    record_validation,
+    repair_json,
+    retry_instruction,
+    validate_prompt_output
+)
 
 logger = logging.getLogger(__name__)
 
 
-class OptimizedPrompt(BaseModel):
-    """Structured output for optimized advertising prompt"""
-    image_prompt: str = Field(
-        description="Detailed image generation prompt that includes the brand name in quotes (but NOT product names in quotes), logo placement description, and campaign message"
-    )
-    translated_campaign_message: str = Field(
-        description="The campaign message in the target market language (as it will appear in the image)"
-    )
-    brand_mentions: int = Field(
-        description="Number of times the brand name appears in quotes in the prompt"
-    )
-    includes_logo: bool = Field(
-        description="Whether the prompt explicitly mentions the brand logo placement"
-    )
-    includes_campaign_message: bool = Field(
-        description="Whether the prompt includes the campaign message text"
-    )
-
-
-def generate_optimized_prompt(campaign: dict, assets_context: str = "", has_reference_images: bool = False) -> Tuple[str, str]:
-    """Use GPT-4 to generate optimized prompt from campaign brief with structured output
-
-    Args:
-        campaign: Campaign brief dictionary
-        assets_context: Optional context from loaded assets (style guides, brainstorms, etc.)
-        has_reference_images: Whether reference images are available in assets
+def __getattr__(name):
+    # The pydantic schema is loaded on first use; most runs never touch it
+    if name == "OptimizedPrompt":
+        from .schemas import OptimizedPrompt
+        return OptimizedPrompt
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    Returns:
-        Tuple of (optimized_prompt, translated_campaign_message)
-    """
 
-    # Build system prompt from the template with Seedream 4.0 best practices
-    system_prompt = """You are an expert creative strategist for advertising banners optimizing prompts for Seedream 4.0 image generation with global market expertise.
+PROMPT_SYSTEM_PROMPT = """You are an expert creative strategist for advertising banners optimizing prompts for Seedream 4.0 image generation with global market expertise.
 
 SEEDREAM 4.0 BEST PRACTICES:
 1. Use coherent natural language describing: subject + action + environment
@@ -110,42 +97,33 @@ Generate the following fields:
 - includes_logo: true if you mention logo placement
 - includes_campaign_message: true if you include the campaign message text"""
 
-    # Build user prompt with campaign details
-    products = campaign.get("products", [])
-    target_market = campaign.get("target_market", "")
-    target_audience = campaign.get("target_audience", "")
-    campaign_message = campaign.get("campaign_message", "")
-    brand_name = campaign.get("brand_name", "").strip()
-
-    # Convert products to simple list of strings
-    products_list = [str(p) for p in products]
 
-    # Build brand-specific instructions
+def _brand_instruction(brand_name: str) -> str:
+    """Brand section of a prompt brief"""
     if brand_name:
-        brand_instruction = f"""Brand Name: "{brand_name}"
+        return f"""Brand Name: "{brand_name}"
 - The brand name "{brand_name}" MUST appear in double quotes multiple times in your prompt
 - Include the "{brand_name}" logo prominently visible in the image (typically top-left or top-right corner)
 - Ensure strong brand presence throughout the scene"""
-    else:
-        brand_instruction = """Brand Name: Not specified
+    return """Brand Name: Not specified
 - Generate an appropriate brand name for these products and target market
 - The generated brand name MUST appear in double quotes multiple times in your prompt
 - Include the logo with this brand name prominently visible in the image (typically top-left or top-right corner)"""
 
-    # Add assets context if available
-    assets_section = ""
+
+def _guidance_sections(assets_context: str, has_reference_images: bool) -> str:
+    """Creative guidance (assets) and reference image sections of a prompt brief"""
+    sections = ""
     if assets_context:
-        assets_section = f"""
+        sections += f"""
 
 ADDITIONAL CREATIVE GUIDANCE:
 {assets_context}
 
 These guidelines should inform the visual style, mood, and creative approach of the banner."""
 
-    # Add reference image guidance if available
-    reference_image_section = ""
     if has_reference_images:
-        reference_image_section = """
+        sections += """
 
 REFERENCE IMAGES AVAILABLE:
 Reference images have been provided as visual style guides. Use these reference images to:
@@ -155,20 +133,132 @@ Reference images have been provided as visual style guides. Use these reference
 - Maintain consistency with the reference style while showcasing the campaign products
 
 The input reference images should guide the creative direction while ensuring all campaign requirements are met."""
+    return sections
+
+
+def _known_translation(campaign_message: str, market: str) -> Optional[str]:
+    """Stored translation of the campaign message for a market, if any"""
+    memory = get_translation_memory()
+    return memory.lookup(campaign_message, market) if memory and campaign_message else None
+
+
+def _settle_translation(campaign_message: str, market: str, result: "OptimizedPrompt",
+                        known: Optional[str]) -> str:
+    """
+    Store a validated prompt's translation and return the message its banners show
+
+    Only a translation the image prompt actually draws is stored. A stored
+    translation the prompt did not use is replaced by the one it did use.
+    """
+    translation = result.translated_campaign_message
+    drawn = translation in result.image_prompt
+    if known and known in result.image_prompt:
+        return known
+    memory = get_translation_memory()
+    if memory and campaign_message and drawn:
+        memory.store(campaign_message, market, translation, replace=bool(known))
+    elif known:
+        logger.warning(f"⚠ Optimized prompt for {market} uses neither the stored nor its own translation")
+    return translation
+
+
+def _log_prompt_validation(result: dict, **fields: Any) -> None:
+    log_event(
+        logger, "prompt_validation",
+        f"Structured output: brand mentions={result.get('brand_mentions', 'N/A')}, "
+        f"logo={result.get('includes_logo', 'N/A')}, "
+        f"campaign message={result.get('includes_campaign_message', 'N/A')}",
+        brand_mentions=result.get('brand_mentions'),
+        includes_logo=result.get('includes_logo'),
+        includes_campaign_message=result.get('includes_campaign_message'),
+        translated_campaign_message=result.get('translated_campaign_message'),
+        **fields
+    )
+
+
+def _validated_prompt(response: str, request: Dict[str, Any], brand_name: str,
+                      **fields: Any) -> "OptimizedPrompt":
+    """
+    Validate prompt output, repairing it locally and then retrying the call once
+
+    Raises:
+        PromptValidationError: If the retried output is still invalid
+    """
+    try:
+        result, repaired = validate_prompt_output(response, brand_name)
+        record_validation("repaired" if repaired else "valid", **fields)
+    except PromptValidationError as e:
+        logger.warning(f"⚠ Optimized prompt failed validation ({e}); retrying once with the errors")
+        retry_request = dict(request, prompt=f"{request['prompt']}\n\n{retry_instruction(e)}", temperature=0.2)
+        response = get_llm_client().complete(input=retry_request, operation="optimize_prompt_retry")
+        try:
+            result, _ = validate_prompt_output(response, brand_name)
+        except PromptValidationError as retry_error:
+            record_validation("failed", errors=retry_error.errors, **fields)
+            raise PromptValidationError(f"Optimized prompt failed validation after a retry: {retry_error}",
+                                        retry_error.errors) from retry_error
+        record_validation("retried", **fields)
+    _log_prompt_validation(result.model_dump(), **fields)
+    return result
+
+
+def generate_optimized_prompt(campaign: dict, assets_context: str = "", has_reference_images: bool = False) -> Tuple[str, str]:
+    """Use GPT-4 to generate optimized prompt from campaign brief with structured output
+
+    Args:
+        campaign: Campaign brief dictionary
+        assets_context: Optional context from loaded assets (style guides, brainstorms, etc.)
+        has_reference_images: Whether reference images are available in assets
+
+    Returns:
+        Tuple of (optimized_prompt, translated_campaign_message)
+
+    Raises:
+        PromptValidationError: If the output is invalid after local repair and one retry
+    """
+    # Build user prompt with campaign details
+    products = campaign.get("products", [])
+    target_market = campaign.get("target_market", "")
+    target_audience = campaign.get("target_audience", "")
+    campaign_message = campaign.get("campaign_message", "")
+    brand_name = campaign.get("brand_name", "").strip()
+
+    # Convert products to simple list of strings
+    products_list = [str(p) for p in products]
+
+    brand_instruction = _brand_instruction(brand_name)
+    guidance = _guidance_sections(assets_context, has_reference_images)
+
+    # A translation from an earlier job is passed as fixed text instead of being asked for again
+    known_translation = _known_translation(campaign_message, target_market)
+    if known_translation:
+        message_brief = f'Campaign Message (FIXED {target_market.upper()} TEXT): "{known_translation}"'
+        message_requirement = f"""1. Campaign Message: Use "{known_translation}" EXACTLY as given (already localized, do NOT translate or rephrase)"""
+        message_quotes = f'Campaign message as "{known_translation}"'
+        message_reminder = ""
+    else:
+        message_brief = f'Campaign Message (ORIGINAL ENGLISH): "{campaign_message}"'
+        message_requirement = f"""1. Campaign Message Translation:
+   - If {target_market} is US, UK, Australia, or Canada: Use the English message "{campaign_message}" AS-IS (do NOT translate)
+   - For other markets: TRANSLATE "{campaign_message}" to the primary language of {target_market}"""
+        message_quotes = "Campaign message: Use English AS-IS for US/UK/Australia/Canada, TRANSLATE to local language for other markets"
+        message_reminder = f"""IMPORTANT:
+- For English-speaking markets (US, UK, Australia, Canada): Use "{campaign_message}" exactly as provided
+- For other markets: Translate "{campaign_message}" to the target market's primary language
+
+"""
 
     user_prompt = f"""Campaign Brief:
 Products: {', '.join(products_list)}
 Target Market: {target_market}
 Target Audience: {target_audience}
-Campaign Message (ORIGINAL ENGLISH): "{campaign_message}"
-{brand_instruction}{assets_section}{reference_image_section}
+{message_brief}
+{brand_instruction}{guidance}
 
 Create a detailed Seedream 4.0 optimized prompt for a professional advertising banner that showcases ALL products together.
 
 CRITICAL LOCALIZATION REQUIREMENTS FOR {target_market.upper()} MARKET:
-1. Campaign Message Translation:
-   - If {target_market} is US, UK, Australia, or Canada: Use the English message "{campaign_message}" AS-IS (do NOT translate)
-   - For other markets: TRANSLATE "{campaign_message}" to the primary language of {target_market}
+{message_requirement}
 2. Adapt visual style, colors, and composition to {target_market} cultural preferences
 3. Consider {target_market} cultural symbolism, color meanings, and aesthetic values
 4. The campaign message MUST appear in the image in double quotes
@@ -177,7 +267,7 @@ SEEDREAM 4.0 PROMPT REQUIREMENTS:
 1. Use natural, coherent language: describe subject + action + environment
 2. Put ALL text in double quotes:
    - Brand name as "{brand_name if brand_name else '<Generated Brand>'}"
-   - Campaign message: Use English AS-IS for US/UK/Australia/Canada, TRANSLATE to local language for other markets
+   - {message_quotes}
 3. Show all actual products in the scene: {', '.join(products_list)}
 4. Specify this is for an "advertising banner for {target_market} market"
 5. Include specific details about lighting, colors, composition, and atmosphere reflecting {target_market} aesthetic
@@ -185,57 +275,185 @@ SEEDREAM 4.0 PROMPT REQUIREMENTS:
 7. Use professional advertising photography aesthetics appropriate for {target_market}
 8. Create a cohesive scene that naturally features all products together
 
-IMPORTANT:
-- For English-speaking markets (US, UK, Australia, Canada): Use "{campaign_message}" exactly as provided
-- For other markets: Translate "{campaign_message}" to the target market's primary language
-
-Target the visual style and cultural preferences for {target_market} market and {target_audience} audience."""
+{message_reminder}Target the visual style and cultural preferences for {target_market} market and {target_audience} audience."""
 
     logger.info("Optimizing prompt with GPT-4 (structured output)...")
 
     # Generate optimized prompt using GPT-4 with JSON mode (streaming approach)
     # Note: Replicate's OpenAI models return lists, so we use streaming directly
-    full_response = ""
-    for event in replicate.stream(
-        "openai/gpt-4.1-nano",
+    request = {
+        "prompt": user_prompt,
+        "system_prompt": PROMPT_SYSTEM_PROMPT,
+        "temperature": 0.7,
+        "max_completion_tokens": 600,
+        "top_p": 1,
+        "presence_penalty": 0,
+        "frequency_penalty": 0,
+        "response_format": {"type": "json_object"}
+    }
+    full_response = get_llm_client().complete(input=request, operation="optimize_prompt")
+
+    # Never render from unvalidated output: repair, retry once, or fail here
+    result = _validated_prompt(full_response, request, brand_name, target_market=target_market)
+    return result.image_prompt, _settle_translation(campaign_message, target_market, result, known_translation)
+
+
+def brief_markets(campaign: dict) -> List[str]:
+    """Target markets of a brief: ``target_markets`` if given, else ``target_market`` (deduplicated, in order)"""
+    markets = campaign.get("target_markets") or [campaign.get("target_market") or ""]
+    unique: List[str] = []
+    for market in markets:
+        market = str(market).strip()
+        if market and market.lower() not in (m.lower() for m in unique):
+            unique.append(market)
+    return unique
+
+
+def market_campaign(campaign: dict, market: str) -> dict:
+    """Copy of a brief targeting a single market"""
+    single = {key: value for key, value in campaign.items() if key != "target_markets"}
+    single["target_market"] = market
+    return single
+
+
+def generate_market_prompts(campaign: dict, markets: List[str], assets_context: str = "",
+                            has_reference_images: bool = False,
+                            batch_size: Optional[int] = None) -> Dict[str, Tuple[str, str]]:
+    """Generate optimized prompts and translated messages for many markets with batched LLM calls
+
+    One call covers up to ``batch_size`` markets; batches run concurrently. A market
+    missing from a batched response, or whose entry fails validation, falls back to its
+    own generate_optimized_prompt call.
+
+    Args:
+        campaign: Enriched campaign brief (brand name and message filled in)
+        markets: Target markets
+        assets_context: Optional context from loaded assets
+        has_reference_images: Whether reference images are available in assets
+        batch_size: Markets per call (default: MARKET_PROMPT_BATCH_SIZE env, 5)
+
+    Returns:
+        Dictionary of market -> (optimized_prompt, translated_campaign_message), in market order
+    """
+    batch_size = max(1, batch_size or int(os.getenv("MARKET_PROMPT_BATCH_SIZE", "5")))
+    batches = [markets[i:i + batch_size] for i in range(0, len(markets), batch_size)]
+    logger.info(f"Optimizing prompts for {len(markets)} markets in {len(batches)} batched call(s)...")
+
+    results: Dict[str, Tuple[str, str]] = {}
+    if len(batches) == 1:
+        results.update(_generate_prompt_batch(campaign, batches[0], assets_context, has_reference_images))
+    else:
+        # Each batch runs in a copy of this context so its call is accounted to the caller's reporter
+        with ThreadPoolExecutor(max_workers=len(batches), thread_name_prefix="prompt-batch") as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, _generate_prompt_batch,
+                            campaign, batch, assets_context, has_reference_images)
+                for batch in batches
+            ]
+            for future in futures:
+                results.update(future.result())
+
+    for market in markets:
+        if market not in results:
+            logger.warning(f"No valid prompt for {market} in the batched response; optimizing it separately")
+            results[market] = generate_optimized_prompt(
+                market_campaign(campaign, market), assets_context, has_reference_images)
+    return {market: results[market] for market in markets}
+
+
+def _generate_prompt_batch(campaign: dict, markets: List[str], assets_context: str,
+                           has_reference_images: bool) -> Dict[str, Tuple[str, str]]:
+    """One LLM call returning the prompt and translated message for each of several markets"""
+    products_list = [str(p) for p in campaign.get("products", [])]
+    target_audience = campaign.get("target_audience", "")
+    campaign_message = campaign.get("campaign_message", "")
+    brand_name = (campaign.get("brand_name") or "").strip()
+    market_list = ", ".join(markets)
+
+    # Translations from earlier jobs are passed as fixed text instead of being asked for again
+    known_translations: Dict[str, str] = {}
+    for market in markets:
+        translation = _known_translation(campaign_message, market)
+        if translation:
+            known_translations[market] = translation
+    fixed_translations = ""
+    if known_translations:
+        lines = [f'- {market}: "{translation}"' for market, translation in known_translations.items()]
+        fixed_translations = ("\nFixed Campaign Message Translations (use EXACTLY as given, do NOT translate or rephrase):\n"
+                              + "\n".join(lines))
+
+    user_prompt = f"""Campaign Brief:
+Products: {', '.join(products_list)}
+Target Markets: {market_list}
+Target Audience: {target_audience}
+Campaign Message (ORIGINAL ENGLISH): "{campaign_message}"{fixed_translations}
+{_brand_instruction(brand_name)}{_guidance_sections(assets_context, has_reference_images)}
+
+Create one detailed Seedream 4.0 optimized prompt per target market ({market_list}), each for a professional advertising banner that showcases ALL products together. Treat every market as its own brief.
+
+CRITICAL LOCALIZATION REQUIREMENTS FOR EACH MARKET:
+1. Campaign Message Translation:
+   - For markets with a fixed translation above: Use that translation EXACTLY as given
+   - For US, UK, Australia, or Canada: Use the English message "{campaign_message}" AS-IS (do NOT translate)
+   - For other markets: TRANSLATE "{campaign_message}" to the primary language of that market
+2. Adapt visual style, colors, and composition to the market's cultural preferences
+3. Consider the market's cultural symbolism, color meanings, and aesthetic values
+4. The campaign message MUST appear in the image in double quotes
+5. Use the same brand name "{brand_name if brand_name else '<Generated Brand>'}" in every market
+
+SEEDREAM 4.0 PROMPT REQUIREMENTS (for every market):
+1. Use natural, coherent language: describe subject + action + environment
+2. Put ALL text in double quotes (brand name and campaign message)
+3. Show all actual products in the scene: {', '.join(products_list)}
+4. Specify this is for an "advertising banner for <MARKET> market"
+5. Include specific details about lighting, colors, composition, and atmosphere reflecting that market's aesthetic
+6. Describe brand logo placement clearly (e.g., "top-right corner with clear visibility")
+7. Create a cohesive scene that naturally features all products together
+
+Return a JSON object of the form {{"markets": [...]}} with exactly one entry per target market, in the order listed. Each entry has the fields "target_market" (the market exactly as listed), "image_prompt", "translated_campaign_message", "brand_mentions", "includes_logo" and "includes_campaign_message".
+
+Target the {target_audience} audience in every market."""
+
+    full_response = get_llm_client().complete(
         input={
             "prompt": user_prompt,
-            "system_prompt": system_prompt,
+            "system_prompt": PROMPT_SYSTEM_PROMPT,
             "temperature": 0.7,
-            "max_completion_tokens": 600,
+            "max_completion_tokens": 600 * len(markets),
             "top_p": 1,
             "presence_penalty": 0,
             "frequency_penalty": 0,
             "response_format": {"type": "json_object"}
         },
-    ):
-        full_response += str(event)
-
-    full_response = full_response.strip()
+        operation="optimize_prompt_batch",
+        markets=len(markets)
+    )
 
-    # Try to parse as JSON
     try:
-        # Clean up common JSON formatting issues
-        cleaned_response = full_response
-        # Fix trailing quotes in strings (e.g., "text"" -> "text")
-        cleaned_response = re.sub(r'""([,\}])', r'"\1', cleaned_response)
-
-        result = json.loads(cleaned_response)
-
-        logger.info(f"Structured output validation:")
-        logger.info(f"  Brand mentions: {result.get('brand_mentions', 'N/A')}")
-        logger.info(f"  Includes logo: {result.get('includes_logo', 'N/A')}")
-        logger.info(f"  Includes campaign message: {result.get('includes_campaign_message', 'N/A')}")
-        logger.info(f"  Translated campaign message: {result.get('translated_campaign_message', 'N/A')}")
-
-        optimized_prompt = result['image_prompt']
-        translated_message = result.get('translated_campaign_message', campaign.get('campaign_message', ''))
-    except (json.JSONDecodeError, KeyError) as e:
-        logger.warning(f"Could not parse JSON response: {e}. Using raw response.")
-        optimized_prompt = full_response
-        translated_message = campaign.get('campaign_message', '')
-
-    return optimized_prompt, translated_message
+        entries = json.loads(repair_json(full_response)).get("markets") or []
+    except (json.JSONDecodeError, AttributeError) as e:
+        logger.warning(f"Could not parse batched JSON response for {market_list}: {e}")
+        return {}
+
+    by_name = {market.lower(): market for market in markets}
+    results: Dict[str, Tuple[str, str]] = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        market = by_name.get(str(entry.get("target_market", "")).strip().lower())
+        if market is None:
+            continue
+        try:
+            result, repaired = validate_prompt_output(entry, brand_name)
+        except PromptValidationError as e:
+            # Left out here, the market gets its own call with repair and retry
+            logger.warning(f"⚠ Batched prompt for {market} failed validation ({e})")
+            continue
+        record_validation("repaired" if repaired else "valid", target_market=market)
+        _log_prompt_validation(result.model_dump(), target_market=market)
+        results[market] = (result.image_prompt, _settle_translation(
+            campaign_message, market, result, known_translations.get(market)))
+    return results
 
 
 def generate_brand_name(products: list, target_market: str, target_audience: str) -> str:
@@ -268,9 +486,7 @@ Return ONLY the brand name, nothing else."""
 
     logger.info("Generating brand name with LLM...")
 
-    full_response = ""
-    for event in replicate.stream(
-        "openai/gpt-4.1-nano",
+    full_response = get_llm_client().complete(
         input={
             "prompt": user_prompt,
             "system_prompt": system_prompt,
@@ -280,8 +496,8 @@ Return ONLY the brand name, nothing else."""
             "presence_penalty": 0,
             "frequency_penalty": 0,
         },
-    ):
-        full_response += str(event)
+        operation="brand_name"
+    )
 
     brand_name = full_response.strip().strip('"').strip("'").strip()
     logger.info(f"Generated brand name: {brand_name}")
@@ -323,9 +539,7 @@ Return ONLY the campaign message, nothing else."""
 
     logger.info("Generating campaign message with LLM...")
 
-    full_response = ""
-    for event in replicate.stream(
-        "openai/gpt-4.1-nano",
+    full_response = get_llm_client().complete(
         input={
             "prompt": user_prompt,
             "system_prompt": system_prompt,
@@ -335,18 +549,97 @@ Return ONLY the campaign message, nothing else."""
             "presence_penalty": 0,
             "frequency_penalty": 0,
         },
-    ):
-        full_response += str(event)
+        operation="campaign_message"
+    )
 
     campaign_message = full_response.strip().strip('"').strip("'").strip()
     logger.info(f"Generated campaign message: {campaign_message}")
     return campaign_message
 
 
+def generate_suggestions(products: list, target_market: str, target_audience: str,
+                         count: int = 5) -> Dict[str, List[str]]:
+    """Generate brand name and campaign message candidates with a single LLM call
+
+    Args:
+        products: List of products
+        target_market: Target market
+        target_audience: Target audience
+        count: Candidates of each kind to ask for
+
+    Returns:
+        Dictionary with "brand_names" and "campaign_messages" lists (English messages)
+
+    Raises:
+        ValueError: If the response is not a usable JSON object of candidates
+    """
+    from pydantic import ValidationError
+
+    from .schemas import CampaignSuggestions
+
+    products_list = [str(p) for p in products]
+
+    system_prompt = """You are an expert brand strategist and advertising copywriter. Generate compelling, memorable brand names and campaign messages that fit the products, target market and audience."""
+
+    user_prompt = f"""Generate {count} brand names and {count} campaign messages/slogans for the following:
+Products: {', '.join(products_list)}
+Target Market: {target_market or 'Not specified'}
+Target Audience: {target_audience or 'Not specified'}
+
+Each brand name (2-3 words maximum):
+- Is memorable and brandable
+- Fits the products and target market
+- Works well in the {target_market or 'target'} market
+
+Each campaign message (3-6 words):
+- Is memorable and impactful
+- Highlights key benefits or emotional appeal
+- Resonates with the target audience
+- Is in English (it will be translated to the market language later if needed)
+- CRITICAL: Does NOT include any brand name (the brand name will appear separately)
+
+Make the candidates clearly different from each other.
+
+Return a JSON object with the fields "brand_names" (list of strings) and "campaign_messages" (list of strings)."""
+
+    logger.info(f"Generating {count} brand name and campaign message suggestions with LLM...")
+
+    full_response = get_llm_client().complete(
+        input={
+            "prompt": user_prompt,
+            "system_prompt": system_prompt,
+            "temperature": 0.9,
+            "max_completion_tokens": 40 * count,
+            "top_p": 1,
+            "presence_penalty": 0,
+            "frequency_penalty": 0,
+            "response_format": {"type": "json_object"}
+        },
+        operation="suggest",
+        candidates=count
+    )
+
+    try:
+        suggestions = CampaignSuggestions.model_validate_json(repair_json(full_response))
+    except ValidationError as e:
+        raise ValueError(f"Could not parse suggestions: {e}") from e
+    return {"brand_names": suggestions.brand_names[:count],
+            "campaign_messages": suggestions.campaign_messages[:count]}
+
+
 def validate_campaign(campaign):
-    """Validate campaign brief has all required fields"""
+    """Validate campaign brief has all required fields
+
+    A brief names one ``target_market`` or a list of ``target_markets``.
+    """
     required_fields = ["products", "target_market", "target_audience"]
 
+    markets = campaign.get("target_markets")
+    if markets is not None:
+        if not isinstance(markets, list) or not markets or not all(isinstance(m, str) and m.strip() for m in markets):
+            raise ValueError("target_markets must be a non-empty list of market names")
+        required_fields.remove("target_market")
+
     for field in required_fields:
         if field not in campaign:
             raise ValueError(f"Missing required field: {field}")
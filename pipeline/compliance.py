@@ -3,26 +3,25 @@
 Brand Compliance Checker - Verify generated images contain brand logo and name
 """
 
+import argparse
+import hashlib
 import json
 import logging
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
 from pathlib import Path
-from dotenv import load_dotenv
 import os
-import replicate
-from typing import List, Dict, Optional
-
-# Load environment variables from .env file in project root
-env_path = Path(__file__).parent.parent / '.env'
-load_dotenv(dotenv_path=env_path)
-
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+from typing import List, Dict, Optional, Set
+
+from .llm_client import get_llm_client
+
 logger = logging.getLogger(__name__)
 
+# Banner formats picked up by the batch audit
+AUDIT_IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp'}
+
 
 def check_brand_compliance(
     image_paths: List[str],
@@ -107,9 +106,7 @@ Additionally, check if the campaign message "{campaign_message}" appears in the
         image_input = [img_file for img_file in image_files]
         
         # Stream response from GPT-4.1-nano
-        full_response = ""
-        for event in replicate.stream(
-            "openai/gpt-4.1-nano",
+        full_response = get_llm_client().complete(
             input={
                 "top_p": 1,
                 "prompt": brand_check_instruction,
@@ -122,8 +119,9 @@ Additionally, check if the campaign message "{campaign_message}" appears in the
                 "max_completion_tokens": 2048,
                 "response_format": {"type": "json_object"}
             },
-        ):
-            full_response += str(event)
+            operation="compliance",
+            images=len(image_paths)
+        )
         
         # Parse JSON response
         full_response = full_response.strip()
@@ -169,82 +167,325 @@ Additionally, check if the campaign message "{campaign_message}" appears in the
                 pass
 
 
-def main():
+def _file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the SHA-256 of a file without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_audited_hashes(results_path: Path) -> Set[str]:
+    """
+    Collect image hashes that already have a result in a JSONL results file
+
+    Only compliant and non-compliant verdicts count. Records that ended in an
+    error or an "unknown" status (an unparseable response) are retried on resume.
+    """
+    audited: Set[str] = set()
+    if not results_path.exists():
+        return audited
+
+    with open(results_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A partially written last line from an interrupted run
+                continue
+            if record.get("error") or record.get("compliance_status") not in ("compliant", "non-compliant"):
+                continue
+            audited.update(record.get("image_hashes", []))
+
+    return audited
+
+
+def _resolve_job_campaign(job_dir: Path) -> Dict[str, str]:
+    """
+    Look up brand name and campaign message for a job from its pipeline report
+
+    Reports are searched inside the job directory first, then next to it as
+    ``report_<job_name>.json`` (the CLI layout).
+    """
+    candidates = sorted(job_dir.glob("report*.json"))
+    sibling = job_dir.parent / f"report_{job_dir.name}.json"
+    if sibling.exists():
+        candidates.append(sibling)
+
+    for report_path in candidates:
+        try:
+            with open(report_path, "r", encoding="utf-8") as f:
+                details = json.load(f).get("campaign_details", {})
+        except (OSError, json.JSONDecodeError):
+            continue
+        if details.get("brand_name"):
+            return {
+                "brand_name": details["brand_name"],
+                "campaign_message": details.get("campaign_message") or None,
+            }
+
+    return {}
+
+
+def discover_output_jobs(outputs_dir: str) -> Dict[str, List[Path]]:
+    """
+    Group banner images under an outputs tree by job
+
+    A job is a first-level subdirectory of ``outputs_dir``; every image below it
+    (for example ``<job>/1_1/banner_us.png``) belongs to that job.
+
+    Args:
+        outputs_dir: Root of the outputs tree
+
+    Returns:
+        Dictionary mapping job directory name to sorted list of image paths
+    """
+    root = Path(outputs_dir)
+    if not root.is_dir():
+        raise FileNotFoundError(f"Outputs directory not found: {outputs_dir}")
+
+    jobs: Dict[str, List[Path]] = {}
+    for job_dir in sorted(p for p in root.iterdir() if p.is_dir()):
+        images = sorted(
+            p for p in job_dir.rglob("*")
+            if p.is_file() and p.suffix.lower() in AUDIT_IMAGE_EXTENSIONS
+        )
+        if images:
+            jobs[job_dir.name] = images
+
+    return jobs
+
+
+def _audit_batch(job_name: str, images: List[Path], hashes: List[str],
+                 brand_name: str, campaign_message: Optional[str]) -> Dict:
+    """Run one compliance check and turn the outcome into a result record"""
+    record = {
+        "job": job_name,
+        "images": [str(p) for p in images],
+        "image_hashes": hashes,
+        "brand_name": brand_name,
+        "checked_at": datetime.now().isoformat(),
+    }
+    start = time.perf_counter()
+    try:
+        result = check_brand_compliance(
+            image_paths=[str(p) for p in images],
+            brand_name=brand_name,
+            campaign_message=campaign_message
+        )
+        record["compliance_status"] = result.get("compliance_status", "unknown")
+        record["result"] = result
+    except Exception as e:
+        record["compliance_status"] = "error"
+        record["error"] = str(e)
+    record["duration_seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def audit_outputs(
+    outputs_dir: str = "outputs",
+    results_path: str = "outputs/compliance_audit.jsonl",
+    max_workers: int = 8,
+    images_per_check: int = 2,
+    brand_name: Optional[str] = None,
+    campaign_message: Optional[str] = None
+) -> Dict[str, int]:
+    """
+    Audit every banner under an outputs tree for brand compliance
+
+    Images are grouped by job and checked ``images_per_check`` at a time on a
+    bounded thread pool. Each finished check is appended to ``results_path`` as
+    one JSON line, so an interrupted audit resumes where it stopped: images whose
+    content hash already has a verdict in that file are skipped.
+
+    Args:
+        outputs_dir: Root of the outputs tree
+        results_path: JSONL file to append results to (and resume from)
+        max_workers: Maximum number of concurrent compliance checks
+        images_per_check: Number of images sent in a single check
+        brand_name: Brand name to use when a job has no report
+        campaign_message: Campaign message to use when a job has no report
+
+    Returns:
+        Dictionary with counts per outcome
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    if images_per_check < 1:
+        raise ValueError("images_per_check must be at least 1")
+
+    results_file = Path(results_path)
+    results_file.parent.mkdir(parents=True, exist_ok=True)
+
+    jobs = discover_output_jobs(outputs_dir)
+    audited = _load_audited_hashes(results_file)
+    summary = {"jobs": len(jobs), "checks": 0, "skipped_images": 0,
+               "compliant": 0, "non-compliant": 0, "unknown": 0, "error": 0,
+               "no_brand": 0}
+
+    logger.info(f"Auditing {sum(len(v) for v in jobs.values())} image(s) in {len(jobs)} job(s) "
+                f"({len(audited)} already audited)")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Hash every image on the pool; reading thousands of PNGs is I/O bound
+        all_images = [img for images in jobs.values() for img in images]
+        hashes = dict(zip(all_images, executor.map(_file_sha256, all_images)))
+
+        batches = []
+        for job_name, images in jobs.items():
+            pending = [img for img in images if hashes[img] not in audited]
+            summary["skipped_images"] += len(images) - len(pending)
+            if not pending:
+                continue
+
+            campaign = _resolve_job_campaign(Path(outputs_dir) / job_name)
+            job_brand = campaign.get("brand_name") or brand_name
+            if not job_brand:
+                logger.warning(f"Skipping job {job_name}: no report with a brand name and no --brand-name given")
+                summary["no_brand"] += 1
+                continue
+            job_message = campaign.get("campaign_message") or campaign_message
+
+            for i in range(0, len(pending), images_per_check):
+                batch = pending[i:i + images_per_check]
+                batches.append((job_name, batch, [hashes[img] for img in batch],
+                                job_brand, job_message))
+
+        # Keep a bounded window of in-flight checks and stream results as they land
+        in_flight = set()
+        window = max_workers * 2
+        with open(results_file, "a", encoding="utf-8") as out:
+            for batch in batches:
+                in_flight.add(executor.submit(_audit_batch, *batch))
+                if len(in_flight) >= window:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    _write_audit_records(done, out, summary)
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                _write_audit_records(done, out, summary)
+
+    logger.info(f"Audit finished: {summary}")
+    return summary
+
+
+def _write_audit_records(done, out, summary: Dict[str, int]) -> None:
+    """Append finished audit records to the results file"""
+    for future in done:
+        record = future.result()
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        summary["checks"] += 1
+        status = record["compliance_status"]
+        summary[status if status in summary else "unknown"] += 1
+        if record.get("error"):
+            logger.warning(f"  ✗ {record['job']}: {record['error']}")
+        else:
+            logger.info(f"  ✓ {record['job']}: {status} ({len(record['images'])} image(s))")
+
+
+def _print_check_result(result: Dict, brand_name: str, image_count: int) -> None:
+    """Log the result of a single compliance check"""
+    logger.info("")
+    logger.info("="*60)
+    logger.info("BRAND COMPLIANCE CHECK RESULTS")
+    logger.info("="*60)
+    logger.info(f"Brand Name: {brand_name}")
+    logger.info(f"Images Analyzed: {image_count}")
+    logger.info("")
+    logger.info("Detected Text:")
+    for text in result.get("detected_text", []):
+        logger.info(f"  - {text}")
+    logger.info("")
+    logger.info(f"Brand Name Found: {result.get('brand_name_found', False)}")
+    if result.get("brand_name_matches"):
+        logger.info(f"Brand Name Matches: {', '.join(result.get('brand_name_matches', []))}")
+    logger.info(f"Logo Visible: {result.get('logo_visible', False)}")
+    logger.info(f"Logo Description: {result.get('logo_description', 'N/A')}")
+    logger.info("")
+    logger.info(f"Compliance Status: {result.get('compliance_status', 'unknown').upper()}")
+    logger.info(f"Notes: {result.get('compliance_notes', 'N/A')}")
+    logger.info("="*60)
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    """Build the command line parser for the compliance checker"""
+    parser = argparse.ArgumentParser(
+        prog="python -m pipeline.compliance",
+        description="Verify generated banners contain the brand logo and name"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    check = subparsers.add_parser("check", help="Check one or more images in a single call")
+    check.add_argument("images", nargs="+", help="Image paths to analyze together")
+    check.add_argument("--brand-name", required=True, help="Brand name to check for")
+    check.add_argument("--campaign-message", help="Campaign message to verify")
+
+    audit = subparsers.add_parser("audit", help="Audit every banner under an outputs tree")
+    audit.add_argument("outputs_dir", nargs="?", default="outputs", help="Outputs tree (default: outputs)")
+    audit.add_argument("--results", default=None,
+                       help="JSONL results file to append to and resume from "
+                            "(default: <outputs_dir>/compliance_audit.jsonl)")
+    audit.add_argument("--workers", type=int, default=8, help="Concurrent compliance checks (default: 8)")
+    audit.add_argument("--images-per-check", type=int, default=2,
+                       help="Images analyzed per check (default: 2)")
+    audit.add_argument("--brand-name", help="Brand name for jobs without a report")
+    audit.add_argument("--campaign-message", help="Campaign message for jobs without a report")
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
     """Main function to run brand compliance check"""
-    
+    from dotenv import load_dotenv
+
+    # Load environment variables from .env file in project root and set up
+    # logging here, not at import: importers configure their own
+    load_dotenv(dotenv_path=Path(__file__).parent.parent / '.env')
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    args = _build_arg_parser().parse_args(argv)
+
     # Check for API token
     api_token = os.getenv("REPLICATE_API_TOKEN")
     if not api_token:
         logger.error("REPLICATE_API_TOKEN not found in .env file")
         sys.exit(1)
-    
-    # Example usage - can be modified to accept command line arguments
-    if len(sys.argv) < 3:
-        logger.info("Usage: python check_brand_compliance.py <image1> <image2> <brand_name> [campaign_message]")
-        logger.info("")
-        logger.info("Example:")
-        logger.info('  python check_brand_compliance.py outputs/banner1.png outputs/banner2.png "TrailCraft" "Run Further"')
-        sys.exit(1)
-    
-    # Parse arguments
-    image_paths = sys.argv[1:-1] if len(sys.argv) > 3 else [sys.argv[1]]
-    brand_name = sys.argv[-1] if len(sys.argv) >= 3 else sys.argv[1]
-    
-    # If campaign message is provided as last arg, adjust
-    if len(sys.argv) >= 4:
-        # Check if last arg looks like a brand name (short) vs campaign message (longer)
-        # For simplicity, assume format: image1 image2 brand_name [campaign_message]
-        if len(sys.argv) == 5:
-            image_paths = [sys.argv[1], sys.argv[2]]
-            brand_name = sys.argv[3]
-            campaign_message = sys.argv[4]
-        elif len(sys.argv) == 4:
-            image_paths = [sys.argv[1], sys.argv[2]]
-            brand_name = sys.argv[3]
-            campaign_message = None
-        else:
-            image_paths = [sys.argv[1]]
-            brand_name = sys.argv[2]
-            campaign_message = None
-    else:
-        campaign_message = None
-    
+
     try:
+        if args.command == "audit":
+            results_path = args.results or str(Path(args.outputs_dir) / "compliance_audit.jsonl")
+            summary = audit_outputs(
+                outputs_dir=args.outputs_dir,
+                results_path=results_path,
+                max_workers=args.workers,
+                images_per_check=args.images_per_check,
+                brand_name=args.brand_name,
+                campaign_message=args.campaign_message
+            )
+            logger.info(f"Results written to: {results_path}")
+            # Non-zero exit when anything needs attention
+            sys.exit(1 if summary["non-compliant"] or summary["error"] else 0)
+
         # Run compliance check
         result = check_brand_compliance(
-            image_paths=image_paths,
-            brand_name=brand_name,
-            campaign_message=campaign_message
+            image_paths=args.images,
+            brand_name=args.brand_name,
+            campaign_message=args.campaign_message
         )
-        
-        # Print results
-        logger.info("")
-        logger.info("="*60)
-        logger.info("BRAND COMPLIANCE CHECK RESULTS")
-        logger.info("="*60)
-        logger.info(f"Brand Name: {brand_name}")
-        logger.info(f"Images Analyzed: {len(image_paths)}")
-        logger.info("")
-        logger.info("Detected Text:")
-        for text in result.get("detected_text", []):
-            logger.info(f"  - {text}")
-        logger.info("")
-        logger.info(f"Brand Name Found: {result.get('brand_name_found', False)}")
-        if result.get("brand_name_matches"):
-            logger.info(f"Brand Name Matches: {', '.join(result.get('brand_name_matches', []))}")
-        logger.info(f"Logo Visible: {result.get('logo_visible', False)}")
-        logger.info(f"Logo Description: {result.get('logo_description', 'N/A')}")
-        logger.info("")
-        logger.info(f"Compliance Status: {result.get('compliance_status', 'unknown').upper()}")
-        logger.info(f"Notes: {result.get('compliance_notes', 'N/A')}")
-        logger.info("="*60)
-        
+        _print_check_result(result, args.brand_name, len(args.images))
+
         # Return exit code based on compliance
         if result.get("compliance_status") == "compliant":
             sys.exit(0)
         else:
             sys.exit(1)
-            
+
     except Exception as e:
         logger.error(f"Error: {str(e)}")
         sys.exit(1)
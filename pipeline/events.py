@@ -0,0 +1,239 @@
+"""
+Event Log - Structured logging through a non-blocking, batching handler
+
+Every log record becomes one event tagged with the job and pipeline step it
+belongs to. Records are handed to a background writer through a bounded queue
+and written in batches, so logging never waits on a slow sink; when the queue
+is full, records are dropped and counted instead.
+
+Configured from the environment by ``configure_logging()``:
+    LOG_FORMAT  "text" (default) or "json" (one JSON object per line)
+    LOG_LEVEL   "INFO" (default), "VERBOSE" (adds full prompts) or "DEBUG"
+    LOG_FILE    Append events to this file instead of stderr
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO
+
+# Between DEBUG and INFO: full prompts and responses, without library debug output
+VERBOSE = 15
+logging.addLevelName(VERBOSE, "VERBOSE")
+
+_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("event_context", default={})
+_context_providers: List[Callable[[], Optional[Dict[str, Any]]]] = []
+
+
+@contextmanager
+def bind_context(**fields: Any) -> Iterator[None]:
+    """Tag every event logged in this context (e.g. with a job_id)"""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def register_context_provider(provider: Callable[[], Optional[Dict[str, Any]]]) -> None:
+    """Add a callable whose fields are merged into every event (e.g. the active step)"""
+    _context_providers.append(provider)
+
+
+def current_context() -> Dict[str, Any]:
+    """Return the fields events logged right now are tagged with"""
+    context = dict(_context.get())
+    for provider in _context_providers:
+        context.update(provider() or {})
+    return context
+
+
+def log_event(logger: logging.Logger, event: str, message: str, level: int = logging.INFO,
+              **fields: Any) -> None:
+    """
+    Log a named event with structured fields
+
+    Args:
+        logger: Logger to emit through
+        event: Machine-readable event name (e.g. "step_finished")
+        message: Human-readable one-line message
+        level: Logging level
+        **fields: Structured fields; shown as JSON keys in the json format
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={"event": event, "fields": fields}, stacklevel=2)
+
+
+class ContextFilter(logging.Filter):
+    """Capture the event context in the emitting thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.context = current_context()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": getattr(record, "event", "log"),
+            "message": record.getMessage(),
+        }
+        data.update(getattr(record, "context", None) or {})
+        data.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines prefixed with the job they belong to"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(levelname)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        context = getattr(record, "context", None) or {}
+        job_id = context.get("job_id")
+        return f"[{str(job_id)[:8]}] {line}" if job_id else line
+
+
+class BufferedEventHandler(logging.Handler):
+    """Queue records for a background writer that formats and writes them in batches"""
+
+    def __init__(self, stream: TextIO, max_queue: int = 10000, batch_size: int = 256):
+        """
+        Initialize buffered handler
+
+        Args:
+            stream: Text stream to write to
+            max_queue: Records buffered before new ones are dropped
+            batch_size: Maximum records per write
+        """
+        super().__init__()
+        self.stream = stream
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[logging.LogRecord]]" = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+        self._thread.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            # Freeze the message in the caller; args may change after we return
+            record = copy.copy(record)
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def _run(self) -> None:
+        while True:
+            # Block for one record, then take whatever piled up meanwhile
+            record = self._queue.get()
+            batch = [record]
+            while record is not None and len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(record)
+            self._write([r for r in batch if r is not None])
+            if batch[-1] is None:
+                return
+
+    def _write(self, records: List[logging.LogRecord]) -> None:
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.handleError(record)
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            lines.append(self.format(logging.makeLogRecord({
+                "name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+                "msg": f"Dropped {dropped} log record(s): queue full",
+                "event": "log_dropped", "fields": {"dropped": dropped},
+            })))
+        if not lines:
+            return
+        try:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """Flush queued records and stop the writer"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+        if self.stream not in (sys.stderr, sys.stdout):
+            self.stream.close()
+        super().close()
+
+
+_handler: Optional[BufferedEventHandler] = None
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None,
+                      path: Optional[str] = None) -> BufferedEventHandler:
+    """
+    Route all logging through a buffered event handler
+
+    Replaces any handlers already on the root logger. Safe to call again.
+
+    Args:
+        level: Log level name (default: LOG_LEVEL env or "INFO")
+        fmt: "text" or "json" (default: LOG_FORMAT env or "text")
+        path: File to append to (default: LOG_FILE env, else stderr)
+
+    Returns:
+        The installed handler
+    """
+    global _handler
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT", "text")).lower()
+    path = path or os.getenv("LOG_FILE")
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+        if existing is _handler:
+            existing.close()
+
+    stream = open(path, "a", encoding="utf-8") if path else sys.stderr
+    _handler = BufferedEventHandler(stream)
+    _handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    _handler.addFilter(ContextFilter())
+    root.addHandler(_handler)
+    root.setLevel(level)
+    return _handler
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    if _handler is not None:
+        _handler.close()
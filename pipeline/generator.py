@@ -1,12 +1,30 @@
-"""Image Generator - Generate images via Replicate API"""
+"""
+Image Generator - Pluggable image generation backends
 
+Backends implement BaseGenerator and are looked up by name in a registry;
+EASY_ADS_GENERATOR selects one (default: replicate):
+    replicate  Seedream-4 on Replicate (REPLICATE_IMAGE_MODEL overrides the model)
+    local      Deterministic placeholder banners drawn on the CPU, no network
+
+PIL and requests are imported on first use, not with this module.
+"""
+
+import importlib
 import io
+import os
 import time
 import logging
-import requests
-from typing import Optional
-from PIL import Image
-import replicate
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Dict, List, Optional, Type, Union
+
+from .accounting import accounted_run
+from .events import log_event
+from .hedging import get_hedge_policy
+from .metrics import RATE_LIMITED, RETRIES, STEP_DURATION
+from .reporter import trace_span
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 logger = logging.getLogger(__name__)
 
@@ -16,13 +34,14 @@ class GeneratorError(Exception):
     pass
 
 
-class ReplicateGenerator:
-    """Generate images using Replicate Seedream-4 API"""
+class BaseGenerator(ABC):
+    """Interface of image generation backends"""
 
-    # Model configuration
-    MODEL_ID = "bytedance/seedream-4"
+    # Registry name and model identifier, reported with every render
+    name = ""
+    model_id = ""
 
-    # Aspect ratio mapping (seedream-4 uses different format)
+    # Supported aspect ratios
     ASPECT_RATIOS = {
         "1:1": "1:1",
         "9:16": "9:16",
@@ -32,23 +51,113 @@ class ReplicateGenerator:
         "2:3": "2:3"
     }
 
-    def __init__(self, api_token: str):
+    @abstractmethod
+    def generate(self, prompt: str, width: Optional[int] = None, height: Optional[int] = None,
+                 max_retries: int = 1, aspect_ratio: str = "1:1", image_input: Optional[list] = None) -> "Image.Image":
+        """
+        Generate an image from a prompt
+
+        Args:
+            prompt: Text prompt for image generation
+            width: Image width (backends may derive it from aspect_ratio instead)
+            height: Image height (backends may derive it from aspect_ratio instead)
+            max_retries: Maximum number of attempts
+            aspect_ratio: Aspect ratio for the image (default: "1:1")
+            image_input: Optional list of reference images (file paths or uploaded URLs)
+
+        Returns:
+            Generated PIL Image
+
+        Raises:
+            GeneratorError: If generation fails
+        """
+
+    def _check_aspect_ratio(self, aspect_ratio: str) -> str:
+        if aspect_ratio not in self.ASPECT_RATIOS:
+            logger.warning(f"Invalid aspect ratio {aspect_ratio}, defaulting to 1:1")
+            return "1:1"
+        return aspect_ratio
+
+
+# Backend name -> class, or "module:Class" imported on first use
+_GENERATORS: Dict[str, Union[str, Type[BaseGenerator]]] = {
+    "replicate": f"{__name__}:ReplicateGenerator",
+    "local": f"{__package__}.procedural_generator:ProceduralGenerator",
+}
+
+
+def register_generator(name: str, backend: Union[str, Type[BaseGenerator]]) -> None:
+    """
+    Register an image generation backend
+
+    Args:
+        name: Name to select it by (EASY_ADS_GENERATOR)
+        backend: BaseGenerator subclass, or "module:Class" to import it lazily
+    """
+    _GENERATORS[name.lower()] = backend
+
+
+def available_generators() -> List[str]:
+    return sorted(_GENERATORS)
+
+
+def create_generator(name: Optional[str] = None, **kwargs) -> BaseGenerator:
+    """
+    Create the configured image generation backend
+
+    Args:
+        name: Backend name (default: EASY_ADS_GENERATOR env, "replicate")
+        **kwargs: Passed to the backend's constructor
+
+    Returns:
+        Generator instance
+
+    Raises:
+        GeneratorError: If the backend is unknown or cannot be created
+    """
+    name = (name or os.getenv("EASY_ADS_GENERATOR") or "replicate").strip().lower()
+    backend = _GENERATORS.get(name)
+    if backend is None:
+        raise GeneratorError(f"Unknown generator '{name}', expected one of {available_generators()}")
+    if isinstance(backend, str):
+        module_name, _, class_name = backend.partition(":")
+        backend = getattr(importlib.import_module(module_name), class_name)
+        _GENERATORS[name] = backend
+    return backend(**kwargs)
+
+
+class ReplicateGenerator(BaseGenerator):
+    """Generate images using Replicate Seedream-4 API"""
+
+    name = "replicate"
+
+    # Default model; REPLICATE_IMAGE_MODEL or the constructor override it
+    MODEL_ID = "bytedance/seedream-4"
+
+    def __init__(self, api_token: Optional[str] = None, model_id: Optional[str] = None):
         """
         Initialize Replicate generator
 
         Args:
-            api_token: Replicate API token
+            api_token: Replicate API token (default: REPLICATE_API_TOKEN env)
+            model_id: Model to run (default: REPLICATE_IMAGE_MODEL env, then MODEL_ID)
+
+        Raises:
+            GeneratorError: If no API token is available
         """
+        api_token = api_token or os.getenv("REPLICATE_API_TOKEN")
+        if not api_token:
+            raise GeneratorError("REPLICATE_API_TOKEN not found in environment")
         self.api_token = api_token
+        self.model_id = model_id or os.getenv("REPLICATE_IMAGE_MODEL") or self.MODEL_ID
 
         # Set Replicate API token as environment variable
-        import os
         os.environ["REPLICATE_API_TOKEN"] = api_token
 
-        logger.info(f"Initialized Replicate generator with model: {self.MODEL_ID}")
+        logger.info(f"Initialized Replicate generator with model: {self.model_id}")
 
     def generate(self, prompt: str, width: Optional[int] = None, height: Optional[int] = None,
-                 max_retries: int = 1, aspect_ratio: str = "1:1", image_input: Optional[list] = None) -> Image.Image:
+                 max_retries: int = 1, aspect_ratio: str = "1:1", image_input: Optional[list] = None) -> "Image.Image":
         """
         Generate image from prompt using Replicate Seedream-4
 
@@ -58,7 +167,7 @@ class ReplicateGenerator:
             height: Image height (ignored, uses aspect_ratio instead)
             max_retries: Maximum number of retry attempts
             aspect_ratio: Aspect ratio for the image (default: "1:1")
-            image_input: Optional list of image file paths to use as reference
+            image_input: Optional list of reference images (file paths or uploaded URLs)
 
         Returns:
             Generated PIL Image
@@ -66,10 +175,7 @@ class ReplicateGenerator:
         Raises:
             GeneratorError: If generation fails after retries
         """
-        # Validate aspect ratio
-        if aspect_ratio not in self.ASPECT_RATIOS:
-            logger.warning(f"Invalid aspect ratio {aspect_ratio}, defaulting to 1:1")
-            aspect_ratio = "1:1"
+        aspect_ratio = self._check_aspect_ratio(aspect_ratio)
 
         if image_input:
             logger.info(f"Generating image with {len(image_input)} reference image(s) and aspect ratio {aspect_ratio}: {prompt[:50]}...")
@@ -78,11 +184,18 @@ class ReplicateGenerator:
 
         return self._generate_with_replicate(prompt, aspect_ratio, max_retries, image_input)
 
-    def _generate_with_replicate(self, prompt: str, aspect_ratio: str, max_retries: int, image_input: Optional[list] = None) -> Image.Image:
+    def _generate_with_replicate(self, prompt: str, aspect_ratio: str, max_retries: int, image_input: Optional[list] = None) -> "Image.Image":
         """Generate using Replicate Seedream-4 API"""
+        import requests
+        from urllib.parse import urlparse
+        from urllib.request import url2pathname
+        from PIL import Image
+
         file_handles = []  # Track file handles for cleanup
         try:
             for attempt in range(max_retries):
+                if attempt > 0:
+                    RETRIES.labels(model=self.model_id).inc()
                 try:
                     # Build input parameters
                     input_params = {
@@ -98,17 +211,33 @@ class ReplicateGenerator:
 
                     # Add image_input if provided
                     if image_input and len(image_input) > 0:
-                        # Open image files and pass them as file handles
+                        # Uploaded references are passed by URL; local paths as file handles
                         input_params["image_input"] = []
-                        for img_path in image_input:
-                            fh = open(img_path, "rb")
+                        for img in image_input:
+                            if isinstance(img, str) and img.startswith(("http://", "https://", "data:")):
+                                input_params["image_input"].append(img)
+                                continue
+                            if isinstance(img, str) and img.startswith("file://"):
+                                img = url2pathname(urlparse(img).path)
+                            fh = open(img, "rb")
                             file_handles.append(fh)
                             input_params["image_input"].append(fh)
 
-                    # Run Replicate model with seedream-4 parameters
-                    output = replicate.run(
-                        self.MODEL_ID,
-                        input=input_params
+                    # Run Replicate model with seedream-4 parameters; a slow prediction
+                    # may be hedged, unless it uploads open files
+                    output = get_hedge_policy().run(
+                        f"render:{self.model_id}",
+                        lambda cancel, hedge: accounted_run(
+                            self.model_id,
+                            input=input_params,
+                            operation="image",
+                            cancel=cancel,
+                            hedge=hedge,
+                            aspect_ratio=aspect_ratio,
+                            attempt=attempt + 1
+                        ),
+                        kind="render",
+                        hedgeable=not file_handles
                     )
 
                     # Seedream-4 returns a list of FileOutput objects
@@ -135,9 +264,13 @@ class ReplicateGenerator:
                         raise GeneratorError(f"Unexpected output format: {type(output)}")
 
                     # Fetch and convert to PIL Image
-                    response = requests.get(image_url, timeout=30)
-                    response.raise_for_status()
-                    image = Image.open(io.BytesIO(response.content))
+                    with trace_span("download", "download") as span, \
+                            STEP_DURATION.labels(step="download", aspect_ratio=aspect_ratio).time():
+                        response = requests.get(image_url, timeout=30)
+                        response.raise_for_status()
+                        image = Image.open(io.BytesIO(response.content))
+                        if span is not None:
+                            span.details["bytes"] = len(response.content)
 
                     logger.info(f"Successfully generated image with aspect ratio {aspect_ratio}")
                     return image
@@ -148,24 +281,17 @@ class ReplicateGenerator:
 
                     # Check for sensitive content flag
                     if "flagged as sensitive" in error_msg.lower() or "e005" in error_msg.lower():
-                        logger.error("=" * 60)
-                        logger.error("SENSITIVE CONTENT DETECTED")
-                        logger.error("=" * 60)
-                        logger.error("The input prompt or generated output was flagged as containing sensitive content.")
-                        logger.error("This could be due to:")
-                        logger.error("  - Campaign message or product names containing inappropriate content")
-                        logger.error("  - Generated prompt triggering content filters")
-                        logger.error("  - Output image containing flagged content")
-                        logger.error("")
-                        logger.error("Suggestion: Review the campaign brief and modify:")
-                        logger.error("  - Campaign message")
-                        logger.error("  - Product names")
-                        logger.error("  - Target audience description")
-                        logger.error("=" * 60)
+                        log_event(
+                            logger, "sensitive_content",
+                            "Sensitive content detected: the prompt or generated image was flagged. "
+                            "Review the campaign message, product names and target audience.",
+                            level=logging.ERROR, model=self.model_id, aspect_ratio=aspect_ratio
+                        )
                         raise GeneratorError("Content flagged as sensitive. Please review and modify the campaign brief.")
 
                     # Check for rate limiting
                     elif "rate" in error_msg.lower() or "429" in error_msg:
+                        RATE_LIMITED.labels(model=self.model_id).inc()
                         wait_time = 30
                         logger.warning(f"Rate limited, waiting {wait_time}s")
                         time.sleep(wait_time)
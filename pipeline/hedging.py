@@ -0,0 +1,191 @@
+"""
+Hedging - Duplicate slow remote calls and keep whichever finishes first
+
+Replicate queue times vary a lot, and one slow prediction can set a job's
+latency. With hedging enabled, a render or LLM call still running after the
+configured percentile of recent latencies for its operation gets a duplicate
+request. The first successful result wins and the other call is canceled.
+Duplicates are capped at a fraction of all calls. Hedges fired, won and
+denied are counted in the metrics and in the job's accounting summary.
+
+Configured from the environment (off by default):
+    HEDGE_REQUESTS      Enable hedging (default false)
+    HEDGE_PERCENTILE    Percentile of recent latencies that triggers a hedge (default 95)
+    HEDGE_MIN_SAMPLES   Latencies observed per operation before hedging starts (default 20)
+    HEDGE_WINDOW        Recent latencies kept per operation (default 200)
+    HEDGE_BUDGET        Duplicates allowed as a fraction of calls (default 0.05)
+"""
+
+import contextvars
+import logging
+import math
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from .accounting import CancelToken, current_ledger
+from .metrics import HEDGES
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# A hedgeable call: (cancel token, is this the duplicate?) -> result
+HedgedCall = Callable[[Optional[CancelToken], bool], T]
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class HedgePolicy:
+    """Latency-percentile hedging with a spend budget"""
+
+    def __init__(self, enabled: Optional[bool] = None, percentile: Optional[float] = None,
+                 min_samples: Optional[int] = None, window: Optional[int] = None,
+                 budget: Optional[float] = None):
+        """
+        Initialize hedging policy
+
+        Args:
+            enabled: Hedge at all (default: HEDGE_REQUESTS env, false)
+            percentile: Latency percentile that triggers a hedge (default: HEDGE_PERCENTILE env, 95)
+            min_samples: Latencies needed per operation first (default: HEDGE_MIN_SAMPLES env, 20)
+            window: Recent latencies kept per operation (default: HEDGE_WINDOW env, 200)
+            budget: Duplicates allowed per call (default: HEDGE_BUDGET env, 0.05)
+        """
+        self.enabled = _env_flag("HEDGE_REQUESTS") if enabled is None else enabled
+        self.percentile = percentile or float(os.getenv("HEDGE_PERCENTILE", "95"))
+        self.min_samples = min_samples or int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+        self.window = window or int(os.getenv("HEDGE_WINDOW", "200"))
+        self.budget = budget if budget is not None else float(os.getenv("HEDGE_BUDGET", "0.05"))
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._calls = 0
+        self._hedges = 0
+        self._lock = threading.Lock()
+
+    def observe(self, key: str, seconds: float) -> None:
+        """Add a completed call's latency to the operation's window"""
+        with self._lock:
+            window = self._latencies.get(key)
+            if window is None:
+                window = self._latencies[key] = deque(maxlen=self.window)
+            window.append(seconds)
+
+    def delay(self, key: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None until enough latencies are known"""
+        with self._lock:
+            samples = sorted(self._latencies.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(self.percentile / 100 * len(samples)) - 1))
+        return samples[index]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"calls": self._calls, "hedges": self._hedges,
+                    "hedge_rate": round(self._hedges / self._calls, 4) if self._calls else 0.0}
+
+    def _acquire(self) -> bool:
+        """Take a duplicate from the budget"""
+        with self._lock:
+            if self._hedges + 1 > self.budget * self._calls:
+                return False
+            self._hedges += 1
+            return True
+
+    def run(self, key: str, call: HedgedCall, kind: str = "llm", hedgeable: bool = True) -> T:
+        """
+        Run a call, hedging it if it is slower than usual
+
+        Args:
+            key: Operation the latency window is kept for (e.g. "llm:brand_name")
+            call: Takes a cancel token and whether it is the duplicate; the
+                token is None when the call cannot be hedged
+            kind: Call kind for metrics ("llm" or "render")
+            hedgeable: False for calls that must not be duplicated (e.g. file inputs)
+
+        Returns:
+            Result of the first call to succeed
+
+        Raises:
+            Exception: The primary call's error if no call succeeded
+        """
+        if not self.enabled:
+            return call(None, False)
+        with self._lock:
+            self._calls += 1
+        delay = self.delay(key) if hedgeable else None
+        start = time.perf_counter()
+        if delay is None:
+            result = call(None, False)
+            self.observe(key, time.perf_counter() - start)
+            return result
+        result = self._run_hedged(key, call, kind, delay)
+        self.observe(key, time.perf_counter() - start)
+        return result
+
+    def _run_hedged(self, key: str, call: HedgedCall, kind: str, delay: float) -> T:
+        results: "queue.Queue[Tuple[bool, bool, Any]]" = queue.Queue()
+        tokens = {False: CancelToken()}
+
+        def attempt(hedge: bool) -> None:
+            try:
+                results.put((hedge, True, call(tokens[hedge], hedge)))
+            except BaseException as e:
+                results.put((hedge, False, e))
+
+        def start(hedge: bool) -> None:
+            # Calls run in a copy of the caller's context so they record on its reporter
+            threading.Thread(target=contextvars.copy_context().run, args=(attempt, hedge),
+                             name=f"hedge-{key}", daemon=True).start()
+
+        start(False)
+        outcomes: List[Tuple[bool, bool, Any]] = []
+        try:
+            outcomes.append(results.get(timeout=delay))
+        except queue.Empty:
+            if self._acquire():
+                tokens[True] = CancelToken()
+                start(True)
+                _note(kind, "fired")
+                logger.info(f"Hedging {key}: no result after {delay:.2f}s")
+            else:
+                _note(kind, "denied")
+
+        while len(outcomes) < len(tokens) and not any(ok for _, ok, _ in outcomes):
+            outcomes.append(results.get())
+
+        winner = next((outcome for outcome in outcomes if outcome[1]), None)
+        if winner is None:
+            raise next(value for hedge, _, value in outcomes if not hedge)
+        hedge, _, value = winner
+        for other, token in tokens.items():
+            if other != hedge:
+                token.cancel()
+        if hedge:
+            _note(kind, "won")
+        return value
+
+
+def _note(kind: str, outcome: str) -> None:
+    HEDGES.labels(kind=kind, outcome=outcome).inc()
+    ledger = current_ledger()
+    if ledger is not None:
+        ledger.note_hedge(outcome)
+
+
+_shared_policy: Optional[HedgePolicy] = None
+_shared_lock = threading.Lock()
+
+
+def get_hedge_policy() -> HedgePolicy:
+    """Return the process-wide hedging policy (configured from the environment)"""
+    global _shared_policy
+    with _shared_lock:
+        if _shared_policy is None:
+            _shared_policy = HedgePolicy()
+        return _shared_policy
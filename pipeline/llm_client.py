@@ -0,0 +1,304 @@
+"""
+LLM Client - One call path for every LLM request, with deadlines, retries and a circuit breaker
+
+Prompt optimization, brand names, campaign messages and compliance checks all
+call ``get_llm_client().complete(...)``. Each attempt streams through
+accounted_stream (timed, traced and costed like any remote call) and collects
+the chunks in a list that is joined once at the end. Streams are read on a
+bounded pool; an attempt's deadline starts when a worker picks it up. An
+attempt that misses its deadline is abandoned, its prediction canceled and
+its read aborted, so no call or worker hangs. An attempt that waits longer
+than LLM_TIMEOUT for a worker fails as saturated, without touching the
+breaker.
+Transient failures (deadlines, connection errors, 429/5xx, failed
+predictions, stream error events) are retried with full-jitter exponential backoff. After repeated
+failures a per-model circuit breaker fails calls fast until a trial call
+succeeds. A call takes at most about
+LLM_MAX_ATTEMPTS x LLM_TIMEOUT plus the backoff sleeps. Attempts without file
+inputs go through the hedging policy (see hedging.py) when it is enabled.
+
+Configured from the environment:
+    LLM_TIMEOUT                 Seconds per attempt (default 60)
+    LLM_MAX_ATTEMPTS            Attempts per call (default 3)
+    LLM_BACKOFF_BASE            Backoff cap of the first retry in seconds (default 0.5)
+    LLM_BACKOFF_MAX             Backoff cap of later retries in seconds (default 8)
+    LLM_BREAKER_THRESHOLD       Consecutive failures that open the breaker (default 5)
+    LLM_BREAKER_RESET           Seconds the breaker stays open before a trial call (default 30)
+    LLM_MAX_CONCURRENCY         Streams read at once per process (default 16)
+"""
+
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional
+
+from .accounting import CancelToken, StreamError, accounted_stream
+from .hedging import get_hedge_policy
+from .metrics import CIRCUIT_OPEN, LLM_TIMEOUTS, RATE_LIMITED, RETRIES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LLM_MODEL = "openai/gpt-4.1-nano"
+
+
+class LLMError(Exception):
+    """Raised when an LLM call fails"""
+    pass
+
+
+class LLMTimeoutError(LLMError):
+    """Raised when an attempt does not finish within its deadline"""
+    pass
+
+
+class LLMSaturatedError(LLMError):
+    """Raised when an attempt cannot start because every stream worker is busy"""
+    pass
+
+
+class CircuitOpenError(LLMError):
+    """Raised without calling the model while its circuit breaker is open"""
+    pass
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker: closed, open, then one half-open trial"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Let a call through, or raise CircuitOpenError"""
+        with self._lock:
+            if self.state == "open":
+                remaining = self.reset_seconds - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(f"Circuit open for {self.name}; retry in {remaining:.0f}s")
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "half_open":
+                if self._trial_in_flight:
+                    raise CircuitOpenError(f"Circuit half-open for {self.name}; trial call in flight")
+                self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"✓ Circuit closed for {self.name}")
+            self.state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """End a call that says nothing about the endpoint's health, leaving the state as is"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"⚠ Circuit opened for {self.name} after {self._failures} failure(s); "
+                                   f"failing fast for {self.reset_seconds:g}s")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """Transient failures worth another attempt; client errors (401, 422, ...) are not"""
+    if isinstance(error, (LLMTimeoutError, TimeoutError, ConnectionError)):
+        return True
+    # The remote call failed, so these are already imported
+    import httpx
+    from replicate.exceptions import ModelError, ReplicateError
+
+    if isinstance(error, (httpx.TransportError, ModelError)):
+        return True
+    if isinstance(error, ReplicateError):
+        return error.status is None or error.status in (408, 409, 429) or error.status >= 500
+    return isinstance(error, StreamError)
+
+
+def _answered(error: BaseException) -> bool:
+    """Whether the endpoint itself answered with a client error (4xx)"""
+    from replicate.exceptions import ReplicateError
+
+    return isinstance(error, ReplicateError) and error.status is not None and 400 <= error.status < 500
+
+
+def _is_rate_limit(error: BaseException) -> bool:
+    return getattr(error, "status", None) == 429
+
+
+def _file_inputs(input: Dict[str, Any]) -> List[Any]:
+    return [item for value in input.values() for item in (value if isinstance(value, list) else [value])
+            if hasattr(item, "seek")]
+
+
+def _rewind_files(input: Dict[str, Any]) -> None:
+    """Seek file inputs back to the start so a retry uploads them again in full"""
+    for item in _file_inputs(input):
+        item.seek(0)
+
+
+class LLMClient:
+    """Streaming LLM calls with deadlines, retries and a circuit breaker"""
+
+    def __init__(self, model: str = DEFAULT_LLM_MODEL, timeout: Optional[float] = None,
+                 max_attempts: Optional[int] = None, backoff_base: Optional[float] = None,
+                 backoff_max: Optional[float] = None, breaker: Optional[CircuitBreaker] = None,
+                 max_workers: Optional[int] = None):
+        """
+        Initialize LLM client
+
+        Args:
+            model: Model reference for every call
+            timeout: Seconds per attempt (default: LLM_TIMEOUT env, 60)
+            max_attempts: Attempts per call (default: LLM_MAX_ATTEMPTS env, 3)
+            backoff_base: First retry's backoff cap (default: LLM_BACKOFF_BASE env, 0.5)
+            backoff_max: Largest backoff cap (default: LLM_BACKOFF_MAX env, 8)
+            breaker: Circuit breaker (default: one per client from LLM_BREAKER_* env)
+            max_workers: Streams read at once (default: LLM_MAX_CONCURRENCY env, 16)
+        """
+        self.model = model
+        self.timeout = timeout or float(os.getenv("LLM_TIMEOUT", "60"))
+        self.max_attempts = max(1, max_attempts or int(os.getenv("LLM_MAX_ATTEMPTS", "3")))
+        self.backoff_base = backoff_base if backoff_base is not None else float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+        self.backoff_max = backoff_max if backoff_max is not None else float(os.getenv("LLM_BACKOFF_MAX", "8"))
+        self.breaker = breaker or CircuitBreaker(
+            model,
+            failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+            reset_seconds=float(os.getenv("LLM_BREAKER_RESET", "30")),
+        )
+        # Streams are read on a bounded pool; a late read is aborted, which frees its worker
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+            thread_name_prefix="llm")
+        CIRCUIT_OPEN.labels(model=model).set_function(lambda: 1.0 if self.breaker.state == "open" else 0.0)
+
+    def complete(self, input: Dict[str, Any], operation: str, timeout: Optional[float] = None,
+                 **details: Any) -> str:
+        """
+        Run the model and return its full text output
+
+        Args:
+            input: Model input (prompt, system_prompt, ...); file values are rewound between attempts
+            operation: Pipeline operation name for accounting (e.g. "brand_name")
+            timeout: Seconds per attempt (default: the client's)
+            **details: Extra attributes for the trace span
+
+        Returns:
+            Output text, unstripped
+
+        Raises:
+            CircuitOpenError: If the model's breaker is open
+            LLMError: If the call fails with a client error or after all attempts
+        """
+        timeout = timeout or self.timeout
+        last_error: Optional[BaseException] = None
+        for attempt in range(1, self.max_attempts + 1):
+            self.breaker.before_call()
+            if attempt > 1:
+                RETRIES.labels(model=self.model).inc()
+            try:
+                # Open files can't be read by two requests at once, so those calls are never hedged
+                text = get_hedge_policy().run(
+                    f"llm:{operation}",
+                    lambda cancel, hedge: self._attempt(input, operation, timeout, attempt, details, cancel, hedge),
+                    kind="llm", hedgeable=not _file_inputs(input))
+            except Exception as e:
+                if not _is_retryable(e):
+                    if _answered(e):
+                        # The endpoint answered; the request itself is at fault
+                        self.breaker.record_success()
+                    else:
+                        # Local errors and saturation say nothing about the endpoint's health
+                        self.breaker.release()
+                    raise LLMError(f"{operation} failed: {e}") from e
+                self.breaker.record_failure()
+                last_error = e
+                if _is_rate_limit(e):
+                    RATE_LIMITED.labels(model=self.model).inc()
+                if attempt == self.max_attempts:
+                    break
+                delay = self._backoff(attempt)
+                logger.warning(f"⚠ {operation} attempt {attempt}/{self.max_attempts} failed ({e}); "
+                               f"retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return text
+        raise LLMError(f"{operation} failed after {self.max_attempts} attempt(s): {last_error}") from last_error
+
+    def _backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(max, base * 2^(attempt - 1))]"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def _attempt(self, input: Dict[str, Any], operation: str, timeout: float, attempt: int,
+                 details: Dict[str, Any], cancel: Optional[CancelToken] = None, hedge: bool = False) -> str:
+        """
+        One streamed call, bounded by ``timeout``
+
+        The stream is consumed on the client's pool (in a copy of the caller's
+        context, so accounting lands in the caller's ledger) while the caller
+        waits on the deadline. The deadline starts when a worker picks the
+        attempt up, so time queued behind other calls is not charged to the
+        endpoint; an attempt still queued after ``timeout`` is dropped as
+        LLMSaturatedError. Reads give up after ``timeout`` without data. A late
+        stream is canceled, which cancels its prediction and aborts the read in
+        progress, so its worker is freed right away.
+        """
+        if not hedge:
+            _rewind_files(input)
+        cancel = cancel or CancelToken()
+        chunks: List[str] = []
+        started = threading.Event()
+
+        def consume() -> None:
+            started.set()
+            for event in accounted_stream(self.model, input=input, operation=operation, cancel=cancel,
+                                          hedge=hedge, read_timeout=timeout, attempt=attempt, **details):
+                chunks.append(str(event))
+
+        finished = self._executor.submit(contextvars.copy_context().run, consume)
+        if not started.wait(timeout):
+            if finished.cancel():
+                raise LLMSaturatedError(f"{operation} waited {timeout:g}s for a free stream worker")
+            # Picked up just now
+            started.wait()
+        try:
+            finished.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Still queued: never starts. Running: the cancel aborts its read
+            finished.cancel()
+            cancel.cancel()
+            LLM_TIMEOUTS.labels(model=self.model, operation=operation).inc()
+            raise LLMTimeoutError(f"{operation} did not finish within {timeout:g}s") from None
+        return "".join(chunks)
+
+
+_shared_client: Optional[LLMClient] = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Return the process-wide LLM client (configured from the environment)"""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = LLMClient()
+        return _shared_client
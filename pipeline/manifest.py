@@ -0,0 +1,218 @@
+"""
+Campaign Manifest - Durable per-campaign progress for resumable runs
+
+Each campaign's output directory holds a manifest.json, rewritten atomically
+after every completed step: the brief as it was run, the generated prompt and
+the path and SHA-256 of every saved banner. Multi-market briefs also record
+their enrichment and one prompt per market, with banners keyed
+"<market>/<ratio>". A resumed run finds the latest
+manifest for the same brief (by hash), skips the steps it records and
+re-renders only the aspect ratios that are missing or no longer match.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def brief_hash(campaign: dict) -> str:
+    """SHA-256 of a brief's canonical JSON; identifies the same brief across runs"""
+    canonical = json.dumps(campaign, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the SHA-256 of a file without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CampaignManifest:
+    """Progress of one campaign, persisted next to its outputs"""
+
+    def __init__(self, path: Path, data: Dict[str, Any]):
+        self.path = Path(path)
+        self.data = data
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, output_dir: Path, campaign_id: str, campaign: dict, source: str) -> "CampaignManifest":
+        """Start a manifest for a new campaign run (written on the first save)"""
+        now = datetime.now().isoformat()
+        return cls(Path(output_dir) / MANIFEST_NAME, {
+            "version": MANIFEST_VERSION,
+            "campaign_id": campaign_id,
+            "source": source,
+            "brief_hash": brief_hash(campaign),
+            "status": "running",
+            "created_at": now,
+            "updated_at": now,
+            "campaign": campaign,
+            "prompt": None,
+            "translated_message": None,
+            "enrichment": {},
+            "markets": {},
+            "outputs": {},
+        })
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["CampaignManifest"]:
+        """Load a manifest, or None if it is missing, unreadable or from another version"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable manifest {path}: {e}")
+            return None
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return None
+        return cls(path, data)
+
+    @property
+    def campaign_id(self) -> str:
+        return self.data["campaign_id"]
+
+    @property
+    def output_dir(self) -> Path:
+        return self.path.parent
+
+    @property
+    def prompt(self) -> Optional[str]:
+        return self.data.get("prompt")
+
+    @property
+    def translated_message(self) -> Optional[str]:
+        return self.data.get("translated_message")
+
+    @property
+    def enrichment(self) -> Dict[str, str]:
+        """Fields generated once for the whole brief (brand name, campaign message)"""
+        return self.data.get("enrichment") or {}
+
+    def market_prompt(self, market: str) -> Optional[Tuple[str, str]]:
+        """(prompt, translated message) recorded for one market of a multi-market brief"""
+        entry = (self.data.get("markets") or {}).get(market)
+        return (entry["prompt"], entry["translated_message"]) if entry else None
+
+    def record_enrichment(self, fields: Dict[str, str]) -> None:
+        with self._lock:
+            self.data["enrichment"] = dict(fields)
+        self.save()
+
+    def record_market_prompts(self, prompts: Dict[str, Tuple[str, str]]) -> None:
+        with self._lock:
+            markets = self.data.setdefault("markets", {})
+            for market, (prompt, translated_message) in prompts.items():
+                markets[market] = {"prompt": prompt, "translated_message": translated_message}
+        self.save()
+
+    def record_prompt(self, prompt: str, translated_message: str) -> None:
+        with self._lock:
+            self.data["prompt"] = prompt
+            self.data["translated_message"] = translated_message
+        self.save()
+
+    def record_output(self, key: str, path: Path, sha256: Optional[str] = None,
+                      size_bytes: Optional[int] = None) -> None:
+        """Record a saved banner with its hash, keyed by aspect ratio (or "<market>/<ratio>")"""
+        path = Path(path)
+        entry = {
+            "path": str(path),
+            "sha256": sha256 or file_sha256(path),
+            "size_bytes": size_bytes if size_bytes is not None else path.stat().st_size,
+            "saved_at": datetime.now().isoformat(),
+        }
+        with self._lock:
+            self.data["outputs"][key] = entry
+        self.save()
+
+    def record_write(self, key: str, write: Future) -> None:
+        """Record a banner as soon as its background write (a WriteResult future) succeeds"""
+        def record(future: Future) -> None:
+            if not future.cancelled() and future.exception() is None:
+                result = future.result()
+                self.record_output(key, result.path, sha256=result.sha256, size_bytes=result.size_bytes)
+        write.add_done_callback(record)
+
+    def completed_output(self, key: str) -> Optional[Path]:
+        """
+        Return the banner saved under a key if it is still intact
+
+        Returns:
+            The banner path, or None if it was never saved, is gone or changed
+        """
+        entry = self.data.get("outputs", {}).get(key)
+        if not entry:
+            return None
+        path = Path(entry["path"])
+        try:
+            if path.stat().st_size != entry.get("size_bytes") or file_sha256(path) != entry.get("sha256"):
+                logger.warning(f"Banner changed since it was saved, re-rendering: {path}")
+                return None
+        except OSError:
+            return None
+        return path
+
+    def set_status(self, status: str) -> None:
+        with self._lock:
+            self.data["status"] = status
+        self.save()
+
+    def save(self) -> None:
+        """Write the manifest atomically: a crash leaves the previous or the new version"""
+        with self._lock:
+            self.data["updated_at"] = datetime.now().isoformat()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+
+def iter_manifests(root: Path) -> Iterable[Path]:
+    """Manifest paths of single runs (root/<campaign>/) and batches (root/batch_*/<campaign>/)"""
+    root = Path(root)
+    if not root.is_dir():
+        return
+    yield from root.glob(f"*/{MANIFEST_NAME}")
+    yield from root.glob(f"batch_*/*/{MANIFEST_NAME}")
+
+
+def index_manifests(root: Path) -> Dict[str, CampaignManifest]:
+    """
+    Map each brief hash to its most recently updated manifest under root
+
+    Built once per run, so resuming a large batch doesn't rescan per brief.
+
+    Args:
+        root: Outputs directory to search
+
+    Returns:
+        Dictionary of brief hash -> latest manifest
+    """
+    latest: Dict[str, CampaignManifest] = {}
+    for path in iter_manifests(root):
+        manifest = CampaignManifest.load(path)
+        if manifest is None:
+            continue
+        key = manifest.data.get("brief_hash")
+        current = latest.get(key)
+        if current is None or manifest.data.get("updated_at", "") > current.data.get("updated_at", ""):
+            latest[key] = manifest
+    return latest
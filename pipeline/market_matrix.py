@@ -0,0 +1,143 @@
+"""
+Market Matrix - Render one brief for many target markets with shared work
+
+A brief with ``target_markets: [...]`` is enriched once (brand name and base
+campaign message), gets its translations and per-market prompts from batched
+LLM calls (see generate_market_prompts), and renders every market x aspect
+ratio pair through one concurrent scheduler. Banners are grouped by market:
+    <campaign dir>/<market>/<ratio>/banner_<market>.png
+"""
+
+import contextvars
+import logging
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .campaign_utils import generate_brand_name, generate_campaign_message
+from .output_writer import WriteResult
+from .reporter import trace_span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RenderTask:
+    """One banner of the matrix"""
+    market: str
+    aspect_ratio: str
+    prompt: str
+
+    @property
+    def key(self) -> str:
+        """Manifest key of the banner"""
+        return f"{self.market}/{self.aspect_ratio}"
+
+
+@dataclass
+class RenderOutcome:
+    """Result of a render task: the saved banner or the error"""
+    task: RenderTask
+    path: Optional[Path] = None
+    error: Optional[str] = None
+    duration_seconds: float = 0.0  # Render time; the write may finish later
+    write: Optional[WriteResult] = None
+
+
+def market_slug(market: str) -> str:
+    return market.strip().lower().replace(" ", "_").replace("/", "_")
+
+
+def market_output_path(base_output_dir: Path, market: str, aspect_ratio: str) -> Path:
+    """Path of a market's banner: <base>/<market>/<ratio>/banner_<market>.png"""
+    slug = market_slug(market)
+    return Path(base_output_dir) / slug / aspect_ratio.replace(":", "_") / f"banner_{slug}.png"
+
+
+def enrich_campaign(campaign: dict, markets: List[str]) -> Dict[str, str]:
+    """
+    Generate the brand name and base campaign message once for all markets
+
+    Only blank fields are generated; the message stays in English and is
+    translated per market by the prompt calls.
+
+    Args:
+        campaign: Campaign brief dictionary
+        markets: Target markets the brief is rendered for
+
+    Returns:
+        Dictionary of the generated fields (empty if the brief had both)
+    """
+    products = campaign.get("products", [])
+    target_audience = campaign.get("target_audience", "")
+    all_markets = ", ".join(markets)
+    generated: Dict[str, str] = {}
+
+    brand_name = (campaign.get("brand_name") or "").strip()
+    if not brand_name:
+        brand_name = generated["brand_name"] = generate_brand_name(products, all_markets, target_audience)
+    if not (campaign.get("campaign_message") or "").strip():
+        generated["campaign_message"] = generate_campaign_message(
+            products, all_markets, target_audience, brand_name)
+    return generated
+
+
+def run_render_matrix(tasks: List[RenderTask], render: Callable[[RenderTask], "Future[WriteResult]"],
+                      concurrency: Optional[int] = None) -> List[RenderOutcome]:
+    """
+    Run every render task through one thread pool
+
+    Each task runs in a copy of the caller's context, so its spans and remote
+    calls are recorded on the caller's reporter. A render slot is freed as
+    soon as its image is handed to the output writer; writes are awaited once
+    all renders are done. A failed task does not stop the others.
+
+    Args:
+        tasks: Banners to render
+        render: Renders one banner and queues its write, returning the write's future
+        concurrency: Renders in flight (default: MATRIX_RENDER_CONCURRENCY env, 6)
+
+    Returns:
+        One outcome per task, in task order
+    """
+    if not tasks:
+        return []
+    concurrency = concurrency or int(os.getenv("MATRIX_RENDER_CONCURRENCY", "6"))
+    workers = max(1, min(concurrency, len(tasks)))
+    logger.info(f"Rendering {len(tasks)} banner(s) with {workers} concurrent render(s)")
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render") as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, _run_task, render, task)
+            for task in tasks
+        ]
+        rendered = [future.result() for future in futures]
+
+    outcomes = []
+    for outcome, write in rendered:
+        if write is not None:
+            try:
+                outcome.write = write.result()
+                outcome.path = outcome.write.path
+                logger.info(f"✓ {outcome.task.market} {outcome.task.aspect_ratio} banner saved: {outcome.path}")
+            except Exception as e:
+                outcome.error = f"Save failed: {e}"
+                logger.error(f"✗ Failed to save {outcome.task.market} {outcome.task.aspect_ratio} banner: {e}")
+        outcomes.append(outcome)
+    return outcomes
+
+
+def _run_task(render: Callable[[RenderTask], "Future[WriteResult]"],
+              task: RenderTask) -> Tuple[RenderOutcome, Optional[Future]]:
+    start = time.perf_counter()
+    try:
+        with trace_span(f"{task.market} {task.aspect_ratio}", "matrix",
+                        market=task.market, aspect_ratio=task.aspect_ratio):
+            write = render(task)
+        return RenderOutcome(task, duration_seconds=time.perf_counter() - start), write
+    except Exception as e:
+        logger.error(f"✗ Failed to generate {task.market} {task.aspect_ratio} banner: {e}")
+        return RenderOutcome(task, error=str(e), duration_seconds=time.perf_counter() - start), None
@@ -0,0 +1,333 @@
+"""
+Metrics - Lock-light Prometheus-style counters, gauges and histograms
+
+Recording on the hot path touches only a per-thread shard (no lock, no shared
+write); shards are summed when metrics are scraped, and folded into a base
+total when their thread exits. Labelled children are
+created once under a lock and then reused.
+"""
+
+import bisect
+import itertools
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Default latency buckets in seconds, from fast local work up to slow renders
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+                   20.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class _ShardHolder:
+    """Thread-local owner of a shard; when its thread dies the shard is retired"""
+    __slots__ = ("values", "__weakref__")
+
+    def __init__(self, values: List[float]):
+        self.values = values
+
+
+class _Shards:
+    """Per-thread value arrays; each thread only ever writes its own
+
+    A thread's shard is folded into a base total when the thread exits, so
+    short-lived threads (one per remote call) don't leave shards behind.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._base = [0.0] * size
+        self._all: Dict[int, List[float]] = {}
+
+    def get(self) -> List[float]:
+        try:
+            return self._local.holder.values
+        except AttributeError:
+            values = [0.0] * self._size
+            with self._lock:
+                shard_id = next(self._ids)
+                self._all[shard_id] = values
+            holder = _ShardHolder(values)
+            # Thread-local storage is released when the thread ends, which retires the shard
+            weakref.finalize(holder, self._retire, shard_id)
+            self._local.holder = holder
+            return values
+
+    def _retire(self, shard_id: int) -> None:
+        with self._lock:
+            values = self._all.pop(shard_id, None)
+            if values is not None:
+                for i, value in enumerate(values):
+                    self._base[i] += value
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            totals = list(self._base)
+            shards = list(self._all.values())
+        for values in shards:
+            for i, value in enumerate(values):
+                totals[i] += value
+        return totals
+
+
+class _CounterChild:
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._shards.get()[0] += amount
+
+    def value(self) -> float:
+        return self._shards.totals()[0]
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._shards = _Shards(1)
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._shards.get()[0] += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._shards.get()[0] -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the gauge at scrape time instead of tracking it"""
+        self._function = function
+
+    def value(self) -> float:
+        if self._function is not None:
+            return float(self._function())
+        return self._shards.totals()[0]
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]):
+        self._buckets = tuple(buckets)
+        # One slot per bucket, plus +Inf, sum and count
+        self._shards = _Shards(len(self._buckets) + 3)
+
+    def observe(self, value: float) -> None:
+        values = self._shards.get()
+        values[bisect.bisect_left(self._buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of a block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        """Return (cumulative bucket counts including +Inf, sum, count)"""
+        totals = self._shards.totals()
+        cumulative = []
+        running = 0.0
+        for count in totals[:len(self._buckets) + 1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, totals[-2], totals[-1]
+
+
+class _Metric:
+    """A named metric family with optional labels"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        """Return the child for a label combination, creating it on first use"""
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _unlabelled(self):
+        return self.labels()
+
+    def _label_str(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for values, child in children:
+            lines.extend(self._expose_child(values, child))
+        return lines
+
+    def _expose_child(self, values, child) -> List[str]:
+        return [f"{self.name}{self._label_str(values)} {_format(child.value())}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._unlabelled().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed at scrape time"""
+
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._unlabelled().dec(amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._unlabelled().set_function(function)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._unlabelled().observe(value)
+
+    def time(self):
+        return self._unlabelled().time()
+
+    def _expose_child(self, values, child) -> List[str]:
+        cumulative, total, count = child.snapshot()
+        lines = []
+        for bound, value in zip(list(self.buckets) + [float("inf")], cumulative):
+            le = 'le="' + ("+Inf" if bound == float("inf") else _format(bound)) + '"'
+            lines.append(f"{self.name}_bucket{self._label_str(values, le)} {_format(value)}")
+        lines.append(f"{self.name}_sum{self._label_str(values)} {_format(total)}")
+        lines.append(f"{self.name}_count{self._label_str(values)} {_format(count)}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics exposed together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def expose(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# Content type for the text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = Registry()
+
+JOB_DURATION = REGISTRY.register(Histogram(
+    "easy_ads_job_duration_seconds", "End-to-end generation job duration", ["status"]))
+STEP_DURATION = REGISTRY.register(Histogram(
+    "easy_ads_step_duration_seconds",
+    "Pipeline step duration (enrichment, prompt, render, download, save, compliance, suggest)",
+    ["step", "aspect_ratio"]))
+REMOTE_CALL_DURATION = REGISTRY.register(Histogram(
+    "easy_ads_remote_call_duration_seconds", "Remote model call latency", ["model", "kind"]))
+REMOTE_FIRST_BYTE = REGISTRY.register(Histogram(
+    "easy_ads_remote_first_byte_seconds", "Remote model call submit to first byte", ["model", "kind"]))
+ESTIMATED_COST = REGISTRY.register(Counter(
+    "easy_ads_estimated_cost_usd_total", "Estimated spend on remote model calls in USD", ["model"]))
+
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "easy_ads_queue_depth", "Jobs accepted but not started"))
+ACTIVE_JOBS = REGISTRY.register(Gauge(
+    "easy_ads_active_jobs", "Jobs currently processing"))
+JOBS_IN_MEMORY = REGISTRY.register(Gauge(
+    "easy_ads_jobs_in_memory", "Jobs held in the in-memory job store"))
+
+RETRIES = REGISTRY.register(Counter(
+    "easy_ads_retries_total", "Retried remote calls", ["model"]))
+RATE_LIMITED = REGISTRY.register(Counter(
+    "easy_ads_rate_limited_total", "Remote calls rejected by rate limiting", ["model"]))
+FAILURES = REGISTRY.register(Counter(
+    "easy_ads_failures_total", "Failed jobs and steps", ["stage"]))
+LLM_TIMEOUTS = REGISTRY.register(Counter(
+    "easy_ads_llm_timeouts_total", "LLM call attempts abandoned at their deadline", ["model", "operation"]))
+PROMPT_VALIDATIONS = REGISTRY.register(Counter(
+    "easy_ads_prompt_validations_total",
+    "Optimized prompt validation outcomes (valid, repaired, retried, failed)", ["outcome"]))
+TRANSLATION_MEMORY = REGISTRY.register(Counter(
+    "easy_ads_translation_memory_total",
+    "Translation memory lookups and stores (hit, miss, stored, replaced)", ["outcome"]))
+SUGGESTIONS = REGISTRY.register(Counter(
+    "easy_ads_suggestions_total",
+    "Suggestion requests by outcome (hit, miss, coalesced)", ["outcome"]))
+HEDGES = REGISTRY.register(Counter(
+    "easy_ads_hedges_total", "Hedged remote calls by outcome (fired, won, denied)", ["kind", "outcome"]))
+CIRCUIT_OPEN = REGISTRY.register(Gauge(
+    "easy_ads_circuit_open", "1 while a model's circuit breaker is failing calls fast", ["model"]))
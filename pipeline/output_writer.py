@@ -0,0 +1,211 @@
+"""
+Output Writer - Encode and write banners off the render path
+
+Renders hand their images to a dedicated encode pool and move on; the pool
+encodes with the configured format settings and writes each file atomically
+(temp file in the same directory, then rename), so readers never see a
+partial banner. Configured from the environment:
+    OUTPUT_FORMAT              png (default), webp or jpeg
+    OUTPUT_PNG_COMPRESS_LEVEL  zlib level 0-9 for PNG (default 6)
+    OUTPUT_QUALITY             WebP/JPEG quality 1-100 (default 90)
+    OUTPUT_LOSSLESS            Lossless WebP (default false)
+    OUTPUT_OPTIMIZE            Extra encoder passes for smaller files (default false)
+    OUTPUT_ENCODER             thread (default) or process; PIL's encoders mostly
+                               release the GIL, process isolates them entirely
+    OUTPUT_ENCODE_WORKERS      Encode pool size (default: CPUs, at most 4)
+
+Encoding happens on the pool's threads, outside per-job profiles; each write
+is traced as an "encode <file>" span under the step that submitted it.
+"""
+
+import contextvars
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Union
+
+from .reporter import trace_span
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+_EXTENSIONS = {"png": ".png", "webp": ".webp", "jpeg": ".jpg"}
+
+
+class OutputWriterError(Exception):
+    """Raised for invalid output settings"""
+    pass
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class OutputFormat:
+    """Encoder settings for one output format"""
+    name: str = "png"
+    png_compress_level: int = 6
+    quality: int = 90
+    lossless: bool = False
+    optimize: bool = False
+
+    def __post_init__(self):
+        if self.name not in _EXTENSIONS:
+            raise OutputWriterError(f"Unknown output format '{self.name}', expected one of {sorted(_EXTENSIONS)}")
+
+    @classmethod
+    def from_env(cls) -> "OutputFormat":
+        name = os.getenv("OUTPUT_FORMAT", "png").strip().lower()
+        return cls(
+            name="jpeg" if name == "jpg" else name,
+            png_compress_level=int(os.getenv("OUTPUT_PNG_COMPRESS_LEVEL", "6")),
+            quality=int(os.getenv("OUTPUT_QUALITY", "90")),
+            lossless=_env_flag("OUTPUT_LOSSLESS"),
+            optimize=_env_flag("OUTPUT_OPTIMIZE"),
+        )
+
+    @property
+    def extension(self) -> str:
+        return _EXTENSIONS[self.name]
+
+    def save_options(self) -> Dict[str, Any]:
+        """Keyword arguments for PIL's Image.save"""
+        if self.name == "png":
+            return {"format": "PNG", "compress_level": self.png_compress_level, "optimize": self.optimize}
+        if self.name == "webp":
+            return {"format": "WEBP", "quality": self.quality, "lossless": self.lossless,
+                    "method": 6 if self.optimize else 4}
+        return {"format": "JPEG", "quality": self.quality, "optimize": self.optimize, "progressive": self.optimize}
+
+
+@dataclass
+class WriteResult:
+    """A banner written to disk"""
+    path: Path
+    size_bytes: int
+    sha256: str
+    encode_seconds: float
+    write_seconds: float
+    details: Dict[str, Any] = field(default_factory=dict)
+
+
+def encode_image(image: "Image.Image", output_format: OutputFormat) -> bytes:
+    """Encode an image in memory with the format's settings"""
+    if output_format.name == "jpeg" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, **output_format.save_options())
+    return buffer.getvalue()
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Write bytes so the file appears complete or not at all"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def encode_and_write(image: "Image.Image", path: Union[str, Path], output_format: OutputFormat) -> WriteResult:
+    """Encode an image and write it atomically; runs in the encode pool (thread or process)"""
+    path = Path(path)
+    start = time.perf_counter()
+    data = encode_image(image, output_format)
+    encoded = time.perf_counter()
+    write_atomic(path, data)
+    return WriteResult(
+        path=path,
+        size_bytes=len(data),
+        sha256=hashlib.sha256(data).hexdigest(),
+        encode_seconds=encoded - start,
+        write_seconds=time.perf_counter() - encoded,
+        details={"format": output_format.name, "size": f"{image.size[0]}x{image.size[1]}"},
+    )
+
+
+def _traced_encode_and_write(image: "Image.Image", path: Path, output_format: OutputFormat) -> WriteResult:
+    with trace_span(f"encode {path.name}", "save", format=output_format.name) as span:
+        result = encode_and_write(image, path, output_format)
+        if span is not None:
+            span.details["bytes"] = result.size_bytes
+        return result
+
+
+class OutputWriter:
+    """Pool that encodes and writes banners in the background"""
+
+    def __init__(self, output_format: Optional[OutputFormat] = None, workers: Optional[int] = None,
+                 mode: Optional[str] = None):
+        """
+        Initialize output writer
+
+        Args:
+            output_format: Encoder settings (default: from the environment)
+            workers: Encode pool size (default: OUTPUT_ENCODE_WORKERS env, CPUs up to 4)
+            mode: "thread" or "process" (default: OUTPUT_ENCODER env, "thread")
+        """
+        self.format = output_format or OutputFormat.from_env()
+        self.mode = (mode or os.getenv("OUTPUT_ENCODER", "thread")).strip().lower()
+        if self.mode not in ("thread", "process"):
+            raise OutputWriterError(f"Unknown encoder mode '{self.mode}', expected 'thread' or 'process'")
+        workers = workers or int(os.getenv("OUTPUT_ENCODE_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+        if self.mode == "process":
+            import multiprocessing
+            # Spawned workers don't inherit the parent's threads and locks
+            self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="encode")
+        logger.info(f"Output writer: {self.format.name} via {workers} {self.mode} worker(s)")
+
+    def output_path(self, path: Union[str, Path]) -> Path:
+        """The path a banner is written to: ``path`` with the format's extension"""
+        return Path(path).with_suffix(self.format.extension)
+
+    def submit(self, image: "Image.Image", path: Union[str, Path]) -> "Future[WriteResult]":
+        """
+        Queue an image for encoding and return immediately
+
+        Args:
+            image: Rendered banner
+            path: Destination; the extension is replaced by the format's
+
+        Returns:
+            Future resolving to the WriteResult, or raising the encode/write error
+        """
+        path = self.output_path(path)
+        if self.mode == "process":
+            return self._pool.submit(encode_and_write, image, path, self.format)
+        # Threads run in a copy of the caller's context so the encode span nests under its step
+        return self._pool.submit(contextvars.copy_context().run, _traced_encode_and_write,
+                                 image, path, self.format)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+
+_shared_writer: Optional[OutputWriter] = None
+_shared_lock = threading.Lock()
+
+
+def get_output_writer() -> OutputWriter:
+    """Return the process-wide output writer (configured from the environment)"""
+    global _shared_writer
+    with _shared_lock:
+        if _shared_writer is None:
+            _shared_writer = OutputWriter()
+        return _shared_writer
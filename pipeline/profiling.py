@@ -0,0 +1,277 @@
+"""
+Profiling - Opt-in per-job profiles in pstats and collapsed-stack format
+
+Off by default; when off, no profiler is created and jobs run untouched.
+Enable it for every job with PROFILE_JOBS, or per API request:
+    sample    Sample the job thread's stack every PROFILE_INTERVAL seconds
+              (default 0.005). Low overhead; writes wall-time and CPU-time
+              views as collapsed stacks (flamegraph.pl, speedscope) and pstats.
+    cprofile  Deterministic cProfile of the job thread (wall time). Exact call
+              counts, but slows Python-heavy code down noticeably.
+    all       Both; sampled timings then include cProfile's overhead.
+
+Only the thread that started the job is profiled. Time spent waiting on
+remote calls shows up in the wall-time view but not in the CPU-time view.
+Banner encoding runs on the shared encode pool (see output_writer), so its CPU
+time is missing from job profiles; the job's "encode <file>" trace spans
+record how long each banner took.
+"""
+
+import cProfile
+import logging
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("sample", "cprofile", "all")
+
+# pstats function key: (filename, first line, function name)
+FuncKey = Tuple[str, int, str]
+Stack = Tuple[FuncKey, ...]
+
+
+def resolve_mode(requested: Optional[str] = None) -> Optional[str]:
+    """
+    Resolve the profiling mode for a job
+
+    Args:
+        requested: Mode asked for by the caller (e.g. an API request); falls
+            back to the PROFILE_JOBS environment variable when None
+
+    Returns:
+        "sample", "cprofile", "all", or None when profiling is off
+    """
+    value = (requested if requested is not None else os.getenv("PROFILE_JOBS", "")).strip().lower()
+    if value in ("", "0", "false", "no", "off", "none"):
+        return None
+    if value in ("1", "true", "yes", "on"):
+        return "sample"
+    if value not in PROFILE_MODES:
+        logger.warning(f"Unknown profiling mode '{value}', expected one of {PROFILE_MODES}; profiling is off")
+        return None
+    return value
+
+
+class StackSampler:
+    """Periodically sample one thread's stack, weighted by wall and CPU time"""
+
+    def __init__(self, thread_id: int, interval: float):
+        """
+        Initialize sampler
+
+        Args:
+            thread_id: threading ident of the thread to sample
+            interval: Seconds between samples
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.wall: Dict[Stack, float] = defaultdict(float)
+        self.cpu: Dict[Stack, float] = defaultdict(float)
+        self.counts: Dict[Stack, int] = defaultdict(int)
+        self.samples = 0
+        self._keys: Dict[CodeType, FuncKey] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="job-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _cpu_clock(self):
+        """Return a function reading the sampled thread's CPU time, or None if unsupported"""
+        try:
+            clock_id = time.pthread_getcpuclockid(self.thread_id)
+            time.clock_gettime(clock_id)
+        except (AttributeError, OSError):
+            return None
+        return lambda: time.clock_gettime(clock_id)
+
+    def _stack(self, frame: Optional[FrameType]) -> Stack:
+        keys = self._keys
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = keys.get(code)
+            if key is None:
+                key = keys[code] = (code.co_filename, code.co_firstlineno, code.co_name)
+            stack.append(key)
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def _run(self) -> None:
+        cpu_clock = self._cpu_clock()
+        last_wall = time.perf_counter()
+        last_cpu = cpu_clock() if cpu_clock else 0.0
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break  # Thread has exited
+            now = time.perf_counter()
+            stack = self._stack(frame)
+            del frame
+            # Attribute the time since the previous sample to the stack seen now
+            self.wall[stack] += now - last_wall
+            self.counts[stack] += 1
+            last_wall = now
+            if cpu_clock is not None:
+                try:
+                    cpu = cpu_clock()
+                except OSError:
+                    break
+                self.cpu[stack] += cpu - last_cpu
+                last_cpu = cpu
+            self.samples += 1
+
+
+class JobProfiler:
+    """Profile of one job; created by start_profiler() and written by stop_and_save()"""
+
+    def __init__(self, mode: str, interval: float):
+        self.mode = mode
+        self.thread_id = threading.get_ident()
+        self.sampler: Optional[StackSampler] = None
+        self.cprofile: Optional[cProfile.Profile] = None
+        if mode in ("sample", "all"):
+            self.sampler = StackSampler(self.thread_id, interval)
+        if mode in ("cprofile", "all"):
+            self.cprofile = cProfile.Profile()
+
+    def start(self) -> None:
+        if self.sampler is not None:
+            self.sampler.start()
+        if self.cprofile is not None:
+            self.cprofile.enable()
+
+    def stop_and_save(self, output_dir: Path, name: str) -> List[str]:
+        """
+        Stop profiling and write the profiles
+
+        Must be called from the thread that started the profiler.
+
+        Args:
+            output_dir: Directory to write to (usually the job's output directory)
+            name: File name prefix (e.g. "profile_<job id>")
+
+        Returns:
+            Paths of the written files
+        """
+        if self.cprofile is not None:
+            if threading.get_ident() == self.thread_id:
+                self.cprofile.disable()
+            else:
+                logger.warning("cProfile stopped from another thread; its profile may be incomplete")
+        if self.sampler is not None:
+            self.sampler.stop()
+
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        written: List[Path] = []
+        if self.cprofile is not None:
+            path = output_dir / f"{name}.cprofile.pstats"
+            self.cprofile.dump_stats(str(path))
+            written.append(path)
+        if self.sampler is not None:
+            views = [("wall", self.sampler.wall)]
+            if self.sampler.cpu:
+                views.append(("cpu", self.sampler.cpu))
+            for view, samples in views:
+                written.append(_write_collapsed(samples, output_dir / f"{name}.{view}.collapsed"))
+                written.append(_write_pstats(samples, self.sampler.counts, output_dir / f"{name}.{view}.pstats"))
+
+        logger.info(f"⏱ Profile ({self.mode}) saved: {', '.join(p.name for p in written)}")
+        return [str(path) for path in written]
+
+
+def start_profiler(requested: Optional[str] = None) -> Optional[JobProfiler]:
+    """
+    Start profiling the current thread if profiling is enabled for this job
+
+    Args:
+        requested: Mode asked for by the caller; None defers to PROFILE_JOBS
+
+    Returns:
+        The running profiler, or None when profiling is off
+    """
+    mode = resolve_mode(requested)
+    if mode is None:
+        return None
+    profiler = JobProfiler(mode, interval=float(os.getenv("PROFILE_INTERVAL", "0.005")))
+    profiler.start()
+    return profiler
+
+
+def _frame_label(key: FuncKey) -> str:
+    filename, line, name = key
+    return f"{name} ({_short_path(filename)}:{line})"
+
+
+_path_prefixes = sorted((p for p in sys.path if p), key=len, reverse=True)
+
+
+def _short_path(filename: str) -> str:
+    for prefix in _path_prefixes:
+        if filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return filename
+
+
+def _write_collapsed(samples: Dict[Stack, float], path: Path) -> Path:
+    """Write one "frame;frame;leaf weight" line per stack, weights in microseconds"""
+    lines = []
+    for stack, seconds in samples.items():
+        weight = int(round(seconds * 1e6))
+        if weight > 0:
+            lines.append(f"{';'.join(_frame_label(key).replace(';', ':') for key in stack)} {weight}")
+    path.write_text("\n".join(sorted(lines)) + "\n")
+    return path
+
+
+def _write_pstats(samples: Dict[Stack, float], counts: Dict[Stack, int], path: Path) -> Path:
+    """
+    Write sampled stacks in the marshalled format pstats.Stats() loads
+
+    Call counts are sample counts; tottime is time as the leaf frame and
+    cumtime is time anywhere on the stack (counted once per stack).
+    """
+    stats: Dict[FuncKey, list] = {}
+    for stack, seconds in samples.items():
+        if not stack:
+            continue
+        count = counts.get(stack, 1)
+        seen = set()
+        for depth, key in enumerate(stack):
+            entry = stats.setdefault(key, [0, 0, 0.0, 0.0, {}])
+            if key in seen:
+                continue
+            seen.add(key)
+            entry[0] += count
+            entry[1] += count
+            entry[3] += seconds
+            if depth:
+                caller = entry[4].setdefault(stack[depth - 1], [0, 0, 0.0, 0.0])
+                caller[0] += count
+                caller[1] += count
+                caller[3] += seconds
+                if depth == len(stack) - 1:
+                    caller[2] += seconds
+        stats[stack[-1]][2] += seconds
+
+    marshalled = {
+        key: (cc, nc, tt, ct, {caller: tuple(edge) for caller, edge in callers.items()})
+        for key, (cc, nc, tt, ct, callers) in stats.items()
+    }
+    with open(path, "wb") as f:
+        marshal.dump(marshalled, f)
+    return path
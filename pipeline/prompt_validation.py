@@ -0,0 +1,174 @@
+"""
+Prompt Validation - Strict gate on structured prompt output before any render is paid for
+
+The LLM's JSON is validated against OptimizedPrompt. Output that fails is
+repaired locally first: code fences and surrounding text are stripped,
+trailing commas dropped, and the diagnostic fields (brand mentions, logo,
+campaign message) derived from the prompt when missing. What still fails is
+retried once by the caller with the validation errors; after that the job
+fails before rendering. Outcomes (valid, repaired, retried, failed) are
+counted in easy_ads_prompt_validations_total.
+"""
+
+import json
+import logging
+import re
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+from .events import log_event
+from .metrics import PROMPT_VALIDATIONS
+
+if TYPE_CHECKING:
+    from .schemas import OptimizedPrompt
+
+logger = logging.getLogger(__name__)
+
+# Appended to the prompt of the one retry after a failed validation
+RETRY_INSTRUCTION = """Your previous response could not be used:
+{errors}
+
+Return ONLY a JSON object, without markdown or commentary, with exactly these fields:
+- "image_prompt" (string): the complete Seedream prompt
+- "translated_campaign_message" (string): the campaign message as it appears in the image
+- "brand_mentions" (integer): times the brand name appears in quotes in image_prompt
+- "includes_logo" (boolean): whether image_prompt describes the logo placement
+- "includes_campaign_message" (boolean): whether image_prompt contains the campaign message"""
+
+
+class PromptValidationError(Exception):
+    """Raised when the LLM's structured prompt output fails validation"""
+
+    def __init__(self, message: str, errors: List[str]):
+        super().__init__(message)
+        self.errors = errors
+
+
+# Whitespace then a closing bracket: what makes a comma trailing
+_CLOSING = re.compile(r"\s*[\]\}]")
+# Whitespace then the end of a value: what makes a quote a doubled closing quote
+_VALUE_END = re.compile(r"\s*[,\}]")
+
+
+def repair_json(text: str) -> str:
+    """
+    Fix the formatting slips LLMs make in JSON output
+
+    Text that already parses is returned as is. Otherwise markdown fences and
+    text around the outermost object are stripped, then doubled closing quotes
+    and trailing commas are dropped. Those fixes only apply outside string
+    literals, so the text of a value (e.g. a quoted "SALE,}") is never rewritten.
+    """
+    try:
+        json.loads(text)
+        return text
+    except json.JSONDecodeError:
+        pass
+    text = text.strip()
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text)
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        text = text[start:end + 1]
+
+    out: List[str] = []
+    in_string = escaped = just_closed = False
+    for i, char in enumerate(text):
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string, just_closed = False, True
+            continue
+        if char == '"' and just_closed and _VALUE_END.match(text, i + 1):
+            # "text"" -> "text"
+            just_closed = False
+            continue
+        just_closed = False
+        if char == "," and _CLOSING.match(text, i + 1):
+            continue
+        if char == '"':
+            in_string = True
+        out.append(char)
+    return "".join(out)
+
+
+def _derive_missing_fields(data: Dict[str, Any], brand_name: str) -> Dict[str, Any]:
+    """Fill the diagnostic fields that follow from the prompt itself"""
+    image_prompt = data.get("image_prompt")
+    if not isinstance(image_prompt, str):
+        return data
+    data = dict(data)
+    if "brand_mentions" not in data:
+        data["brand_mentions"] = image_prompt.count(f'"{brand_name}"') if brand_name else 0
+    if "includes_logo" not in data:
+        data["includes_logo"] = "logo" in image_prompt.lower()
+    message = data.get("translated_campaign_message")
+    if "includes_campaign_message" not in data and isinstance(message, str):
+        data["includes_campaign_message"] = bool(message.strip()) and message.strip() in image_prompt
+    return data
+
+
+def _schema_errors(error: Exception) -> List[str]:
+    return [f"{'.'.join(str(part) for part in e['loc']) or 'response'}: {e['msg']}" for e in error.errors()]
+
+
+def validate_prompt_output(data: Any, brand_name: str = "") -> Tuple["OptimizedPrompt", bool]:
+    """
+    Validate an LLM response (text or parsed entry) against OptimizedPrompt
+
+    Args:
+        data: Raw response text, or an already parsed JSON object (batched entries)
+        brand_name: Brand name, used to derive a missing brand mention count
+
+    Returns:
+        Tuple of (validated prompt, whether local repair was needed)
+
+    Raises:
+        PromptValidationError: If the output is invalid even after local repair
+    """
+    from pydantic import ValidationError
+
+    from .schemas import OptimizedPrompt
+
+    errors: List[str] = []
+    if isinstance(data, str):
+        try:
+            return OptimizedPrompt.model_validate_json(data.strip()), False
+        except ValidationError as e:
+            errors = _schema_errors(e)
+        try:
+            data = json.loads(repair_json(data))
+        except json.JSONDecodeError as e:
+            raise PromptValidationError(f"Response is not valid JSON: {e}", errors or [f"invalid JSON: {e}"])
+    else:
+        try:
+            return OptimizedPrompt.model_validate(data), False
+        except ValidationError as e:
+            errors = _schema_errors(e)
+
+    if not isinstance(data, dict):
+        raise PromptValidationError("Response is not a JSON object", ["response: expected a JSON object"])
+    try:
+        return OptimizedPrompt.model_validate(_derive_missing_fields(data, brand_name)), True
+    except ValidationError as e:
+        errors = _schema_errors(e)
+    raise PromptValidationError(f"Response failed validation: {'; '.join(errors)}", errors)
+
+
+def retry_instruction(error: PromptValidationError) -> str:
+    """The correction appended to the prompt for the one retry"""
+    return RETRY_INSTRUCTION.format(errors="\n".join(f"- {e}" for e in error.errors))
+
+
+def record_validation(outcome: str, **fields: Any) -> None:
+    """Count a validation outcome (valid, repaired, retried or failed)"""
+    PROMPT_VALIDATIONS.labels(outcome=outcome).inc()
+    if outcome == "failed":
+        log_event(logger, "prompt_validation_failed", "✗ Optimized prompt failed validation after a retry",
+                  level=logging.ERROR, outcome=outcome, **fields)
+    elif outcome != "valid":
+        how = "a retry" if outcome == "retried" else "local repair"
+        log_event(logger, "prompt_validation_repaired", f"⚠ Optimized prompt passed validation after {how}",
+                  level=logging.WARNING, outcome=outcome, **fields)
@@ -0,0 +1,275 @@
+"""Reference Images - Pre-size, deduplicate and upload reference image assets
+
+Reference images from the assets directory are downscaled once to the size the
+image model actually uses, stored under their content hash and uploaded once.
+The resulting URL is reused by every later prediction until it expires.
+Every image in the assets directory is sent with every render, so this is
+opt-in.
+
+Configured from the environment:
+    REFERENCE_IMAGES        Send assets/ images to the image model (default false)
+    REFERENCE_UPLOADER      "replicate" or "local" (default replicate)
+    REFERENCE_MAX_SIZE      Longest side in pixels of the copies sent (default 1024)
+    REFERENCE_CACHE_DIR     Resized copies and upload index (default .cache/reference_images)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceImageError(Exception):
+    """Custom exception for reference image errors"""
+    pass
+
+
+class LocalUploader:
+    """Stand-in for the upload service: returns file:// URLs of the cached copies
+
+    Used for offline runs and tests, where nothing should leave the machine.
+    """
+
+    name = "local"
+    # Local files never expire
+    ttl_seconds: Optional[float] = None
+
+    def upload(self, path: Path) -> str:
+        return path.resolve().as_uri()
+
+
+class ReplicateUploader:
+    """Upload files through the Replicate files API"""
+
+    name = "replicate"
+    # Replicate deletes uploaded files after a day; refresh a bit earlier
+    ttl_seconds: Optional[float] = 23 * 60 * 60
+
+    def upload(self, path: Path) -> str:
+        import replicate
+
+        with open(path, "rb") as f:
+            uploaded = replicate.files.create(f)
+        url = uploaded.urls.get("get")
+        if not url:
+            raise ReferenceImageError(f"Upload of {path.name} returned no URL")
+        return url
+
+
+def get_uploader(name: Optional[str] = None):
+    """
+    Get an uploader by name
+
+    Args:
+        name: "replicate" or "local" (default: REFERENCE_UPLOADER env or "replicate")
+
+    Returns:
+        Uploader instance
+    """
+    name = (name or os.getenv("REFERENCE_UPLOADER", "replicate")).lower()
+    if name == "local":
+        return LocalUploader()
+    if name == "replicate":
+        return ReplicateUploader()
+    raise ReferenceImageError(f"Unknown reference uploader: {name}")
+
+
+class ReferenceImageCache:
+    """Content-addressed cache of downscaled reference images and their uploads"""
+
+    def __init__(self, cache_dir: str = ".cache/reference_images", max_size: int = 1024,
+                 uploader=None):
+        """
+        Initialize reference image cache
+
+        Args:
+            cache_dir: Directory for resized copies and the upload index
+            max_size: Longest side in pixels of the copies sent to the model
+            uploader: Uploader instance (default: from REFERENCE_UPLOADER env)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.uploader = uploader or get_uploader()
+
+        self._lock = threading.Lock()
+        # (path, mtime_ns, size, inode) -> content hash, so unchanged files are not re-hashed
+        self._hashes: Dict[Tuple[str, int, int, int], str] = {}
+        self._index_path = self.cache_dir / f"uploads_{self.uploader.name}.json"
+        # Content hash -> {"url": ..., "uploaded_at": ...}
+        self._uploads: Dict[str, Dict] = self._load_index()
+        # Content hash -> upload in progress
+        self._in_flight: Dict[str, Future] = {}
+
+    def _load_index(self) -> Dict[str, Dict]:
+        if not self._index_path.exists():
+            return {}
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable upload index {self._index_path}: {e}")
+            return {}
+
+    def _save_index(self) -> None:
+        tmp_path = self._index_path.with_name(f".{self._index_path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._uploads, f, indent=2)
+            os.replace(tmp_path, self._index_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def content_hash(self, path: Path) -> str:
+        """Return the SHA-256 of a file, memoized on its stat signature"""
+        st = path.stat()
+        key = (str(path.resolve()), st.st_mtime_ns, st.st_size, st.st_ino)
+        digest = self._hashes.get(key)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+            self._hashes[key] = digest
+        return digest
+
+    def prepare(self, path: Path) -> Tuple[str, Path]:
+        """
+        Return the content hash and the downscaled copy of a reference image
+
+        The copy is created on first use only; identical source files share it.
+
+        Args:
+            path: Source image path
+
+        Returns:
+            Tuple of (content hash, path of the resized copy)
+
+        Raises:
+            ReferenceImageError: If the image cannot be read
+        """
+        digest = self.content_hash(path)
+        for suffix in (".jpg", ".png"):
+            cached = self.cache_dir / f"{digest}_{self.max_size}{suffix}"
+            if cached.exists():
+                return digest, cached
+
+        from PIL import Image
+
+        tmp_path = None
+        try:
+            with Image.open(path) as image:
+                image.thumbnail((self.max_size, self.max_size), Image.LANCZOS)
+                # Keep transparency (logos) as PNG, everything else as JPEG
+                if image.mode in ("RGBA", "LA", "P"):
+                    cached = self.cache_dir / f"{digest}_{self.max_size}.png"
+                    # Unique per writer: concurrent jobs may prepare the same image
+                    tmp_path = cached.with_name(f".{cached.name}.{uuid.uuid4().hex[:8]}.tmp")
+                    image.save(tmp_path, format="PNG", optimize=True)
+                else:
+                    cached = self.cache_dir / f"{digest}_{self.max_size}.jpg"
+                    tmp_path = cached.with_name(f".{cached.name}.{uuid.uuid4().hex[:8]}.tmp")
+                    image.convert("RGB").save(tmp_path, format="JPEG", quality=90)
+            os.replace(tmp_path, cached)
+        except Exception as e:
+            if tmp_path is not None:
+                tmp_path.unlink(missing_ok=True)
+            raise ReferenceImageError(f"Failed to prepare reference image {path}: {e}")
+
+        logger.info(f"  ✓ Prepared reference image: {path.name} -> {cached.name}")
+        return digest, cached
+
+    def _upload(self, digest: str, resized: Path, name: str) -> str:
+        """
+        Return the upload URL of a prepared image, uploading it if missing or expired
+
+        Uploads run outside the cache lock; concurrent requests for the same
+        image wait for the one upload in flight instead of starting their own.
+        """
+        ttl = self.uploader.ttl_seconds
+        with self._lock:
+            entry = self._uploads.get(digest)
+            if entry is not None and (ttl is None or time.time() - entry["uploaded_at"] <= ttl):
+                return entry["url"]
+            future = self._in_flight.get(digest)
+            owner = future is None
+            if owner:
+                future = self._in_flight[digest] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            url = self.uploader.upload(resized)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[digest]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._in_flight[digest]
+            self._uploads[digest] = {"url": url, "uploaded_at": time.time()}
+            self._save_index()
+        future.set_result(url)
+        logger.info(f"  ✓ Uploaded reference image: {name}")
+        return url
+
+    def get_inputs(self, image_paths: List[Path]) -> List[str]:
+        """
+        Return model-ready URLs for reference images, uploading each unique image once
+
+        Args:
+            image_paths: Source image paths from the assets directory
+
+        Returns:
+            List of URLs in input order, without duplicates; images that fail are skipped
+        """
+        urls: List[str] = []
+        seen = set()
+
+        for path in image_paths:
+            try:
+                digest, resized = self.prepare(Path(path))
+            except ReferenceImageError as e:
+                logger.warning(f"  ✗ {e}")
+                continue
+            if digest in seen:
+                continue
+            seen.add(digest)
+
+            try:
+                urls.append(self._upload(digest, resized, Path(path).name))
+            except Exception as e:
+                logger.warning(f"  ✗ Failed to upload reference image {Path(path).name}: {e}")
+
+        return urls
+
+
+def reference_images_enabled() -> bool:
+    """Whether renders get the assets directory's images as references (REFERENCE_IMAGES, default off)"""
+    return os.getenv("REFERENCE_IMAGES", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+_shared_cache: Optional[ReferenceImageCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_reference_cache() -> ReferenceImageCache:
+    """Return the process-wide reference image cache (configured from the environment)"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ReferenceImageCache(
+                cache_dir=os.getenv("REFERENCE_CACHE_DIR", ".cache/reference_images"),
+                max_size=int(os.getenv("REFERENCE_MAX_SIZE", "1024"))
+            )
+        return _shared_cache
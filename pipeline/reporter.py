@@ -2,15 +2,33 @@
 Pipeline Reporter - Track and report results for each pipeline step
 """
 
+import contextvars
 import json
 import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict, field
+from typing import Dict, Iterator, List, Optional, Any, Tuple
+from dataclasses import dataclass, asdict, field, replace
+
+from .events import log_event, register_context_provider
+from .profiling import start_profiler
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 logger = logging.getLogger(__name__)
 
+# (reporter, span) currently open in this thread / task; parent for new spans
+_active_span: contextvars.ContextVar[Optional[Tuple["PipelineReporter", "SpanRecord"]]] = \
+    contextvars.ContextVar("active_span", default=None)
+
 
 @dataclass
 class StepResult:
@@ -22,6 +40,30 @@ class StepResult:
     duration_seconds: Optional[float] = None
     details: Dict[str, Any] = field(default_factory=dict)
     error_message: Optional[str] = None
+    cpu_seconds: Optional[float] = None  # CPU time of the thread that ran the step
+    peak_rss_mb: Optional[float] = None  # Process memory high-water mark when the step ended
+
+
+@dataclass
+class SpanRecord:
+    """A timed unit of work; spans nest via parent_id"""
+    span_id: int
+    name: str
+    category: str
+    parent_id: Optional[int]
+    start_ns: int  # perf_counter_ns offset from the start of the pipeline
+    end_ns: Optional[int] = None
+    thread_id: int = 0
+    thread_name: str = ""
+    task_name: Optional[str] = None
+    status: str = "running"  # "running", "success", "failed"
+    details: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_seconds(self) -> Optional[float]:
+        if self.end_ns is None:
+            return None
+        return (self.end_ns - self.start_ns) / 1e9
 
 
 @dataclass
@@ -35,26 +77,36 @@ class PipelineReport:
     steps: List[StepResult] = field(default_factory=list)
     campaign_details: Dict[str, Any] = field(default_factory=dict)
     output_files: List[str] = field(default_factory=list)
+    spans: List[SpanRecord] = field(default_factory=list)
+    remote_calls: List[Dict[str, Any]] = field(default_factory=list)
+    accounting: Dict[str, Any] = field(default_factory=dict)
+    profile_files: List[str] = field(default_factory=list)
 
 
 class PipelineReporter:
     """Report and track pipeline execution progress"""
 
-    def __init__(self, campaign: dict, output_dir: str = "outputs"):
+    def __init__(self, campaign: dict, output_dir: str = "outputs", campaign_id: Optional[str] = None,
+                 profile: Optional[str] = None):
         """
         Initialize pipeline reporter
 
         Args:
             campaign: Campaign brief dictionary
-            output_dir: Directory for output files
+            output_dir: Directory for the report files; may be changed before finalize()
+            campaign_id: Report ID (default: target market and timestamp)
+            profile: Profile the job in this thread until finalize(): "sample",
+                "cprofile" or "all" (default: PROFILE_JOBS env, off when unset)
         """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.report_path: Optional[Path] = None
 
         # Generate campaign ID from timestamp and target market
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        target_market = campaign.get("target_market", "unknown").lower().replace(" ", "_")
-        campaign_id = f"{target_market}_{timestamp}"
+        if campaign_id is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            target_market = campaign.get("target_market", "unknown").lower().replace(" ", "_")
+            campaign_id = f"{target_market}_{timestamp}"
 
         # Initialize report
         self.report = PipelineReport(
@@ -71,8 +123,24 @@ class PipelineReporter:
 
         self.current_step: Optional[StepResult] = None
 
+        # Remote model calls made while this reporter is active (imported here:
+        # accounting itself depends on this module)
+        from .accounting import CallLedger
+        self.ledger = CallLedger()
+
+        # Monotonic clock origin for all spans and durations
+        self._origin_ns = time.perf_counter_ns()
+        self._span_lock = threading.Lock()
+        self._next_span_id = 1
+        self._step_span: Optional[SpanRecord] = None
+        self._step_token: Optional[contextvars.Token] = None
+        self._step_cpu: Optional[Tuple[int, float]] = None  # (thread, thread_time at step start)
+
         logger.info(f"Initialized pipeline reporter for campaign: {campaign_id}")
 
+        # Last, so the profile covers the job rather than reporter setup
+        self.profiler = start_profiler(profile)
+
     def start_step(self, step_name: str, details: Optional[Dict[str, Any]] = None) -> None:
         """
         Mark the start of a pipeline step
@@ -91,14 +159,11 @@ class PipelineReporter:
             start_time=datetime.now().isoformat(),
             details=details or {}
         )
+        self._step_span = self._open_span(step_name, "step", dict(details or {}))
+        self._step_token = _active_span.set((self, self._step_span))
+        self._step_cpu = (threading.get_ident(), time.thread_time())
 
-        logger.info("=" * 60)
-        logger.info(f"STEP: {step_name}")
-        logger.info("=" * 60)
-
-        if details:
-            for key, value in details.items():
-                logger.info(f"  {key}: {value}")
+        log_event(logger, "step_started", f"▶ {step_name}", **(details or {}))
 
     def end_step(self, status: str = "success",
                   details: Optional[Dict[str, Any]] = None,
@@ -115,37 +180,115 @@ class PipelineReporter:
             logger.warning("No active step to end")
             return
 
-        # Calculate duration
-        start = datetime.fromisoformat(self.current_step.start_time)
-        end = datetime.now()
-        duration = (end - start).total_seconds()
+        # Calculate duration on the monotonic clock
+        step_span = self._step_span
+        self._close_span(step_span, status, details)
+        duration = step_span.duration_seconds
+        self._restore_after_step(step_span)
 
         # Update step
-        self.current_step.end_time = end.isoformat()
+        self.current_step.end_time = datetime.now().isoformat()
         self.current_step.duration_seconds = duration
         self.current_step.status = status
         self.current_step.error_message = error_message
+        cpu_thread, cpu_start = self._step_cpu or (None, 0.0)
+        if cpu_thread == threading.get_ident():
+            self.current_step.cpu_seconds = round(time.thread_time() - cpu_start, 4)
+        self.current_step.peak_rss_mb = _peak_rss_mb()
 
         if details:
             self.current_step.details.update(details)
 
-        # Log result
+        # Log result; the step span has ended, so tag the event explicitly
         status_icon = "✅" if status == "success" else "❌" if status == "failed" else "⏭️"
-        logger.info("")
-        logger.info(f"{status_icon} Step completed: {self.current_step.step_name}")
-        logger.info(f"   Status: {status.upper()}")
-        logger.info(f"   Duration: {duration:.2f}s")
-
+        message = f"{status_icon} {self.current_step.step_name}: {status} in {duration:.2f}s"
         if error_message:
-            logger.error(f"   Error: {error_message}")
-
-        logger.info("=" * 60)
-        logger.info("")
+            message += f" ({error_message})"
+        fields = dict(details or {})
+        fields.update(step=self.current_step.step_name, status=status,
+                      duration_seconds=round(duration, 3), error=error_message)
+        log_event(logger, "step_finished", message,
+                  level=logging.ERROR if status == "failed" else logging.INFO, **fields)
 
         # Add to report
         self.report.steps.append(self.current_step)
         self.current_step = None
 
+    def _open_span(self, name: str, category: str, details: Dict[str, Any]) -> SpanRecord:
+        """Create a span parented to the span active in the current context"""
+        active = _active_span.get()
+        parent_id = active[1].span_id if active is not None and active[0] is self else None
+
+        # No task can be running unless asyncio has been imported by someone
+        asyncio = sys.modules.get("asyncio")
+        try:
+            task = asyncio.current_task() if asyncio is not None else None
+        except RuntimeError:
+            task = None
+
+        thread = threading.current_thread()
+        with self._span_lock:
+            span = SpanRecord(
+                span_id=self._next_span_id,
+                name=name,
+                category=category,
+                parent_id=parent_id,
+                start_ns=time.perf_counter_ns() - self._origin_ns,
+                thread_id=threading.get_ident(),
+                thread_name=thread.name,
+                task_name=task.get_name() if task is not None else None,
+                details=details
+            )
+            self._next_span_id += 1
+            self.report.spans.append(span)
+        return span
+
+    def _close_span(self, span: SpanRecord, status: str,
+                    details: Optional[Dict[str, Any]] = None) -> None:
+        span.end_ns = time.perf_counter_ns() - self._origin_ns
+        span.status = status
+        if details:
+            span.details.update(details)
+
+    def _restore_after_step(self, step_span: SpanRecord) -> None:
+        """Make the step's parent the active span again"""
+        token, self._step_token, self._step_span = self._step_token, None, None
+        try:
+            _active_span.reset(token)
+        except (ValueError, TypeError):
+            # Step ended in a different context than it started in
+            parent = next((s for s in self.report.spans if s.span_id == step_span.parent_id), None)
+            _active_span.set((self, parent) if parent is not None else None)
+
+    @contextmanager
+    def span(self, name: str, category: str = "pipeline", **details: Any) -> Iterator[SpanRecord]:
+        """
+        Time a block of work as a span nested under the active span
+
+        Spans may be opened from any thread or asyncio task; nesting follows the
+        current context, so pass work to pools with contextvars.copy_context()
+        to keep parentage.
+
+        Args:
+            name: Span name
+            category: Span category (e.g. "llm", "render", "download", "save")
+            **details: Extra attributes recorded on the span
+
+        Yields:
+            The open span; its details may be updated inside the block
+        """
+        span = self._open_span(name, category, details)
+        token = _active_span.set((self, span))
+        try:
+            yield span
+        except BaseException as e:
+            self._close_span(span, "failed", {"error": str(e)})
+            raise
+        else:
+            self._close_span(span, "success")
+        finally:
+            _active_span.reset(token)
+
     def add_output_file(self, file_path: str) -> None:
         """
         Register an output file
@@ -154,7 +297,7 @@ class PipelineReporter:
             file_path: Path to the output file
         """
         self.report.output_files.append(file_path)
-        logger.info(f"📁 Output file registered: {file_path}")
+        log_event(logger, "output_file", f"📁 Output file registered: {file_path}", path=file_path)
 
     def finalize(self, status: str = "completed") -> None:
         """
@@ -168,13 +311,22 @@ class PipelineReporter:
             self.end_step("failed", error_message="Pipeline ended with active step")
 
         # Calculate total duration
-        start = datetime.fromisoformat(self.report.start_time)
-        end = datetime.now()
-        duration = (end - start).total_seconds()
+        duration = (time.perf_counter_ns() - self._origin_ns) / 1e9
 
-        self.report.end_time = end.isoformat()
+        self.report.end_time = datetime.now().isoformat()
         self.report.duration_seconds = duration
         self.report.status = status
+        self.report.remote_calls = self.ledger.to_list()
+        self.report.accounting = self.ledger.summary()
+
+        # Profiles are written next to the report
+        if self.profiler is not None:
+            profiler, self.profiler = self.profiler, None
+            try:
+                self.report.profile_files = profiler.stop_and_save(
+                    self.output_dir, f"profile_{self.report.campaign_id}")
+            except Exception as e:
+                logger.error(f"Failed to save profile: {e}")
 
         # Print summary
         self._print_summary()
@@ -183,51 +335,117 @@ class PipelineReporter:
         self._save_report()
 
     def _print_summary(self) -> None:
-        """Print pipeline execution summary"""
-        logger.info("")
-        logger.info("=" * 80)
-        logger.info("PIPELINE EXECUTION SUMMARY")
-        logger.info("=" * 80)
-        logger.info(f"Campaign ID: {self.report.campaign_id}")
-        logger.info(f"Status: {self.report.status.upper()}")
-        logger.info(f"Total Duration: {self.report.duration_seconds:.2f}s")
-        logger.info("")
-
-        logger.info("Campaign Details:")
-        logger.info(f"  Brand: {self.report.campaign_details.get('brand_name', '(generated)')}")
-        logger.info(f"  Products: {', '.join(str(p) for p in self.report.campaign_details.get('products', []))}")
-        logger.info(f"  Target Market: {self.report.campaign_details['target_market']}")
-        logger.info(f"  Target Audience: {self.report.campaign_details['target_audience']}")
-        logger.info(f"  Campaign Message: {self.report.campaign_details['campaign_message']}")
-        logger.info("")
-
-        logger.info("Steps Executed:")
-        for i, step in enumerate(self.report.steps, 1):
-            status_icon = "✅" if step.status == "success" else "❌" if step.status == "failed" else "⏭️"
-            logger.info(f"  {i}. {status_icon} {step.step_name} ({step.duration_seconds:.2f}s)")
-            if step.error_message:
-                logger.info(f"     Error: {step.error_message}")
-
-        logger.info("")
-        logger.info(f"Output Files ({len(self.report.output_files)}):")
-        for output_file in self.report.output_files:
-            logger.info(f"  📁 {output_file}")
-
-        logger.info("")
-        logger.info("=" * 80)
+        """Log the pipeline execution summary as one event"""
+        accounting = self.ledger.summary()
+        steps_ok = sum(1 for step in self.report.steps if step.status == "success")
+        status_icon = "✅" if self.report.status == "completed" else "❌"
+        log_event(
+            logger, "pipeline_finished",
+            f"{status_icon} Pipeline {self.report.status}: {self.report.campaign_id} in "
+            f"{self.report.duration_seconds:.2f}s ({steps_ok}/{len(self.report.steps)} steps ok, "
+            f"{len(self.report.output_files)} output file(s), {accounting['calls']} remote call(s), "
+            f"~${accounting['estimated_cost_usd']:.4f})",
+            campaign_id=self.report.campaign_id,
+            status=self.report.status,
+            duration_seconds=round(self.report.duration_seconds, 3),
+            campaign_details=self.report.campaign_details,
+            steps=[{"step": step.step_name, "status": step.status,
+                    "duration_seconds": round(step.duration_seconds or 0.0, 3),
+                    "error": step.error_message} for step in self.report.steps],
+            output_files=self.report.output_files,
+            remote_calls=accounting["calls"],
+            estimated_cost_usd=accounting["estimated_cost_usd"]
+        )
 
     def _save_report(self) -> None:
-        """Save report to JSON file"""
+        """Save report to JSON file, plus a Chrome trace of its spans"""
         report_filename = f"report_{self.report.campaign_id}.json"
         report_path = self.output_dir / report_filename
 
         try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
             with open(report_path, 'w') as f:
-                json.dump(asdict(self.report), f, indent=2)
+                json.dump(self.to_dict(), f, indent=2)
+            self.report_path = report_path
             logger.info(f"📊 Report saved to: {report_path}")
         except Exception as e:
             logger.error(f"Failed to save report: {e}")
 
+        trace_path = self.output_dir / f"trace_{self.report.campaign_id}.json"
+        try:
+            self.export_chrome_trace(str(trace_path))
+            logger.info(f"📊 Trace saved to: {trace_path} (open in https://ui.perfetto.dev)")
+        except Exception as e:
+            logger.error(f"Failed to save trace: {e}")
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """
+        Convert spans to Chrome trace-event format (viewable in Perfetto / chrome://tracing)
+
+        Returns:
+            Trace dictionary with complete ("X") events in microseconds
+        """
+        pid = os.getpid()
+        now_ns = time.perf_counter_ns() - self._origin_ns
+        events: List[Dict[str, Any]] = [{
+            "name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+            "args": {"name": f"campaign {self.report.campaign_id}"}
+        }]
+
+        thread_names = {}
+        for span in list(self.report.spans):
+            thread_names[span.thread_id] = span.thread_name
+            end_ns = span.end_ns if span.end_ns is not None else now_ns
+            args = {k: v if isinstance(v, (str, int, float, bool)) or v is None else str(v)
+                    for k, v in span.details.items()}
+            args.update({"span_id": span.span_id, "parent_id": span.parent_id, "status": span.status})
+            if span.task_name:
+                args["task"] = span.task_name
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start_ns / 1000,
+                "dur": (end_ns - span.start_ns) / 1000,
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": args
+            })
+
+        for tid, name in thread_names.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: str) -> None:
+        """
+        Write spans as a Chrome trace-event JSON file
+
+        Args:
+            path: Output file path
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the full report as a dictionary
+
+        Safe to call while the pipeline is still running.
+
+        Returns:
+            Dictionary with campaign details, steps and spans
+        """
+        with self._span_lock:
+            spans = list(self.report.spans)
+        data = asdict(replace(self.report, steps=list(self.report.steps),
+                              output_files=list(self.report.output_files), spans=[],
+                              profile_files=list(self.report.profile_files)))
+        data["spans"] = [asdict(span) for span in spans]
+        data["remote_calls"] = self.ledger.to_list()
+        data["accounting"] = self.ledger.summary()
+        return data
+
     def get_summary(self) -> Dict[str, Any]:
         """
         Get report summary as dictionary
@@ -242,5 +460,55 @@ class PipelineReporter:
             "steps_total": len(self.report.steps),
             "steps_successful": sum(1 for s in self.report.steps if s.status == "success"),
             "steps_failed": sum(1 for s in self.report.steps if s.status == "failed"),
+            "estimated_cost_usd": self.ledger.summary()["estimated_cost_usd"],
             "output_files": self.report.output_files
         }
+
+
+def _event_context() -> Optional[Dict[str, Any]]:
+    """Tag log events with the campaign and step active in the current context"""
+    active = _active_span.get()
+    if active is None:
+        return None
+    reporter, span = active
+    context: Dict[str, Any] = {"campaign_id": reporter.report.campaign_id}
+    step = reporter._step_span
+    if step is not None:
+        context["step"] = step.name
+    if span is not step:
+        context["span"] = span.name
+    return context
+
+
+register_context_provider(_event_context)
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def current_reporter() -> Optional[PipelineReporter]:
+    """Return the reporter whose step or span is active in the current context, if any"""
+    active = _active_span.get()
+    return active[0] if active is not None else None
+
+
+@contextmanager
+def trace_span(name: str, category: str = "pipeline", **details: Any) -> Iterator[Optional[SpanRecord]]:
+    """
+    Record a span on the reporter active in the current context, if any
+
+    Lets library code (generators, LLM calls) be traced without passing the
+    reporter around. Yields None when no reporter step or span is active.
+    """
+    active = _active_span.get()
+    if active is None:
+        yield None
+        return
+    with active[0].span(name, category, **details) as span:
+        yield span
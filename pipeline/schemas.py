@@ -0,0 +1,75 @@
+"""
+Schemas - Pydantic models for structured LLM output
+
+Kept apart from campaign_utils so that importing it does not load pydantic.
+"""
+
+from typing import List
+
+from pydantic import BaseModel, Field, field_validator
+
+# Shorter image prompts are truncated or placeholder output, not a usable scene
+MIN_IMAGE_PROMPT_LENGTH = 40
+
+
+class OptimizedPrompt(BaseModel):
+    """Structured output for optimized advertising prompt"""
+    image_prompt: str = Field(
+        description="Detailed image generation prompt that includes the brand name in quotes (but NOT product names in quotes), logo placement description, and campaign message"
+    )
+    translated_campaign_message: str = Field(
+        description="The campaign message in the target market language (as it will appear in the image)"
+    )
+    brand_mentions: int = Field(
+        ge=0,
+        description="Number of times the brand name appears in quotes in the prompt"
+    )
+    includes_logo: bool = Field(
+        description="Whether the prompt explicitly mentions the brand logo placement"
+    )
+    includes_campaign_message: bool = Field(
+        description="Whether the prompt includes the campaign message text"
+    )
+
+    @field_validator("image_prompt")
+    @classmethod
+    def _check_image_prompt(cls, value: str) -> str:
+        value = value.strip()
+        if len(value) < MIN_IMAGE_PROMPT_LENGTH:
+            raise ValueError(f"must be a full scene description (at least {MIN_IMAGE_PROMPT_LENGTH} characters)")
+        if value[0] in "{[" or '"image_prompt"' in value:
+            raise ValueError("contains JSON instead of a prompt")
+        return value
+
+    @field_validator("translated_campaign_message")
+    @classmethod
+    def _check_message(cls, value: str) -> str:
+        value = value.strip()
+        if not value:
+            raise ValueError("must not be empty")
+        return value
+
+
+class CampaignSuggestions(BaseModel):
+    """Structured output for brand name and campaign message candidates"""
+    brand_names: List[str] = Field(
+        min_length=1,
+        description="Candidate brand names (2-3 words each)"
+    )
+    campaign_messages: List[str] = Field(
+        min_length=1,
+        description="Candidate campaign messages in English (3-6 words each, without a brand name)"
+    )
+
+    @field_validator("brand_names", "campaign_messages")
+    @classmethod
+    def _clean_candidates(cls, values: List[str]) -> List[str]:
+        # Same cleanup as the single-candidate calls, without duplicates or blanks
+        cleaned: List[str] = []
+        for value in values:
+            value = value.strip().strip('"').strip("'").strip()
+            if value and value.casefold() not in (c.casefold() for c in cleaned):
+                cleaned.append(value)
+        if not cleaned:
+            raise ValueError("must contain at least one non-empty candidate")
+        return cleaned
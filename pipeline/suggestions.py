@@ -0,0 +1,128 @@
+"""
+Suggestions - Cached brand name and campaign message candidates for the form
+
+The form asks for suggestions while the user is still typing, so the same
+brief is requested again and again. Candidates come from one LLM call per
+(products, market, audience, count) and are cached for SUGGEST_CACHE_TTL
+seconds. Identical requests that arrive while that call is running wait for
+its result instead of starting their own. A job submitted with an accepted
+brand name and message skips both generation calls.
+Lookups are counted in easy_ads_suggestions_total.
+
+Configured from the environment:
+    SUGGEST_CACHE_TTL       Seconds a set of candidates is served from the cache (default 600)
+    SUGGEST_CACHE_SIZE      Briefs kept in the cache (default 256)
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from .campaign_utils import generate_suggestions
+from .metrics import SUGGESTIONS
+
+logger = logging.getLogger(__name__)
+
+SuggestionKey = Tuple[Tuple[str, ...], str, str, int]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text).split()).casefold()
+
+
+def suggestion_key(products: List[str], target_market: str, target_audience: str, count: int) -> SuggestionKey:
+    """Cache key of a brief: product order, case and spacing do not matter"""
+    products_key = tuple(sorted({_normalize(p) for p in products if str(p).strip()}))
+    return products_key, _normalize(target_market), _normalize(target_audience), count
+
+
+class SuggestionCache:
+    """TTL and LRU bounded cache of suggestions, with one call in flight per brief"""
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        """
+        Initialize suggestion cache
+
+        Args:
+            ttl_seconds: Seconds an entry is served (default: SUGGEST_CACHE_TTL env, 600)
+            max_entries: Briefs kept (default: SUGGEST_CACHE_SIZE env, 256)
+        """
+        self.ttl_seconds = ttl_seconds or float(os.getenv("SUGGEST_CACHE_TTL", "600"))
+        self.max_entries = max_entries or int(os.getenv("SUGGEST_CACHE_SIZE", "256"))
+        # Key -> (expires at, suggestions), least recently used first
+        self._entries: "OrderedDict[SuggestionKey, Tuple[float, Dict[str, List[str]]]]" = OrderedDict()
+        self._in_flight: Dict[SuggestionKey, Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, products: List[str], target_market: str = "", target_audience: str = "",
+            count: int = 5) -> Dict[str, Any]:
+        """
+        Return suggestions for a brief, from the cache when possible
+
+        Args:
+            products: Products entered so far
+            target_market: Target market
+            target_audience: Target audience
+            count: Candidates of each kind
+
+        Returns:
+            Dictionary with "brand_names", "campaign_messages", "cached" and "expires_in" (seconds)
+
+        Raises:
+            Exception: The LLM call's error; failures are not cached
+        """
+        key = suggestion_key(products, target_market, target_audience, count)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                SUGGESTIONS.labels(outcome="hit").inc()
+                return self._response(entry, cached=True)
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+
+        if not owner:
+            SUGGESTIONS.labels(outcome="coalesced").inc()
+            return self._response(future.result(), cached=True)
+
+        SUGGESTIONS.labels(outcome="miss").inc()
+        try:
+            suggestions = generate_suggestions(products, target_market, target_audience, count)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        entry = (time.monotonic() + self.ttl_seconds, suggestions)
+        with self._lock:
+            del self._in_flight[key]
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        future.set_result(entry)
+        return self._response(entry, cached=False)
+
+    @staticmethod
+    def _response(entry: Tuple[float, Dict[str, List[str]]], cached: bool) -> Dict[str, Any]:
+        expires_at, suggestions = entry
+        return {**suggestions, "cached": cached, "expires_in": max(0, round(expires_at - time.monotonic()))}
+
+
+_shared_cache: Optional[SuggestionCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_suggestion_cache() -> SuggestionCache:
+    """Return the process-wide suggestion cache (configured from the environment)"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = SuggestionCache()
+        return _shared_cache
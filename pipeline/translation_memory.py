@@ -0,0 +1,142 @@
+"""
+Translation Memory - Campaign message translations kept across jobs
+
+The same (message, market) pairs come back in brief after brief. Each
+translation from a validated prompt, and drawn by that prompt, is stored
+under its normalized source text and target market. Later prompts pass a stored
+translation to the model as fixed text instead of asking for a new one, so
+prompts are shorter and the text on the banners stays the same between jobs.
+A stored translation that a validated prompt does not use is replaced by the
+one it does use. Lookups are counted in easy_ads_translation_memory_total.
+
+Configured from the environment:
+    TRANSLATION_MEMORY          Use the translation memory (default true)
+    TRANSLATION_MEMORY_PATH     JSON file of stored translations (default .cache/translation_memory.json)
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, Optional
+
+from .metrics import TRANSLATION_MEMORY
+
+logger = logging.getLogger(__name__)
+
+# Typographic quotes the model and users mix freely with plain ones
+_QUOTES = str.maketrans({"“": '"', "”": '"', "„": '"', "‘": "'", "’": "'"})
+
+
+def normalize_text(text: str) -> str:
+    """Source text key: NFKC, plain quotes, collapsed whitespace; case is kept for the on-image text"""
+    text = " ".join(unicodedata.normalize("NFKC", text).translate(_QUOTES).split())
+    # A message wrapped in quotes as a whole is the same message
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        text = text[1:-1].strip()
+    return text
+
+
+def normalize_market(market: str) -> str:
+    return " ".join(market.split()).casefold()
+
+
+class TranslationMemory:
+    """Persistent (source text, market) -> translation store"""
+
+    def __init__(self, path: str = ".cache/translation_memory.json"):
+        """
+        Initialize translation memory
+
+        Args:
+            path: JSON file the translations are kept in
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        # Market -> normalized source text -> {"translation": ..., "stored_at": ...}
+        self._entries: Dict[str, Dict[str, Dict]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Dict]]:
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable translation memory {self.path}: {e}")
+            return {}
+
+    def _save(self) -> None:
+        """Write the memory atomically: a crash leaves the previous or the new version"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, text: str, market: str) -> Optional[str]:
+        """
+        Return the stored translation of a message for a market
+
+        Args:
+            text: Source campaign message
+            market: Target market
+
+        Returns:
+            Translation, or None if the pair has not been translated before
+        """
+        source = normalize_text(text)
+        if not source or not market.strip():
+            return None
+        with self._lock:
+            entry = self._entries.get(normalize_market(market), {}).get(source)
+        TRANSLATION_MEMORY.labels(outcome="hit" if entry else "miss").inc()
+        return entry["translation"] if entry else None
+
+    def store(self, text: str, market: str, translation: str, replace: bool = False) -> None:
+        """
+        Remember a validated translation
+
+        Args:
+            text: Source campaign message
+            market: Target market
+            translation: Campaign message as it appears on the market's banners
+            replace: Overwrite a stored translation the model would not use
+        """
+        source, translation = normalize_text(text), translation.strip()
+        if not source or not translation or not market.strip():
+            return
+        with self._lock:
+            entries = self._entries.setdefault(normalize_market(market), {})
+            stored = entries.get(source)
+            if stored is not None and (not replace or stored["translation"] == translation):
+                return
+            entries[source] = {"translation": translation, "stored_at": time.time()}
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning(f"Could not save translation memory {self.path}: {e}")
+                return
+        TRANSLATION_MEMORY.labels(outcome="replaced" if stored else "stored").inc()
+        logger.info(f"  ✓ {'Replaced' if stored else 'Stored'} {market} translation of the campaign message")
+
+
+_shared_memory: Optional[TranslationMemory] = None
+_shared_lock = threading.Lock()
+
+
+def get_translation_memory() -> Optional[TranslationMemory]:
+    """Return the process-wide translation memory, or None when TRANSLATION_MEMORY is off"""
+    global _shared_memory
+    if os.getenv("TRANSLATION_MEMORY", "true").strip().lower() in ("0", "false", "no", "off"):
+        return None
+    with _shared_lock:
+        if _shared_memory is None:
+            _shared_memory = TranslationMemory(
+                os.getenv("TRANSLATION_MEMORY_PATH", ".cache/translation_memory.json"))
+        return _shared_memory